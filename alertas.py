@@ -0,0 +1,279 @@
+"""
+Alertas de prazo do Tracker Tasks, independentes do Streamlit.
+
+Mantém um índice de prazos (heap) das tarefas abertas: cada entrada é o
+próximo instante em que a tarefa muda de faixa ("vencendo" ou "atrasada").
+Avançar o relógio só desempilha as tarefas que cruzaram um limiar, e cada
+cruzamento vira uma notificação (arquivo local, webhook ou e-mail).
+"""
+import heapq
+import json
+import smtplib
+import threading
+import urllib.request
+from email.message import EmailMessage
+from datetime import datetime
+import pandas as pd
+
+
+# --- CONSTANTES ---
+DIAS_ALERTA_PRAZO = 3
+FAIXAS_PRAZO = ['no_prazo', 'vencendo', 'atrasada']  # Da mais folgada à mais grave
+CORES_FAIXA_PRAZO = {'no_prazo': "green", 'vencendo': "orange", 'atrasada': "red"}
+ARQUIVO_ALERTAS_LOCAL = "alertas.jsonl"
+INTERVALO_ALERTAS = 300  # Segundos entre recargas das tarefas pelo agendador
+
+
+# --- ÍNDICE DE PRAZOS (HEAP) ---
+def faixa_prazo(dias_restantes, dias_alerta=DIAS_ALERTA_PRAZO):
+    """Faixa de um prazo pelos dias restantes (negativo = atrasada)."""
+    if dias_restantes < 0:
+        return 'atrasada'
+    if dias_restantes <= dias_alerta:
+        return 'vencendo'
+    return 'no_prazo'
+
+
+def proximo_limiar(data_entrega, faixa, dias_alerta=DIAS_ALERTA_PRAZO):
+    """
+    Instante a partir do qual a tarefa passa para a faixa seguinte.
+
+    Returns:
+        tuple: (instante, faixa_seguinte), ou (None, None) se já está atrasada
+    """
+    if faixa == 'no_prazo':
+        # dias_restantes <= dias_alerta  <=>  faltam menos de dias_alerta + 1 dias
+        return data_entrega - pd.Timedelta(days=dias_alerta + 1), 'vencendo'
+    if faixa == 'vencendo':
+        return data_entrega, 'atrasada'
+    return None, None
+
+
+def criar_indice_prazos(df_tarefas=None, agora=None, dias_alerta=DIAS_ALERTA_PRAZO, faixas_anteriores=None):
+    """
+    Cria o índice de prazos das tarefas abertas.
+
+    Args:
+        faixas_anteriores: {task_id: faixa} de uma execução anterior. Sem elas,
+                           as faixas atuais são assumidas sem gerar alertas.
+
+    Returns:
+        dict: {'heap', 'tarefas', 'faixas', 'dias_alerta'}
+    """
+    indice = {'heap': [], 'tarefas': {}, 'faixas': dict(faixas_anteriores or {}),
+              'dias_alerta': dias_alerta}
+    if df_tarefas is not None:
+        sincronizar_indice_prazos(indice, df_tarefas, agora, silencioso=faixas_anteriores is None)
+    return indice
+
+
+def empilhar_limiar(indice, task_id, data_entrega, faixa):
+    """Agenda no heap o próximo cruzamento de faixa da tarefa."""
+    instante, seguinte = proximo_limiar(data_entrega, faixa, indice['dias_alerta'])
+    if instante is not None:
+        heapq.heappush(indice['heap'], (instante, task_id, data_entrega, seguinte))
+
+
+def entrada_valida(indice, entrada):
+    """Entradas de tarefas concluídas, removidas ou com prazo alterado ficam obsoletas no heap."""
+    _, task_id, data_entrega, seguinte = entrada
+    tarefa = indice['tarefas'].get(task_id)
+    return tarefa is not None and tarefa['data_entrega'] == data_entrega and \
+        indice['faixas'].get(task_id) == FAIXAS_PRAZO[FAIXAS_PRAZO.index(seguinte) - 1]
+
+
+def sincronizar_indice_prazos(indice, df_tarefas, agora=None, silencioso=False):
+    """
+    Atualiza o índice com as tarefas abertas de df_tarefas: entram as novas e
+    as que mudaram de prazo; saem as concluídas e as removidas.
+
+    A faixa de partida de uma tarefa alterada é a menos grave entre a já
+    conhecida e a atual, de modo que avancar_prazos notifique as que pioraram
+    (com silencioso=True, parte direto da faixa atual).
+    """
+    agora = pd.Timestamp(agora or datetime.now())
+    abertas = df_tarefas[df_tarefas['status'] != 'Concluído']
+    datas = pd.to_datetime(abertas['data_entrega'], errors='coerce')
+    abertas = abertas[datas.notna()].assign(
+        task_id=abertas['id'].astype(str), data_entrega=datas[datas.notna()])
+
+    tarefas = indice['tarefas']
+    for task_id in set(tarefas) - set(abertas['task_id']):
+        del tarefas[task_id]
+        indice['faixas'].pop(task_id, None)
+
+    # Máscara como Series: uma lista vazia (nenhuma tarefa aberta) selecionaria colunas
+    alteradas = abertas.loc[pd.Series([
+        task_id not in tarefas or tarefas[task_id]['data_entrega'] != data
+        for task_id, data in zip(abertas['task_id'], abertas['data_entrega'])
+    ], index=abertas.index, dtype=bool)]
+    dias = (alteradas['data_entrega'] - agora).dt.days
+    for task_id, data, titulo, responsavel, dias_restantes in zip(
+            alteradas['task_id'], alteradas['data_entrega'], alteradas['titulo'],
+            alteradas['responsavel'], dias):
+        atual = faixa_prazo(dias_restantes, indice['dias_alerta'])
+        conhecida = indice['faixas'].get(task_id, 'no_prazo')
+        faixa = atual if silencioso else min(atual, conhecida, key=FAIXAS_PRAZO.index)
+        tarefas[task_id] = {'data_entrega': data, 'titulo': titulo, 'responsavel': responsavel}
+        indice['faixas'][task_id] = faixa
+        empilhar_limiar(indice, task_id, data, faixa)
+
+    # Títulos e responsáveis podem mudar sem alterar o prazo
+    for task_id, titulo, responsavel in zip(abertas['task_id'], abertas['titulo'], abertas['responsavel']):
+        tarefas[task_id].update(titulo=titulo, responsavel=responsavel)
+    return indice
+
+
+def avancar_prazos(indice, agora=None):
+    """
+    Desempilha as tarefas que cruzaram um limiar até `agora` e atualiza suas faixas.
+
+    Returns:
+        list: Alertas (dicts), um por tarefa, com a faixa mais grave alcançada
+    """
+    agora = pd.Timestamp(agora or datetime.now())
+    heap = indice['heap']
+    alertas = {}
+    while heap and heap[0][0] < agora:
+        entrada = heapq.heappop(heap)
+        if not entrada_valida(indice, entrada):
+            continue
+        _, task_id, data_entrega, faixa = entrada
+        indice['faixas'][task_id] = faixa
+        tarefa = indice['tarefas'][task_id]
+        alertas[task_id] = {
+            'task_id': task_id, 'titulo': tarefa['titulo'], 'responsavel': tarefa['responsavel'],
+            'data_entrega': data_entrega.strftime("%Y-%m-%d"), 'faixa': faixa,
+            'dias_restantes': int((data_entrega - agora).days),
+        }
+        empilhar_limiar(indice, task_id, data_entrega, faixa)
+
+    # Descarta entradas obsoletas quando passam a dominar o heap
+    if len(heap) > 2 * max(len(indice['tarefas']), 16):
+        indice['heap'] = [e for e in heap if entrada_valida(indice, e)]
+        heapq.heapify(indice['heap'])
+    return list(alertas.values())
+
+
+def proximo_disparo(indice):
+    """Instante do próximo cruzamento agendado (None se não houver)."""
+    return indice['heap'][0][0] if indice['heap'] else None
+
+
+def contar_faixas(indice):
+    """Quantidade de tarefas abertas em cada faixa."""
+    contagem = dict.fromkeys(FAIXAS_PRAZO, 0)
+    for faixa in indice['faixas'].values():
+        contagem[faixa] += 1
+    return contagem
+
+
+# --- NOTIFICAÇÕES ---
+def formatar_alerta(alerta):
+    """Mensagem de uma linha para o alerta."""
+    data = datetime.strptime(alerta['data_entrega'], "%Y-%m-%d").strftime("%d/%m/%Y")
+    if alerta['faixa'] == 'atrasada':
+        return f"🔴 #{alerta['task_id']} {alerta['titulo']} ({alerta['responsavel']}) está atrasada desde {data}"
+    return (f"⏰ #{alerta['task_id']} {alerta['titulo']} ({alerta['responsavel']}) vence em {data} "
+            f"({alerta['dias_restantes']} dias)")
+
+
+def notificar_local(alertas, arquivo=ARQUIVO_ALERTAS_LOCAL):
+    """Stub para testes: acrescenta os alertas (JSON, um por linha) a um arquivo local."""
+    carimbo = datetime.now().isoformat()
+    with open(arquivo, 'a', encoding='utf-8') as f:
+        for alerta in alertas:
+            f.write(json.dumps({'enviado_em': carimbo, **alerta}, ensure_ascii=False) + "\n")
+
+
+def notificar_webhook(alertas, url):
+    """Envia os alertas num único POST JSON (campo 'text' compatível com Slack/Teams/Discord)."""
+    corpo = json.dumps({
+        'text': "\n".join(formatar_alerta(a) for a in alertas),
+        'alertas': alertas,
+    }, ensure_ascii=False).encode('utf-8')
+    requisicao = urllib.request.Request(
+        url, data=corpo, headers={'Content-Type': 'application/json'}, method='POST')
+    with urllib.request.urlopen(requisicao, timeout=10):
+        pass
+
+
+def notificar_email(alertas, config):
+    """Envia um único e-mail com todos os alertas via SMTP (STARTTLS)."""
+    mensagem = EmailMessage()
+    mensagem['Subject'] = f"[Tracker Tasks] {len(alertas)} alerta(s) de prazo"
+    mensagem['From'] = config['remetente']
+    mensagem['To'] = ", ".join(config['destinatarios'])
+    mensagem.set_content("\n".join(formatar_alerta(a) for a in alertas))
+    with smtplib.SMTP(config['smtp_host'], int(config.get('smtp_porta', 587)), timeout=10) as smtp:
+        smtp.starttls()
+        if config.get('smtp_usuario'):
+            smtp.login(config['smtp_usuario'], config['smtp_senha'])
+        smtp.send_message(mensagem)
+
+
+def criar_notificador(config=None):
+    """
+    Função de envio conforme config['canal']: "local" (padrão), "webhook" ou "email".
+    """
+    config = dict(config or {})
+    canal = config.get('canal', 'local')
+    if canal == 'webhook':
+        return lambda alertas: notificar_webhook(alertas, config['url'])
+    if canal == 'email':
+        return lambda alertas: notificar_email(alertas, config)
+    return lambda alertas: notificar_local(alertas, config.get('arquivo', ARQUIVO_ALERTAS_LOCAL))
+
+
+# --- AGENDADOR EM SEGUNDO PLANO ---
+def executar_ciclo_alertas(agendador, carregar_tarefas, notificar):
+    """Recarrega as tarefas, sincroniza o índice e notifica os cruzamentos de faixa."""
+    df_tarefas = carregar_tarefas()
+    agora = datetime.now()
+    with agendador['trava']:
+        if agendador['indice'] is None:
+            agendador['indice'] = criar_indice_prazos(df_tarefas, agora, agendador['dias_alerta'])
+        else:
+            sincronizar_indice_prazos(agendador['indice'], df_tarefas, agora)
+        alertas = avancar_prazos(agendador['indice'], agora)
+    if alertas:
+        notificar(alertas)
+        agendador['enviados'] += len(alertas)
+    agendador['ultima_execucao'] = agora
+    agendador['ultimo_erro'] = None
+    return alertas
+
+
+def iniciar_agendador(carregar_tarefas, notificar, intervalo=INTERVALO_ALERTAS,
+                      dias_alerta=DIAS_ALERTA_PRAZO):
+    """
+    Inicia uma thread daemon que, a cada `intervalo` segundos (ou antes, se o
+    próximo limiar do heap vencer antes disso), executa um ciclo de alertas.
+    Tarefas já atrasadas na primeira carga não geram alerta.
+
+    Args:
+        carregar_tarefas: Função sem argumentos que devolve o DataFrame de tarefas
+        notificar: Função que recebe a lista de alertas (ver criar_notificador)
+
+    Returns:
+        dict: Estado do agendador ('indice', 'parar', 'ultima_execucao', 'ultimo_erro'...)
+    """
+    agendador = {'indice': None, 'dias_alerta': dias_alerta, 'trava': threading.Lock(),
+                 'parar': threading.Event(), 'ultima_execucao': None, 'ultimo_erro': None,
+                 'enviados': 0}
+
+    def laco():
+        while not agendador['parar'].is_set():
+            try:
+                executar_ciclo_alertas(agendador, carregar_tarefas, notificar)
+            except Exception as e:
+                agendador['ultimo_erro'] = str(e)
+            espera = intervalo
+            disparo = proximo_disparo(agendador['indice']) if agendador['indice'] else None
+            if disparo is not None:
+                espera = min(intervalo, max((disparo - pd.Timestamp(datetime.now())).total_seconds(), 1))
+            agendador['parar'].wait(espera)
+
+    agendador['thread'] = threading.Thread(target=laco, name="alertas-prazo", daemon=True)
+    agendador['thread'].start()
+    return agendador
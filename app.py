@@ -1,12 +1,41 @@
+import re
+import copy
 import time
-import random
+import threading
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+from collections import OrderedDict
 from datetime import datetime
 import os
+import json
 import gspread
-from google.oauth2.service_account import Credentials
+from dados import (
+    ErroPlanilha, ARQUIVO_CREDENCIAIS, COLUNAS_KANBAN, PRIORIDADES,
+    COLUNAS_OBRIGATORIAS, COLUNAS_LOGS, COLUNAS_ARQUIVO, PASTA_SNAPSHOTS, DIAS_ARQUIVAMENTO,
+    CAMPOS_BUSCA, SCHEMA_TAREFAS, SCHEMA_LOGS,
+    montar_quadros, autorizar_cliente, abrir_aba_tarefas, abrir_aba_auxiliar,
+    validar_estrutura_planilha, valores_para_dataframe, ler_abas_em_lote,
+    preparar_dataframe_logs, converter_tipos_tarefas, preparar_dataframe_arquivo,
+    montar_linhas_log, gravar_linhas_log, gravar_campos_em_lote, gerar_id_unico,
+    contar_linhas_com_id, anexar_tarefa, criar_dados_iniciais, salvar_tarefas,
+    tabela_em_bytes, exportar_snapshot, listar_snapshots,
+    ler_tabela_parquet, carregar_snapshot, carregar_ultimo_snapshot, alteracoes_restauracao,
+    criar_estado_analytics, atualizar_analytics, resumo_analytics,
+    atualizar_checkpoints, reconstruir_estado, comparar_estado_com_planilha,
+    normalizar_texto, criar_indice_busca, indexar_tarefa, buscar_tarefas,
+    buscar_logs_novos, remover_logs_conhecidos, aplicar_logs_nas_tarefas,
+    formatar_para_planilha, datas_conclusao, selecionar_para_arquivar,
+    mover_para_aba_arquivo, carregar_quadro, carregar_tarefas,
+    verificar_integridade, planejar_reparos, aplicar_reparos, versao_dados, prever_entregas,
+    COLUNAS_SOB_DEMANDA, ler_coluna_por_id, ler_campo_da_linha,
+    logs_reversiveis, ultimo_lote, acao_reversao, planejar_reversao, aplicar_reversao,
+)
+from alertas import (
+    DIAS_ALERTA_PRAZO, CORES_FAIXA_PRAZO, INTERVALO_ALERTAS, criar_indice_prazos,
+    sincronizar_indice_prazos, avancar_prazos, contar_faixas, criar_notificador,
+    iniciar_agendador,
+)
 
 # --- CONFIGURAÇÃO DA PÁGINA ---
 st.set_page_config(
@@ -17,45 +46,34 @@ st.set_page_config(
 )
 
 # --- CONSTANTES E SETUP ---
-NOME_PLANILHA = "Tasks Devs"
-ARQUIVO_CREDENCIAIS = "credentials.json"
-NOME_ABA_LOGS = "Logs"
-
-COLUNAS_KANBAN = ["Backlog/A Fazer",
-                  "Em Desenvolvimento", "Code Review/QA", "Concluído"]
-DESENVOLVEDORES = ["Eduardo", "Israel", "Pedro", "Vinícius"]
-TIPOS_TAREFA = ["Feature (Nova Funcionalidade)",
-                "Bugfix (Correção)", "Refatoração", "Infraestrutura"]
-PRIORIDADES = ["🔴 Urgente", "🟡 Alta", "🟢 Média", "⚪ Baixa"]
-
-COLUNAS_OBRIGATORIAS = ['id', 'titulo', 'descricao', 'responsavel', 'status', 'tipo',
-                        'prioridade', 'data_entrega', 'progresso', 'data_criacao']
-
-SCOPES = [
-    "https://www.googleapis.com/auth/spreadsheets",
-    "https://www.googleapis.com/auth/drive"
-]
-
-def obter_spreadsheet():
-    sheet = conectar_google_sheets()
-    return sheet.spreadsheet
+INTERVALO_SINCRONIZACAO = 30  # Segundos entre verificações de novas linhas de log
+MAX_QUADROS_EM_CACHE = 3  # Quadros mantidos em memória por sessão (LRU)
+INTERVALO_ACOMPANHAMENTO = 1  # Segundos entre verificações da recarga em segundo plano
+
+# Página que costuma ser aberta em seguida (até haver histórico de navegação na sessão)
+PROXIMA_PAGINA_PADRAO = {"Dashboard": "Quadro Kanban", "Quadro Kanban": "Dashboard",
+                         "Nova Demanda": "Quadro Kanban", "Histórico": "Dashboard",
+                         "Configurações": "Dashboard"}
+
+# Dados da sessão que pertencem ao quadro ativo (trocados ao mudar de quadro)
+CHAVES_SESSAO_QUADRO = ['df_tarefas', 'df_logs', 'df_arquivo', 'total_logs_planilha',
+                        'ultima_sincronizacao', 'origem_dados', 'indice_busca',
+                        'analytics', 'checkpoints_eventos', 'integridade',
+                        'resultado_integridade', 'indice_prazos', 'previsao', 'linha_por_id',
+                        'prefetch_feito', 'ultima_linha_log', 'dados_somente_leitura']
+
+@st.cache_resource(ttl=3600, max_entries=MAX_QUADROS_EM_CACHE * 2)
+def obter_worksheet_auxiliar(nome_planilha, nome_aba, colunas):
+    """Abre (ou cria com cabeçalhos) uma aba auxiliar da planilha do quadro."""
+    return abrir_aba_auxiliar(abrir_worksheet_quadro(nome_planilha).spreadsheet, nome_aba, colunas)
 
 def obter_worksheet_logs():
-    ss = obter_spreadsheet()
-    try:
-        ws = ss.worksheet(NOME_ABA_LOGS)
-    except gspread.exceptions.WorksheetNotFound:
-        ws = ss.add_worksheet(title=NOME_ABA_LOGS, rows=1, cols=7)
-        ws.update([[
-            "timestamp",
-            "acao",
-            "task_id",
-            "campo",
-            "valor_antigo",
-            "valor_novo",
-            "usuario"
-        ]])
-    return ws
+    quadro = quadro_ativo()
+    return obter_worksheet_auxiliar(quadro['planilha'], quadro['aba_logs'], tuple(COLUNAS_LOGS))
+
+def obter_worksheet_arquivo():
+    quadro = quadro_ativo()
+    return obter_worksheet_auxiliar(quadro['planilha'], quadro['aba_arquivo'], tuple(COLUNAS_ARQUIVO))
 
 def obter_usuario_atual():
     try:
@@ -63,309 +81,340 @@ def obter_usuario_atual():
     except Exception:
         return "Desconhecido"
 
+def obter_config(chave, padrao=None):
+    """Lê uma opção dos Secrets e, na falta deles, da variável de ambiente TRACKER_<CHAVE>."""
+    valor_env = os.environ.get(f"TRACKER_{chave.upper()}", padrao)
+    try:
+        return st.secrets.get(chave, valor_env)
+    except Exception:
+        return valor_env
+
 def registrar_logs(acao, task_id, alteracoes, usuario=None):
-    ws = obter_worksheet_logs()
+    registrar_logs_em_lote(acao, {task_id: alteracoes}, usuario)
+
+def registrar_logs_em_lote(acao, alteracoes_por_tarefa, usuario=None):
+    """Grava os logs de várias tarefas com um único append_rows."""
     if usuario is None:
         usuario = obter_usuario_atual()
-    linhas = []
-    ts = datetime.now().isoformat()
-    for campo, par in alteracoes.items():
-        antigo, novo = par
-        linhas.append([ts, acao, str(task_id), campo, str(antigo) if antigo is not None else "", str(novo) if novo is not None else "", usuario])
-    try:
-        ws.append_rows(linhas, value_input_option="USER_ENTERED")
-    except Exception:
-        for linha in linhas:
-            ws.append_row(linha, value_input_option="USER_ENTERED")
+    linhas = montar_linhas_log(acao, alteracoes_por_tarefa, usuario)
+    if not linhas:
+        return
+    gravar_linhas_log(obter_worksheet_logs(), linhas)
+    anexar_logs_sessao(linhas)
+
+
+def anexar_logs_sessao(linhas):
+    """
+    Mantém o DataFrame de logs da sessão em dia com as linhas recém gravadas,
+    evitando reler a aba de Logs inteira só para exibir o Histórico.
+    """
+    if 'df_logs' not in st.session_state:
+        return
+    novas = preparar_dataframe_logs([COLUNAS_LOGS] + linhas)
+    st.session_state.df_logs = pd.concat(
+        [st.session_state.df_logs, novas], ignore_index=True)
+    # Contador de gravações: recargas em segundo plano iniciadas antes ficam desatualizadas
+    st.session_state.escritas_sessao = st.session_state.get('escritas_sessao', 0) + 1
+
+
+# --- QUADROS (MULTI-EQUIPE) ---
+def carregar_quadros():
+    """
+    Lê as definições de quadros dos Secrets (`[[quadros]]`) ou de um JSON em
+    TRACKER_QUADROS. Sem configuração, usa um único quadro com as constantes padrão.
+
+    Returns:
+        OrderedDict: {nome: definição completa do quadro}
+    """
+    definicoes = obter_config("quadros", None)
+    if isinstance(definicoes, str):
+        try:
+            definicoes = json.loads(definicoes)
+        except ValueError:
+            st.warning("Configuração de quadros inválida; usando o quadro padrão.")
+            definicoes = None
+    return montar_quadros(definicoes)
+
+
+def quadro_ativo():
+    """Definição do quadro selecionado nesta sessão (o primeiro, por padrão)."""
+    quadros = carregar_quadros()
+    nome = st.session_state.get('quadro_ativo')
+    return quadros.get(nome) or next(iter(quadros.values()))
+
+
+def trocar_quadro(novo_nome):
+    """
+    Troca o quadro ativo guardando os dados do atual num cache LRU da sessão.
+    Quadros fora do cache são carregados sob demanda na próxima execução.
+    """
+    atual = quadro_ativo()['nome']
+    if novo_nome == atual:
+        return
+
+    cache = st.session_state.setdefault('cache_quadros', OrderedDict())
+    cache[atual] = {k: st.session_state[k] for k in CHAVES_SESSAO_QUADRO if k in st.session_state}
+    cache.move_to_end(atual)
+
+    for chave in CHAVES_SESSAO_QUADRO:
+        st.session_state.pop(chave, None)
+    st.session_state.update(cache.pop(novo_nome, {}))
+    st.session_state.quadro_ativo = novo_nome
+
+    while len(cache) > MAX_QUADROS_EM_CACHE - 1:
+        cache.popitem(last=False)  # Descarta o quadro usado há mais tempo
 
 
 # --- CACHE DE CONEXÃO ---
 @st.cache_resource(ttl=3600)  # Cache por 1 hora
-def conectar_google_sheets():
+def obter_cliente_gspread():
     """
-    Estabelece conexão com o Google Sheets usando Service Account.
+    Autoriza UMA vez o cliente gspread com a Service Account.
+    O cliente (e seu pool de conexões HTTP) é compartilhado por todos os quadros.
     """
     try:
-        if "gcp_service_account" in st.secrets:
-            creds_dict = st.secrets["gcp_service_account"]
-            credentials = Credentials.from_service_account_info(
-                creds_dict, scopes=SCOPES)
-        elif os.path.exists(ARQUIVO_CREDENCIAIS):
-            credentials = Credentials.from_service_account_file(
-                ARQUIVO_CREDENCIAIS, scopes=SCOPES)
-        else:
-            st.error(
-                "Nenhuma credencial encontrada! Configure os Secrets (na nuvem) ou adicione 'credentials.json' (local).")
-            st.stop()
-
-        client = gspread.authorize(credentials)
+        info = st.secrets["gcp_service_account"] if "gcp_service_account" in st.secrets else None
+        return autorizar_cliente(info, ARQUIVO_CREDENCIAIS)
+    except Exception as e:
+        st.error(f"Erro ao conectar no Google Sheets: {e}")
+        st.stop()
 
-        try:
-            sheet = client.open(NOME_PLANILHA).sheet1
-            return sheet
-        except gspread.SpreadsheetNotFound:
-            st.error(
-                f"Planilha '{NOME_PLANILHA}' não encontrada! Verifique se o nome está exato e se compartilhou com o email da service account.")
-            st.stop()
-        except gspread.exceptions.APIError as e:
-            if "Google Drive API has not been used" in str(e):
-                st.error(
-                    "ERRO DE API: A 'Google Drive API' não está ativada no seu projeto do Google Cloud.")
-                st.markdown(
-                    "[Clique aqui para ativar a Google Drive API](https://console.cloud.google.com/apis/library/drive.googleapis.com)")
-                st.stop()
-            else:
-                raise e
 
+@st.cache_resource(ttl=3600, max_entries=MAX_QUADROS_EM_CACHE)
+def abrir_worksheet_quadro(nome_planilha, nome_aba=None):
+    """
+    Abre a aba de tarefas de um quadro usando o cliente compartilhado.
+    Mantém em cache apenas os quadros usados mais recentemente.
+    """
+    try:
+        return abrir_aba_tarefas(
+            obter_cliente_gspread(), {'planilha': nome_planilha, 'aba': nome_aba})
+    except ErroPlanilha as e:
+        st.error(str(e))
+        if str(e).startswith("ERRO DE API"):
+            st.markdown(
+                "[Clique aqui para ativar a Google Drive API](https://console.cloud.google.com/apis/library/drive.googleapis.com)")
+        st.stop()
     except Exception as e:
         st.error(f"Erro ao conectar no Google Sheets: {e}")
         st.stop()
 
 
-# --- TRATAMENTO DE DADOS VAZIOS E VALIDAÇÃO ---
-def validar_estrutura_planilha(df):
+def conectar_google_sheets():
+    """
+    Retorna a aba de tarefas do quadro ativo.
+    """
+    quadro = quadro_ativo()
+    return abrir_worksheet_quadro(quadro['planilha'], quadro['aba'])
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def obter_cabecalhos_tarefas(nome_planilha, nome_aba=None):
     """
-    Valida se o DataFrame possui todas as colunas obrigatórias.
-    Retorna (bool, lista_colunas_faltantes)
+    Cabeçalho da aba de tarefas, guardado para que as cargas seguintes
+    leiam só as colunas necessárias (ver ler_abas_em_lote).
     """
-    colunas_faltantes = [
-        col for col in COLUNAS_OBRIGATORIAS if col not in df.columns]
-    return len(colunas_faltantes) == 0, colunas_faltantes
+    return abrir_worksheet_quadro(nome_planilha, nome_aba).row_values(1)
+
 
+def cabecalhos_quadro_ativo():
+    quadro = quadro_ativo()
+    return obter_cabecalhos_tarefas(quadro['planilha'], quadro['aba'])
 
-def carregar_dados():
+
+# --- CARGA DOS DADOS ---
+def carregar_dados_completos():
     """
-    Carrega os dados da Planilha do Google com validação robusta.
-    Detecta dados vazios, colunas faltantes e estrutura corrompida.
+    Carrega tarefas, logs e arquivo da Planilha do Google em uma única ida à API.
+    Planilha vazia recebe os dados iniciais; colunas faltantes são
+    acrescentadas ao cabeçalho, preservando os dados existentes.
+
+    Returns:
+        tuple: (df_tarefas, df_logs, df_arquivo)
     """
     sheet = conectar_google_sheets()
 
     try:
-        dados = sheet.get_all_records()
+        # Textos longos (descrição) ficam fora da carga: são lidos sob demanda
+        cabecalhos = cabecalhos_quadro_ativo()
+        df_tarefas, df_logs, df_arquivo = carregar_quadro(
+            sheet, quadro_ativo(), cabecalhos, COLUNAS_SOB_DEMANDA, completar_cabecalho=True)
     except Exception as e:
+        # Falha de leitura não é planilha vazia: nada é sobrescrito
+        st.error(f"Erro ao ler planilha: {e}")
+        st.stop()
+
+    lidas = df_tarefas.attrs['cabecalho_lido']
+    omitidas = [c for c in COLUNAS_SOB_DEMANDA if c in cabecalhos and c not in lidas]
+    colunas_adicionadas = df_tarefas.attrs['colunas_adicionadas']
+    if colunas_adicionadas or (lidas and not omitidas and lidas != cabecalhos):
+        obter_cabecalhos_tarefas.clear()  # Cabeçalho mudou: renova o cache
+    if colunas_adicionadas:
+        st.warning(f"Colunas faltantes na planilha adicionadas ao cabeçalho: {', '.join(colunas_adicionadas)}.")
+    if df_tarefas.attrs['linhas_ignoradas']:
+        # Linhas sem ID válido ficam fora da sessão, mas continuam na planilha
         st.warning(
-            f"Erro ao ler planilha: {e}. Criando estrutura inicial...")
-        return criar_dados_iniciais(sheet)
+            f"{df_tarefas.attrs['linhas_ignoradas']} linha(s) sem ID válido foram ignoradas. "
+            "Use **Configurações → Integridade** para corrigi-las.")
 
-    # Caso 1: Planilha completamente vazia
-    if not dados or len(dados) == 0:
+    if df_tarefas.empty and not df_tarefas.attrs['linhas_ignoradas']:
         st.info("Planilha vazia detectada. Inicializando com dados padrão...")
-        return criar_dados_iniciais(sheet)
+        df_tarefas = inicializar_planilha()
+    return df_tarefas, df_logs, df_arquivo
 
-    df = pd.DataFrame(dados)
 
-    # Caso 2: Planilha tem dados mas está com estrutura incorreta
-    estrutura_valida, colunas_faltantes = validar_estrutura_planilha(df)
+def recarregar_sessao():
+    """Recarrega tarefas, logs e arquivo na sessão com uma única leitura em lote."""
+    aplicar_dados_sessao(*carregar_dados_completos())
 
-    if not estrutura_valida:
-        st.error(
-            f"Estrutura da planilha inválida! Colunas faltantes: {', '.join(colunas_faltantes)}")
-        st.warning("Recriando estrutura padrão...")
-        return criar_dados_iniciais(sheet)
 
-    # Caso 3: Validação de tipos de dados críticos
-    try:
-        # Garante que ID seja numérico
-        df['id'] = pd.to_numeric(df['id'], errors='coerce')
-        df = df.dropna(subset=['id'])  # Remove linhas com ID inválido
-
-        # Garante que progresso seja numérico
-        df['progresso'] = pd.to_numeric(
-            df['progresso'], errors='coerce').fillna(0)
+def aplicar_dados_sessao(df_tarefas, df_logs, df_arquivo, origem="Google Sheets", carregado_em=None,
+                         somente_leitura=False):
+    """
+    Coloca na sessão os dados do quadro ativo. Dados recém-lidos da planilha
+    também ficam guardados para as próximas sessões (ver ultimos_dados_por_quadro).
 
-        # Garante que datas sejam válidas
-        df['data_entrega'] = pd.to_datetime(
-            df['data_entrega'], errors='coerce')
-        df['data_criacao'] = pd.to_datetime(
-            df['data_criacao'], errors='coerce')
+    Args:
+        somente_leitura: Dados que não vieram da planilha (snapshot restaurado,
+                         arquivo importado): bloqueiam as gravações até a próxima recarga
+    """
+    carregado_em = carregado_em or datetime.now()
+    st.session_state.df_tarefas = df_tarefas
+    st.session_state.df_logs = df_logs
+    st.session_state.df_arquivo = df_arquivo
+    st.session_state.total_logs_planilha = df_logs.attrs.get('linhas_planilha', len(df_logs))
+    st.session_state.ultima_linha_log = df_logs.attrs.get('ultima_linha')
+    st.session_state.linha_por_id = df_tarefas.attrs.get('linha_por_id', {})
+    st.session_state.ultima_sincronizacao = carregado_em
+    st.session_state.origem_dados = origem
+    st.session_state.dados_somente_leitura = somente_leitura
+    invalidar_indices_sessao()
+    if origem == "Google Sheets":
+        guardar_ultimos_dados(quadro_ativo()['nome'], (df_tarefas, df_logs, df_arquivo), carregado_em)
+
+
+def exigir_dados_da_planilha():
+    """Interrompe a execução antes de gravar se a sessão exibe dados somente leitura."""
+    if st.session_state.get('dados_somente_leitura'):
+        st.error("Os dados em tela são somente leitura. Volte aos dados da planilha para editar.")
+        st.stop()
 
-        # Remove linhas completamente inválidas
-        if df.empty:
-            st.warning("Dados corrompidos detectados. Reinicializando...")
-            return criar_dados_iniciais(sheet)
 
-    except Exception as e:
-        st.error(f"Erro na validação de dados: {e}")
-        return criar_dados_iniciais(sheet)
+def completar_descricoes(df, descricoes=None):
+    """
+    Preenche as descrições ainda não lidas com UMA leitura da coluna (IDs + descrição).
 
+    Args:
+        descricoes: {id: descrição} já lido (senão, lê a coluna da planilha)
+    """
+    faltantes = df['descricao'].isna()
+    if not faltantes.any():
+        return df
+    if descricoes is None:
+        descricoes = ler_coluna_por_id(conectar_google_sheets(), cabecalhos_quadro_ativo(), 'descricao')
+    df = df.copy()
+    df.loc[faltantes, 'descricao'] = df.loc[faltantes, 'id'].astype(str).map(descricoes).fillna("")
     return df
 
 
-def criar_dados_iniciais(sheet):
+def garantir_descricoes():
+    """Completa as descrições da sessão antes de usos que precisam do texto (busca, exportação...)."""
+    st.session_state.df_tarefas = completar_descricoes(st.session_state.df_tarefas)
+
+
+def obter_descricao(task_id):
     """
-    Cria dados fictícios e salva na planilha se ela estiver vazia ou corrompida.
+    Descrição de uma tarefa, lida da planilha só quando o card é aberto:
+    uma leitura pontual pela linha conhecida, ou a coluna inteira se a linha mudou.
     """
-    dados = {
-        "id": [1, 2, 3, 4, 5],
-        "titulo": ["Landing Page Vestibular", "Correção Menu Mobile", "API de Notas", "Otimização de SEO", "Migração de Servidor"],
-        "descricao": ["Criar página responsiva para captação de alunos", "Ajustar menu collapse no mobile", "Desenvolver API REST para consulta de notas", "Melhorar ranqueamento no Google", "Migrar para servidor AWS"],
-        "responsavel": ["Pedro", "Israel", "Vinícius", "Eduardo", "Pedro"],
-        "status": ["Concluído", "Em Desenvolvimento", "Code Review/QA", "Backlog/A Fazer", "Backlog/A Fazer"],
-        "tipo": ["Feature (Nova Funcionalidade)", "Bugfix (Correção)", "Feature (Nova Funcionalidade)", "Refatoração", "Infraestrutura"],
-        "prioridade": ["🟢 Média", "🔴 Urgente", "🟡 Alta", "⚪ Baixa", "🟡 Alta"],
-        "data_entrega": ["2025-12-01", "2025-11-25", "2025-11-30", "2025-12-15", "2026-01-10"],
-        "progresso": [100, 60, 90, 0, 10],
-        "data_criacao": [datetime.now().strftime("%Y-%m-%d")] * 5
-    }
-    df = pd.DataFrame(dados)
+    df = st.session_state.df_tarefas
+    mascara = df['id'].astype(str) == str(task_id)
+    atual = df.loc[mascara, 'descricao']
+    if atual.empty or atual.notna().all():
+        return atual.iloc[0] if not atual.empty else ""
+
+    linha = st.session_state.get('linha_por_id', {}).get(str(task_id))
+    texto = None
+    if linha is not None:
+        texto = ler_campo_da_linha(
+            conectar_google_sheets(), cabecalhos_quadro_ativo(), linha, task_id, 'descricao')
+    if texto is None:
+        garantir_descricoes()
+        return st.session_state.df_tarefas.loc[mascara, 'descricao'].iloc[0]
+    df.loc[mascara, 'descricao'] = texto
+    return texto
+
+
+def invalidar_indices_sessao():
+    """Descarta estruturas derivadas de df_tarefas (recriadas sob demanda)."""
+    st.session_state.pop('indice_busca', None)
+    st.session_state.pop('prefetch_feito', None)
+
+
+def inicializar_planilha():
+    """
+    Grava os dados fictícios iniciais na planilha vazia.
+    """
+    df = criar_dados_iniciais()
     salvar_dados_completo(df)
     st.success("Estrutura inicial criada com sucesso!")
-    return df
+    return converter_tipos_tarefas(df)
 
 
 # --- SINCRONIZAÇÃO INCREMENTAL ---
-def atualizar_celula_especifica(task_id, campo, novo_valor):
+def atualizar_multiplas_celulas(task_id, campos_valores):
     """
+    Atualiza vários campos de uma tarefa (edição do card) pela mesma escrita
+    em lote da edição em massa e do CLI.
+
     Args:
-        task_id: ID da tarefa a ser atualizada
-        campo: Nome da coluna a ser modificada
-        novo_valor: Novo valor a ser inserido
+        task_id: ID da tarefa
+        campos_valores: Dicionário {campo: novo_valor}
     """
-    try:
-        sheet = conectar_google_sheets()
-
-        # Busca a linha correspondente ao ID
-        cell_id = sheet.find(str(task_id))
-
-        if not cell_id:
-            st.error(f"Tarefa ID {task_id} não encontrada na planilha!")
-            return False
-
-        # Descobre qual coluna modificar
-        headers = sheet.row_values(1)  # Primeira linha = cabeçalhos
-
-        if campo not in headers:
-            st.error(f"Campo '{campo}' não existe na planilha!")
-            return False
-
-        col_index = headers.index(campo) + 1  # gspread usa índice 1-based
-        row_index = cell_id.row
-
-        valor_antigo = sheet.cell(row_index, col_index).value
-        sheet.update_cell(row_index, col_index, str(novo_valor))
-        registrar_logs("atualizacao", task_id, {campo: (valor_antigo, novo_valor)})
-        return True
+    atualizados, nao_encontrados = atualizar_tarefas_em_lote({task_id: campos_valores})
+    if nao_encontrados:
+        st.error(f"Tarefa ID {task_id} não encontrada na planilha!")
+    return bool(atualizados)
 
-    except Exception as e:
-        st.error(f"Erro na atualização incremental: {e}")
-        return False
 
-
-def atualizar_multiplas_celulas(task_id, campos_valores):
+def atualizar_tarefas_em_lote(campos_por_tarefa):
     """
-    Atualiza múltiplas células de uma mesma linha de forma eficiente.
+    Atualiza várias tarefas com UM batch_update e UM append de logs.
 
     Args:
-        task_id: ID da tarefa
-        campos_valores: Dicionário {campo: novo_valor}
+        campos_por_tarefa: Dicionário {task_id: {campo: novo_valor}}
+
+    Returns:
+        tuple: (ids_atualizados, ids_nao_encontrados)
     """
+    exigir_dados_da_planilha()
     try:
         sheet = conectar_google_sheets()
-        cell_id = sheet.find(str(task_id))
-
-        if not cell_id:
-            return False
-
-        headers = sheet.row_values(1)
-        row_index = cell_id.row
-        linha_atual = sheet.row_values(row_index)
-        mapa_antigo = {}
-        for i, h in enumerate(headers):
-            v = linha_atual[i] if i < len(linha_atual) else ""
-            mapa_antigo[h] = v
-
-        # Prepara lista de atualizações em lote
-        updates = []
-        for campo, valor in campos_valores.items():
-            if campo in headers:
-                col_index = headers.index(campo) + 1
-                updates.append({
-                    'range': f'{gspread.utils.rowcol_to_a1(row_index, col_index)}',
-                    'values': [[str(valor)]]
-                })
-
-        # Executa todas as atualizações de uma vez (batch update)
-        if updates:
-            sheet.batch_update(updates)
-        alteracoes = {}
-        for campo, valor in campos_valores.items():
-            if campo in headers:
-                alteracoes[campo] = (mapa_antigo.get(campo), valor)
-        if alteracoes:
-            registrar_logs("atualizacao", task_id, alteracoes)
-        return True
+        alteracoes, nao_encontrados = gravar_campos_em_lote(sheet, campos_por_tarefa)
+        if not alteracoes:
+            return [], nao_encontrados
+
+        registrar_logs_em_lote("atualizacao", alteracoes)
+        for task_id, campos_valores in alteracoes.items():
+            sincronizar_indice_busca(task_id, {c: v for c, (_, v) in campos_valores.items()})
+
+        return list(alteracoes), nao_encontrados
 
     except Exception as e:
-        st.error(f"Erro na atualização em lote: {e}")
-        return False
+        st.error(f"Erro na atualização em massa: {e}")
+        return [], []
 
 
 def gerar_id_atomico_com_retry(max_tentativas=5):
     """
-    Gera ID único consultando DIRETAMENTE a planilha (não o cache local).
-    Implementa retry com backoff exponencial para evitar race conditions.
+    Gera ID único consultando DIRETAMENTE a planilha (não o cache local),
+    com retry e backoff exponencial (ver dados.gerar_id_unico).
 
     Returns:
         int: ID único e seguro
-
-    Raises:
-        Exception: Se falhar após todas as tentativas
     """
-    for tentativa in range(1, max_tentativas + 1):
-        try:
-            # CRÍTICO: Lê diretamente da planilha (não usa session_state)
-            sheet = conectar_google_sheets()
-
-            # Pega TODOS os IDs da coluna 'id' (coluna A)
-            # row_values(1) = cabeçalhos
-            # col_values(1) = todos os valores da coluna A
-            coluna_ids = sheet.col_values(1)  # ['id', '1', '2', '3', ...]
-
-            # Remove o cabeçalho e converte para int
-            ids_existentes = []
-            for valor in coluna_ids[1:]:  # Pula o cabeçalho
-                try:
-                    ids_existentes.append(int(valor))
-                except (ValueError, TypeError):
-                    continue  # Ignora valores inválidos
-
-            # Gera o próximo ID
-            if ids_existentes:
-                novo_id = max(ids_existentes) + 1
-            else:
-                novo_id = 1
-
-            # Valida se o ID é único (dupla verificação)
-            if novo_id in ids_existentes:
-                raise ValueError(
-                    f"ID {novo_id} já existe! Tentando novamente...")
-
-            return novo_id
-
-        except gspread.exceptions.APIError as e:
-            if "RATE_LIMIT_EXCEEDED" in str(e):
-                # Backoff exponencial com jitter
-                delay = (2 ** tentativa) + random.uniform(0, 1)
-                st.warning(
-                    f"Rate limit atingido. Aguardando {delay:.1f}s (tentativa {tentativa}/{max_tentativas})...")
-                time.sleep(delay)
-                continue
-            else:
-                raise e
-
-        except Exception as e:
-            if tentativa < max_tentativas:
-                delay = 0.5 * tentativa + random.uniform(0, 0.5)
-                st.warning(
-                    f"Erro ao gerar ID (tentativa {tentativa}/{max_tentativas}): {e}")
-                time.sleep(delay)
-                continue
-            else:
-                st.error(
-                    f"Falha ao gerar ID após {max_tentativas} tentativas: {e}")
-                raise e
-
-    raise Exception("Falha ao gerar ID único após todas as tentativas")
+    obter_worksheet_arquivo()  # IDs do Arquivo seguem reservados: garante a aba
+    return gerar_id_unico(conectar_google_sheets(), quadro_ativo()['aba_arquivo'], max_tentativas)
 
 
 def validar_id_unico(task_id):
@@ -379,25 +428,16 @@ def validar_id_unico(task_id):
         bool: True se único, False se duplicado
     """
     try:
-        sheet = conectar_google_sheets()
-
-        # Busca todas as ocorrências do ID
-        cells = sheet.findall(str(task_id))
-
-        # Remove o cabeçalho da contagem
-        ocorrencias = [c for c in cells if c.row > 1]
-
-        if len(ocorrencias) > 1:
-            st.error(
-                f"ID {task_id} DUPLICADO! Encontradas {len(ocorrencias)} ocorrências.")
-            return False
-
-        return True
-
+        ocorrencias = contar_linhas_com_id(conectar_google_sheets(), task_id)
     except Exception as e:
         st.warning(f"Não foi possível validar unicidade do ID: {e}")
         return True  # Assume válido em caso de erro na validação
 
+    if ocorrencias > 1:
+        st.error(f"ID {task_id} DUPLICADO! Encontradas {ocorrencias} ocorrências.")
+        return False
+    return True
+
 
 def adicionar_tarefa_incremental_com_validacao(nova_tarefa_dict, validar_pos_insercao=True):
     """
@@ -411,23 +451,7 @@ def adicionar_tarefa_incremental_com_validacao(nova_tarefa_dict, validar_pos_ins
         bool: True se sucesso, False se falhou
     """
     try:
-        sheet = conectar_google_sheets()
-
-        # Obtém os cabeçalhos da planilha (primeira linha)
-        headers = sheet.row_values(1)
-
-        if not headers:
-            st.error("Planilha sem cabeçalhos! Impossível adicionar tarefa.")
-            return False
-
-        # Cria a linha na MESMA ORDEM dos cabeçalhos da planilha
-        nova_linha = []
-        for coluna in headers:
-            valor = nova_tarefa_dict.get(coluna, '')
-            nova_linha.append(str(valor))
-
-        # Adiciona a linha no final da planilha
-        sheet.append_row(nova_linha, value_input_option='USER_ENTERED')
+        headers = anexar_tarefa(conectar_google_sheets(), nova_tarefa_dict)
         registrar_logs("criacao", nova_tarefa_dict.get('id'), {k: (None, nova_tarefa_dict.get(k)) for k in headers})
 
         # VALIDAÇÃO PÓS-INSERÇÃO (Opcional mas recomendado)
@@ -437,11 +461,13 @@ def adicionar_tarefa_incremental_com_validacao(nova_tarefa_dict, validar_pos_ins
             if not validar_id_unico(nova_tarefa_dict['id']):
                 st.error(
                     f"CONFLITO DETECTADO! ID {nova_tarefa_dict['id']} foi duplicado.")
-                # Aqui você pode implementar lógica de rollback se necessário
                 return False
 
         return True
 
+    except ErroPlanilha as e:
+        st.error(str(e))
+        return False
     except gspread.exceptions.APIError as e:
         st.error(f"Erro da API do Google: {e}")
         return False
@@ -461,6 +487,7 @@ def adicionar_tarefa_com_fallback(nova_tarefa_dict):
     Returns:
         bool: True se sucesso (qualquer método), False se ambos falharam
     """
+    exigir_dados_da_planilha()
     # Tentativa 1: Método rápido com validação
     sucesso = adicionar_tarefa_incremental_com_validacao(
         nova_tarefa_dict,
@@ -499,36 +526,643 @@ def salvar_dados_completo(df):
     Salva o DataFrame COMPLETO na Planilha (operação pesada).
     Use apenas quando necessário (criar planilha, reset, etc).
     """
+    if 'descricao' in df.columns:
+        df = completar_descricoes(df)  # Nunca sobrescreve descrições ainda não lidas
+    salvar_tarefas(conectar_google_sheets(), df)
+
+
+# --- SNAPSHOTS COLUNARES (PARQUET) ---
+def pasta_snapshots():
+    """Pasta de snapshots do quadro ativo (subpasta por quadro quando há vários)."""
+    if len(carregar_quadros()) == 1:
+        return PASTA_SNAPSHOTS
+    return os.path.join(PASTA_SNAPSHOTS, re.sub(r"\W+", "_", normalizar_texto(quadro_ativo()['nome'])))
+
+
+def exibir_dados_externos(df_tarefas, df_logs, origem):
+    """Exibe na sessão dados de fora da planilha (snapshot ou arquivo), somente leitura."""
+    st.session_state.pop('revalidacao', None)  # Uma recarga pendente trocaria os dados exibidos
+    aplicar_dados_sessao(df_tarefas, df_logs, st.session_state.df_arquivo,
+                         origem=origem, somente_leitura=True)
+
+
+def gravar_snapshot_na_planilha(carimbo):
+    """
+    Sobrescreve a aba de tarefas com as do snapshot, registrando a restauração
+    nos logs. Tarefas arquivadas depois do snapshot continuam só no Arquivo.
+    """
+    df_snapshot, _ = carregar_snapshot(carimbo, pasta_snapshots())
+    df_atual, _, df_arquivo = carregar_quadro(conectar_google_sheets(), quadro_ativo())
+    df_snapshot = df_snapshot[~df_snapshot['id'].astype(str).isin(df_arquivo['id'].astype(str))]
+    # Snapshots sem descrição mantêm a descrição atual da planilha
+    df_snapshot = completar_descricoes(
+        df_snapshot, dict(zip(df_atual['id'].astype(str), df_atual['descricao'])))
+
+    criadas, alteradas = alteracoes_restauracao(df_atual, df_snapshot)
+    salvar_dados_completo(formatar_para_planilha(df_snapshot))
+    registrar_logs_em_lote("criacao", criadas)
+    registrar_logs_em_lote("restauracao", alteradas)
+    recarregar_sessao()
+
+
+# --- ANALYTICS DO LOG DE AUDITORIA ---
+def obter_analytics():
+    """Atualiza (incrementalmente) o estado de analytics da sessão e retorna o resumo."""
+    estado = st.session_state.get('analytics') or criar_estado_analytics()
+    estado = atualizar_analytics(estado, st.session_state.df_logs)
+    st.session_state.analytics = estado
+    return resumo_analytics(estado, obter_tarefas_com_arquivo())
+
+
+def chave_previsao(tarefas, df_logs):
+    """A previsão vale enquanto os dados não mudam e o dia não vira."""
+    return versao_dados(tarefas, df_logs), datetime.now().date()
+
+
+def obter_previsao():
+    """Previsão de entregas da sessão, recalculada só quando os dados mudam (ou o dia vira)."""
+    tarefas = obter_tarefas_com_arquivo()
+    chave = chave_previsao(tarefas, st.session_state.df_logs)
+    guardada = st.session_state.get('previsao')
+    if guardada is None or guardada[0] != chave:
+        guardada = (chave, prever_entregas(tarefas, st.session_state.df_logs))
+        st.session_state.previsao = guardada
+    return guardada[1]
+
+
+# --- EVENT SOURCING (ESTADO A PARTIR DOS LOGS) ---
+def obter_checkpoints_sessao():
+    """Atualiza e devolve os checkpoints de estado guardados na sessão."""
+    checkpoints = atualizar_checkpoints(
+        st.session_state.get('checkpoints_eventos'), st.session_state.df_logs)
+    st.session_state.checkpoints_eventos = checkpoints
+    return checkpoints
+
+
+# --- BUSCA TEXTUAL (ÍNDICE INVERTIDO) ---
+def obter_indice_busca():
+    """Índice de busca da sessão, construído na primeira utilização."""
+    if 'indice_busca' not in st.session_state:
+        garantir_descricoes()
+        st.session_state.indice_busca = criar_indice_busca(obter_tarefas_com_arquivo())
+    return st.session_state.indice_busca
+
+
+def sincronizar_indice_busca(task_id, campos_valores):
+    """Reindexa a tarefa quando título ou descrição forem alterados/criados."""
+    if 'indice_busca' not in st.session_state or not set(CAMPOS_BUSCA) & set(campos_valores):
+        return
+    df = st.session_state.df_tarefas
+    linha = df[df['id'].astype(str) == str(task_id)]
+    textos = {
+        c: campos_valores.get(c, linha[c].iloc[0] if not linha.empty and c in linha else "")
+        for c in CAMPOS_BUSCA
+    }
+    indexar_tarefa(st.session_state.indice_busca, task_id, textos)
+
+
+# --- ATUALIZAÇÃO AO VIVO (CHANGE-FEED DA ABA DE LOGS) ---
+def sincronizar_alteracoes():
+    """
+    Busca as linhas de log novas e aplica as mudanças na sessão.
+
+    Returns:
+        int: Quantidade de eventos de outros usuários aplicados
+    """
+    if 'revalidacao' in st.session_state:
+        return 0  # A recarga em andamento já traz tudo (inclusive após uma partida a quente)
+    if st.session_state.get('dados_somente_leitura'):
+        return 0  # Snapshot ou arquivo importado: os logs da planilha não se aplicam
+    ws = obter_worksheet_logs()
+    conhecidas = st.session_state.get('total_logs_planilha', len(st.session_state.df_logs))
+    valores = buscar_logs_novos(ws, conhecidas, st.session_state.get('ultima_linha_log'))
+    st.session_state.ultima_sincronizacao = datetime.now()
+    if valores is None:
+        # A aba de Logs foi compactada (cli.py compactar-logs) ou reescrita:
+        # a última linha conhecida mudou, então recarrega tudo em segundo plano
+        iniciar_revalidacao()
+        return 1
+    if not valores:
+        return 0
+
+    st.session_state.total_logs_planilha = conhecidas + len(valores)
+    st.session_state.ultima_linha_log = valores[-1]
+    novos = remover_logs_conhecidos(
+        preparar_dataframe_logs([COLUNAS_LOGS] + valores), st.session_state.df_logs)
+    if novos.empty:
+        return 0
+
+    arquivadas = novos[novos['acao'] == 'arquivamento']['task_id'].unique()
+    mover_para_arquivo_sessao(arquivadas)
+    st.session_state.df_tarefas = aplicar_logs_nas_tarefas(st.session_state.df_tarefas, novos)
+    st.session_state.df_logs = pd.concat(
+        [st.session_state.df_logs, novos], ignore_index=True)
+    textuais = novos[novos['campo'].isin(CAMPOS_BUSCA)]
+    for task_id, campo, valor in zip(textuais['task_id'], textuais['campo'], textuais['valor_novo']):
+        sincronizar_indice_busca(task_id, {campo: valor})
+    return len(novos)
+
+
+# --- DADOS EM SEGUNDO PLANO (STALE-WHILE-REVALIDATE E PREFETCH) ---
+@st.cache_resource
+def ultimos_dados_por_quadro():
+    """
+    Últimos dados lidos de cada quadro, compartilhados pelas sessões do servidor:
+    uma sessão nova os exibe na hora e revalida em segundo plano.
+    Limitado a MAX_QUADROS_EM_CACHE quadros (LRU).
+
+    Returns:
+        OrderedDict: {nome do quadro: {'dados', 'carregado_em'}}
+    """
+    return OrderedDict()
+
+
+@st.cache_resource
+def trava_ultimos_dados():
+    """Trava do cache compartilhado: sessões diferentes o alteram ao mesmo tempo."""
+    return threading.Lock()
+
+
+def guardar_ultimos_dados(nome_quadro, dados, carregado_em):
+    """Guarda uma cópia dos dados lidos do quadro, descartando o quadro usado há mais tempo."""
+    entrada = {'dados': tuple(df.copy() for df in dados), 'carregado_em': carregado_em}
+    with trava_ultimos_dados():
+        ultimos = ultimos_dados_por_quadro()
+        ultimos[nome_quadro] = entrada
+        ultimos.move_to_end(nome_quadro)
+        while len(ultimos) > MAX_QUADROS_EM_CACHE:
+            ultimos.popitem(last=False)
+
+
+def obter_ultimos_dados(nome_quadro):
+    """Últimos dados guardados do quadro (None se não houver), marcando-o como recente."""
+    with trava_ultimos_dados():
+        ultimos = ultimos_dados_por_quadro()
+        entrada = ultimos.get(nome_quadro)
+        if entrada is not None:
+            ultimos.move_to_end(nome_quadro)
+        return entrada
+
+
+def executar_em_segundo_plano(funcao, *args):
+    """
+    Executa `funcao` numa thread daemon. A thread não usa st.*: o resultado
+    fica no dict devolvido e é aplicado à sessão pelo próprio script.
+
+    Returns:
+        dict: {'pronto': Event, 'resultado', 'erro'}
+    """
+    tarefa = {'pronto': threading.Event(), 'resultado': None, 'erro': None}
+
+    def executar():
+        try:
+            tarefa['resultado'] = funcao(*args)
+        except Exception as e:
+            tarefa['erro'] = e
+        finally:
+            tarefa['pronto'].set()
+
+    threading.Thread(target=executar, daemon=True).start()
+    return tarefa
+
+
+def iniciar_revalidacao():
+    """
+    Relê o quadro ativo numa thread enquanto a sessão segue exibindo os dados
+    atuais. O resultado entra na sessão por aplicar_revalidacao.
+    """
+    quadro = quadro_ativo()
+    tarefa = st.session_state.get('revalidacao')
+    if tarefa is not None and not tarefa['pronto'].is_set() and tarefa['quadro'] == quadro['nome']:
+        return  # Já há uma recarga do mesmo quadro em andamento
+    # A recarga de outro quadro (antes de trocar_quadro) é abandonada
+    tarefa = executar_em_segundo_plano(
+        carregar_quadro, conectar_google_sheets(), quadro,
+        cabecalhos_quadro_ativo(), COLUNAS_SOB_DEMANDA)
+    tarefa.update(quadro=quadro['nome'], escritas=st.session_state.get('escritas_sessao', 0))
+    st.session_state.revalidacao = tarefa
+
+
+def aplicar_revalidacao():
+    """
+    Troca os dados da sessão pelos da revalidação, se ela já terminou.
+
+    Returns:
+        bool: True se os dados da sessão foram trocados
+    """
+    tarefa = st.session_state.get('revalidacao')
+    if tarefa is None or not tarefa['pronto'].is_set():
+        return False
+    del st.session_state['revalidacao']
+    if tarefa['quadro'] != quadro_ativo()['nome']:
+        # Leitura do quadro anterior: o atual ainda precisa da sua
+        iniciar_revalidacao()
+        return False
+    if tarefa['escritas'] != st.session_state.get('escritas_sessao', 0):
+        # A sessão gravou durante a leitura, que pode não incluir a gravação: lê de novo
+        iniciar_revalidacao()
+        return False
+
+    erro = tarefa['erro']
+    if isinstance(erro, ErroPlanilha) or (erro is None and tarefa['resultado'][0].empty):
+        # Estrutura inválida ou planilha vazia: a carga completa sabe corrigir
+        recarregar_sessao()
+    elif erro is not None:
+        # Falha de leitura: mantém os dados atuais em tela
+        st.session_state.erro_revalidacao = str(erro)
+        return False
+    else:
+        aplicar_dados_sessao(*tarefa['resultado'])
+    st.session_state.pop('erro_revalidacao', None)
+    return True
+
+
+def servir_ultimos_dados():
+    """
+    Exibe os últimos dados conhecidos do quadro ativo (lidos por qualquer
+    sessão) e dispara a revalidação.
+
+    Returns:
+        bool: False se o quadro ainda não foi lido neste servidor
+    """
+    ultimo = obter_ultimos_dados(quadro_ativo()['nome'])
+    if ultimo is None:
+        return False
+    carregado_em = ultimo['carregado_em']
+    aplicar_dados_sessao(*(df.copy() for df in ultimo['dados']),
+                         origem=f"cache de {carregado_em.strftime('%H:%M:%S')}",
+                         carregado_em=carregado_em)
+    iniciar_revalidacao()
+    return True
+
+
+def registrar_navegacao(pagina):
+    """Conta as trocas de página da sessão, usadas para prever a próxima."""
+    anterior = st.session_state.get('pagina_atual')
+    if anterior and anterior != pagina:
+        transicoes = st.session_state.setdefault('transicoes_paginas', {})
+        transicoes[(anterior, pagina)] = transicoes.get((anterior, pagina), 0) + 1
+    st.session_state.pagina_atual = pagina
+
+
+def prever_proxima_pagina(pagina):
+    """Destino mais frequente a partir de `pagina` nesta sessão (ou o padrão)."""
+    contagem = {destino: n for (origem, destino), n in
+                st.session_state.get('transicoes_paginas', {}).items() if origem == pagina}
+    if contagem:
+        return max(contagem, key=contagem.get)
+    return PROXIMA_PAGINA_PADRAO.get(pagina)
+
+
+def preparar_dashboard(estado_analytics, tarefas, df_logs):
+    return {'analytics': atualizar_analytics(estado_analytics, df_logs),
+            'previsao': (chave_previsao(tarefas, df_logs), prever_entregas(tarefas, df_logs))}
+
+
+def preparar_historico(checkpoints, df_logs):
+    return {'checkpoints_eventos': atualizar_checkpoints(checkpoints, df_logs)}
+
+
+def preparar_busca(sheet, cabecalhos, tarefas):
+    descricoes = {}
+    if tarefas['descricao'].isna().any():
+        descricoes = ler_coluna_por_id(sheet, cabecalhos, 'descricao')
+        tarefas = completar_descricoes(tarefas, descricoes)
+    return {'descricoes': descricoes, 'indice_busca': criar_indice_busca(tarefas)}
+
+
+def versao_sessao():
+    return versao_dados(obter_tarefas_com_arquivo(), st.session_state.df_logs)
+
+
+def montar_prefetch(pagina):
+    """
+    Trabalho que adianta os dados derivados de `pagina`, sobre cópias dos dados
+    da sessão (a thread não compartilha objetos mutáveis com o script).
+
+    Returns:
+        tuple | None: (função, argumentos), ou None se não há o que adiantar
+    """
+    df_logs = st.session_state.df_logs
+    if pagina == "Dashboard":
+        estado = st.session_state.get('analytics')
+        return preparar_dashboard, (
+            copy.deepcopy(estado) if estado else criar_estado_analytics(),
+            obter_tarefas_com_arquivo().copy(), df_logs)
+    if pagina == "Histórico":
+        checkpoints = st.session_state.get('checkpoints_eventos')
+        if checkpoints:
+            checkpoints = {'assinatura': checkpoints['assinatura'], 'lista': list(checkpoints['lista'])}
+        return preparar_historico, (checkpoints, df_logs)
+    if pagina in ("Quadro Kanban", "Configurações") and 'indice_busca' not in st.session_state:
+        return preparar_busca, (
+            conectar_google_sheets(), cabecalhos_quadro_ativo(), obter_tarefas_com_arquivo().copy())
+    return None
+
+
+def iniciar_prefetch(pagina):
+    """
+    Prepara em segundo plano os dados da provável próxima página, para que a
+    navegação até ela não espere cálculo nem leitura da planilha.
+    """
+    if pagina is None or 'prefetch' in st.session_state:
+        return
+    versao = versao_sessao()
+    if st.session_state.get('prefetch_feito') == (pagina, versao):
+        return
+    trabalho = montar_prefetch(pagina)
+    if trabalho is None:
+        st.session_state.prefetch_feito = (pagina, versao)
+        return
+    tarefa = executar_em_segundo_plano(*trabalho)
+    tarefa.update(pagina=pagina, versao=versao)
+    st.session_state.prefetch = tarefa
+
+
+def aplicar_prefetch():
+    """Incorpora à sessão os dados adiantados, se os dados de origem não mudaram."""
+    tarefa = st.session_state.get('prefetch')
+    if tarefa is None or not tarefa['pronto'].is_set():
+        return
+    del st.session_state['prefetch']
+    if tarefa['erro'] is not None or tarefa['versao'] != versao_sessao():
+        return  # Descartado: a página calcula na hora, como antes
+    resultado = dict(tarefa['resultado'])
+    descricoes = resultado.pop('descricoes', None)
+    if descricoes:
+        st.session_state.df_tarefas = completar_descricoes(st.session_state.df_tarefas, descricoes)
+    st.session_state.update(resultado)
+    st.session_state.prefetch_feito = (tarefa['pagina'], tarefa['versao'])
+
+
+# --- DESFAZER / REFAZER (REVERSÃO PELOS LOGS) ---
+def reverter_logs(selecao):
+    """
+    Desfaz (ou refaz) as entradas de log selecionadas com UMA leitura de
+    conferência, UM batch_update e UM append de logs.
+
+    Returns:
+        tuple: (quantidade de campos revertidos, DataFrame de conflitos)
+    """
+    exigir_dados_da_planilha()
+    acao = acao_reversao(selecao)
+    alteracoes, conflitos = aplicar_reversao(conectar_google_sheets(), planejar_reversao(selecao))
+    if not alteracoes:
+        return 0, conflitos
+
+    registrar_logs_em_lote(acao, alteracoes)
+    revertidos = sum(len(campos) for campos in alteracoes.values())
+    # As linhas recém-anexadas ao log da sessão são exatamente as da reversão
+    st.session_state.df_tarefas = aplicar_logs_nas_tarefas(
+        st.session_state.df_tarefas, st.session_state.df_logs.tail(revertidos))
+    for task_id, campos in alteracoes.items():
+        sincronizar_indice_busca(task_id, {c: v for c, (_, v) in campos.items()})
+    return revertidos, conflitos
+
+
+def executar_reversao(selecao):
+    """Aplica a reversão e informa o resultado (conflitos ficam listados na tela)."""
+    try:
+        with st.spinner('Revertendo...'):
+            revertidos, conflitos = reverter_logs(selecao)
+    except Exception as e:
+        st.error(f"Erro ao reverter alterações: {e}")
+        return
+    if conflitos.empty:
+        st.toast(f"✅ {revertidos} campo(s) revertido(s)!")
+        st.rerun()
+    if revertidos:
+        st.success(f"{revertidos} campo(s) revertido(s).")
+    st.warning("Campos mantidos: alterados depois, já revertidos ou fora da planilha.")
+    st.dataframe(conflitos, hide_index=True, use_container_width=True)
+
+
+# --- ARQUIVAMENTO DE TAREFAS CONCLUÍDAS ---
+def arquivar_tarefas(df_candidatas):
+    """
+    Move as tarefas para a aba de Arquivo: um append no Arquivo, uma
+    exclusão em lote na aba de tarefas e um append de logs.
+
+    Returns:
+        list: IDs efetivamente arquivados
+    """
+    exigir_dados_da_planilha()
+    ws_arquivo = obter_worksheet_arquivo()
+    ids = mover_para_aba_arquivo(
+        conectar_google_sheets(), ws_arquivo, completar_descricoes(df_candidatas))
+    if not ids:
+        return []
+    registrar_logs_em_lote("arquivamento", {i: {'arquivada': ("", ws_arquivo.title)} for i in ids})
+    return ids
+
+
+def mover_para_arquivo_sessao(ids, data_arquivamento=None):
+    """Move as tarefas arquivadas de df_tarefas para df_arquivo na sessão."""
+    df = st.session_state.df_tarefas
+    mascara = df['id'].astype(str).isin([str(i) for i in ids])
+    if not mascara.any():
+        return
+    movidas = df[mascara].assign(
+        data_conclusao=datas_conclusao(df[mascara], st.session_state.df_logs),
+        data_arquivamento=pd.Timestamp(data_arquivamento or datetime.now()))
+    st.session_state.df_tarefas = df[~mascara].reset_index(drop=True)
+    arquivo = st.session_state.get('df_arquivo')
+    st.session_state.df_arquivo = movidas if arquivo is None or arquivo.empty else pd.concat(
+        [arquivo, movidas], ignore_index=True)
+    invalidar_indices_sessao()
+
+
+def obter_tarefas_com_arquivo():
+    """Tarefas ativas + arquivadas (colunas obrigatórias), para busca e auditoria."""
+    arquivo = st.session_state.get('df_arquivo')
+    if arquivo is None or arquivo.empty:
+        return st.session_state.df_tarefas
+    return pd.concat(
+        [st.session_state.df_tarefas, arquivo[COLUNAS_OBRIGATORIAS]], ignore_index=True)
+
+
+# --- INTEGRIDADE DOS DADOS ---
+def executar_verificacao_integridade():
+    """
+    Relê a aba de tarefas sem conversão de tipos (linhas inválidas incluídas)
+    e verifica só o que mudou desde a última verificação desta sessão.
+
+    Returns:
+        DataFrame: Problemas com a coluna de reparo sugerido
+    """
     sheet = conectar_google_sheets()
-    sheet.clear()
-    dados_lista = [df.columns.values.tolist()] + df.astype(str).values.tolist()
-    sheet.update(dados_lista)
+    quadro = quadro_ativo()
+    valores_tarefas, valores_logs, valores_arquivo = ler_abas_em_lote(sheet, quadro)
+    df_bruto = valores_para_dataframe(valores_tarefas, COLUNAS_OBRIGATORIAS, manter_linhas=True)
+    df_logs = preparar_dataframe_logs(valores_logs)
+    df_arquivo = preparar_dataframe_arquivo(valores_arquivo)
+
+    problemas, estado = verificar_integridade(
+        df_bruto, df_logs, df_arquivo, quadro, st.session_state.get('integridade'))
+    st.session_state.integridade = estado
+    return planejar_reparos(problemas, df_bruto, df_logs, quadro, df_arquivo['id'].tolist())
+
+
+# --- ALERTAS DE PRAZO ---
+def carregar_config_alertas():
+    """
+    Configuração dos alertas (`[alertas]` nos Secrets ou JSON em TRACKER_ALERTAS).
+    Sem configuração, o agendador em segundo plano não é iniciado.
+    """
+    config = obter_config("alertas", None)
+    if isinstance(config, str):
+        try:
+            config = json.loads(config)
+        except ValueError:
+            st.warning("Configuração de alertas inválida; alertas desativados.")
+            config = None
+    return dict(config) if config else None
+
+
+def obter_indice_prazos():
+    """Índice de prazos da sessão, sincronizado com df_tarefas e avançado até agora."""
+    agora = datetime.now()
+    dias_alerta = int((carregar_config_alertas() or {}).get('dias_alerta', DIAS_ALERTA_PRAZO))
+    indice = st.session_state.get('indice_prazos')
+    if indice is None or indice['dias_alerta'] != dias_alerta:
+        indice = criar_indice_prazos(st.session_state.df_tarefas, agora, dias_alerta)
+        st.session_state.indice_prazos = indice
+    else:
+        sincronizar_indice_prazos(indice, st.session_state.df_tarefas, agora)
+    avancar_prazos(indice, agora)
+    return indice
+
+
+@st.cache_resource
+def obter_agendador_alertas(nome_quadro):
+    """
+    Inicia UMA thread de alertas por quadro, compartilhada por todas as sessões.
+    A thread relê só a aba de tarefas (sem a descrição) com o mesmo cliente
+    gspread e não usa st.*.
+    """
+    config = carregar_config_alertas()
+    quadro = carregar_quadros()[nome_quadro]
+    sheet = abrir_worksheet_quadro(quadro['planilha'], quadro['aba'])
+    cabecalho = {'atual': obter_cabecalhos_tarefas(quadro['planilha'], quadro['aba'])}
+
+    def ler_tarefas():
+        df = carregar_tarefas(sheet, cabecalho['atual'], COLUNAS_SOB_DEMANDA)
+        cabecalho['atual'] = df.attrs['cabecalho']
+        return df
+
+    return iniciar_agendador(
+        ler_tarefas,
+        criar_notificador(config),
+        intervalo=int(config.get('intervalo', INTERVALO_ALERTAS)),
+        dias_alerta=int(config.get('dias_alerta', DIAS_ALERTA_PRAZO)))
 
 
 # --- FUNÇÃO AUXILIAR PARA FORÇAR LIMPEZA DE CACHE ---
 def limpar_cache_conexao():
     """Força recarregamento da conexão (útil após erros ou updates)"""
-    conectar_google_sheets.clear()
+    obter_cliente_gspread.clear()
+    abrir_worksheet_quadro.clear()
+    obter_worksheet_auxiliar.clear()
+    ultimos_dados_por_quadro.clear()
     st.cache_data.clear()
 
 
 # --- INICIALIZAÇÃO DO ESTADO ---
-if 'df_tarefas' not in st.session_state:
-    with st.spinner('Carregando dados da nuvem...'):
-        st.session_state.df_tarefas = carregar_dados()
+if 'df_tarefas' not in st.session_state or 'df_logs' not in st.session_state:
+    snapshot = None
+    if str(obter_config("iniciar_do_snapshot", "0")).lower() in ("1", "true", "sim"):
+        snapshot = carregar_ultimo_snapshot(pasta_snapshots())
+
+    if snapshot is not None:
+        # Partida a quente: exibe o snapshot local e relê o Google Sheets em segundo plano
+        carimbo, df_tarefas, df_logs = snapshot
+        aplicar_dados_sessao(df_tarefas, df_logs, preparar_dataframe_arquivo([]),
+                             origem=f"snapshot {carimbo}",
+                             carregado_em=datetime.strptime(carimbo, "%Y%m%d_%H%M%S"))
+        iniciar_revalidacao()
+    elif not servir_ultimos_dados():
+        with st.spinner('Carregando dados da nuvem...'):
+            recarregar_sessao()
+
+aplicar_revalidacao()
+aplicar_prefetch()
+
+if carregar_config_alertas():
+    agendador_alertas = obter_agendador_alertas(quadro_ativo()['nome'])
+else:
+    agendador_alertas = None
+
+# --- ATUALIZAÇÃO AUTOMÁTICA ---
+intervalo_sincronizacao = int(obter_config("intervalo_sincronizacao", INTERVALO_SINCRONIZACAO))
+
+
+@st.fragment(run_every=intervalo_sincronizacao if intervalo_sincronizacao > 0 else None)
+def monitorar_alteracoes():
+    """Verifica periodicamente a aba de Logs e reexecuta a página se houver novidades."""
+    ultima = st.session_state.get('ultima_sincronizacao')
+    if intervalo_sincronizacao > 0 and st.session_state.get('sincronizacao_automatica', True) and (
+            ultima is None or (datetime.now() - ultima).total_seconds() >= intervalo_sincronizacao):
+        try:
+            if sincronizar_alteracoes():
+                st.rerun(scope="app")
+        except Exception as e:
+            st.caption(f"⚠️ Falha ao sincronizar: {e}")
+    ultima = st.session_state.get('ultima_sincronizacao')
+    st.caption(f"🟢 Sincronizado às {ultima.strftime('%H:%M:%S')}" if ultima else "⚪ Aguardando sincronização")
+
+
+@st.fragment(run_every=INTERVALO_ACOMPANHAMENTO)
+def acompanhar_revalidacao():
+    """Enquanto a recarga em segundo plano roda, verifica se ela já terminou."""
+    if aplicar_revalidacao() or 'revalidacao' not in st.session_state:
+        st.rerun(scope="app")
+    st.caption("🔄 Atualizando dados em segundo plano...")
+
 
 # --- BARRA LATERAL (SIDEBAR) ---
 with st.sidebar:
     st.title("Tracker Tasks")
     st.caption("Gestão de Demandas de Desenvolvimento")
 
+    quadros = carregar_quadros()
+    if len(quadros) > 1:
+        st.selectbox(
+            "Quadro",
+            list(quadros),
+            index=list(quadros).index(quadro_ativo()['nome']),
+            key="seletor_quadro",
+            on_change=lambda: trocar_quadro(st.session_state.seletor_quadro)
+        )
+
     menu = st.radio(
         "Navegação",
         ["Dashboard", "Quadro Kanban", "Nova Demanda", "Histórico", "Configurações"]
     )
+    registrar_navegacao(menu)
 
     st.divider()
-    st.info(f"👥 Equipe: {len(DESENVOLVEDORES)} Desenvolvedores")
+    st.info(f"👥 Equipe: {len(quadro_ativo()['desenvolvedores'])} Desenvolvedores")
+    st.caption(f"Origem dos dados: {st.session_state.get('origem_dados', 'Google Sheets')}")
+    if st.session_state.get('dados_somente_leitura'):
+        st.warning("Somente leitura: as edições ficam bloqueadas.")
+        if st.button("Voltar aos dados da planilha", use_container_width=True):
+            with st.spinner('Carregando dados da nuvem...'):
+                recarregar_sessao()
+            st.rerun()
+    if intervalo_sincronizacao > 0:
+        st.toggle("Atualização automática", value=True, key="sincronizacao_automatica")
+        monitorar_alteracoes()
+    if 'revalidacao' in st.session_state:
+        acompanhar_revalidacao()
+    if st.session_state.get('erro_revalidacao'):
+        st.caption(f"⚠️ Falha ao atualizar: {st.session_state.erro_revalidacao}")
+    if agendador_alertas is not None:
+        if agendador_alertas['ultimo_erro']:
+            st.caption(f"🔕 Alertas de prazo: {agendador_alertas['ultimo_erro']}")
+        elif agendador_alertas['ultima_execucao']:
+            st.caption(
+                f"🔔 Alertas verificados às {agendador_alertas['ultima_execucao'].strftime('%H:%M:%S')} "
+                f"({agendador_alertas['enviados']} enviados)")
 
 # --- PÁGINA: DASHBOARD ---
 if menu == "Dashboard":
@@ -538,8 +1172,7 @@ if menu == "Dashboard":
     col_btn1, col_btn2 = st.columns([1, 3])
     with col_btn1:
         if st.button("🔄 Atualizar", use_container_width=True):
-            with st.spinner('Carregando...'):
-                st.session_state.df_tarefas = carregar_dados()
+            iniciar_revalidacao()
             st.rerun()
 
     df = st.session_state.df_tarefas.copy()
@@ -551,8 +1184,7 @@ if menu == "Dashboard":
     total = len(df)
     concluidas = len(df[df['status'] == "Concluído"])
     em_andamento = len(df[df['status'] == "Em Desenvolvimento"])
-    atrasadas = len(df[(df['data_entrega'] < datetime.now())
-                    & (df['status'] != 'Concluído')])
+    atrasadas = contar_faixas(obter_indice_prazos())['atrasada']
 
     col1.metric("Total de Demandas", total)
     col2.metric("Taxa de Conclusão",
@@ -628,6 +1260,105 @@ if menu == "Dashboard":
             )
             st.plotly_chart(fig_type, use_container_width=True)
 
+    st.divider()
+
+    # Previsão de término com base na velocidade de cada dev
+    st.subheader("🔮 Previsão de Entregas")
+    previsao = obter_previsao()
+    previsoes = previsao['previsoes']
+    em_risco = previsoes[previsoes['risco'] == 'atrasará']
+
+    col_p1, col_p2, col_p3 = st.columns(3)
+    col_p1.metric("Tarefas Abertas", len(previsoes))
+    col_p2.metric("⚠️ Devem Atrasar", len(em_risco))
+    col_p3.metric("Sem Histórico", int((previsoes['risco'] == 'sem histórico').sum()))
+
+    c_prev1, c_prev2 = st.columns([1, 2])
+
+    with c_prev1:
+        velocidade = previsao['velocidade'].dropna(subset=['pontos_por_dia'])
+        if not velocidade.empty:
+            fig_vel = px.bar(
+                velocidade,
+                x="responsavel",
+                y="pontos_por_dia",
+                color="origem",
+                title="Velocidade (% de progresso por dia)",
+                color_discrete_sequence=px.colors.qualitative.Pastel
+            )
+            st.plotly_chart(fig_vel, use_container_width=True)
+        else:
+            st.info("Sem avanços de progresso registrados no log.")
+
+    with c_prev2:
+        if not em_risco.empty:
+            st.caption("Tarefas cuja data prevista passa da data de entrega:")
+            st.dataframe(em_risco, use_container_width=True, hide_index=True)
+        else:
+            st.success("✅ Nenhuma tarefa com previsão de atraso!")
+        with st.expander("Ver previsão de todas as tarefas abertas"):
+            st.dataframe(previsoes, use_container_width=True, hide_index=True)
+
+    st.divider()
+
+    # Métricas de fluxo derivadas do log de auditoria
+    st.subheader("📈 Fluxo e Tempo de Ciclo")
+    analytics = obter_analytics()
+    tempos = analytics['tempos']
+    throughput = analytics['throughput']
+
+    col_f1, col_f2, col_f3 = st.columns(3)
+    col_f1.metric("Lead Time Médio",
+                  f"{tempos['lead_time_dias'].mean():.1f} dias" if not tempos.empty else "-")
+    col_f2.metric("Cycle Time Médio",
+                  f"{tempos['cycle_time_dias'].mean():.1f} dias" if tempos['cycle_time_dias'].notna().any() else "-")
+    ultimas_semanas = throughput[throughput['semana'] >= datetime.now() - pd.Timedelta(weeks=4)] \
+        if not throughput.empty else throughput
+    col_f3.metric("Concluídas (4 semanas)", int(ultimas_semanas['concluidas'].sum()) if not ultimas_semanas.empty else 0)
+
+    c3, c4 = st.columns(2)
+
+    with c3:
+        if not analytics['cfd'].empty:
+            fig_cfd = px.area(
+                analytics['cfd'],
+                x="dia",
+                y="tarefas",
+                color="status",
+                category_orders={"status": COLUNAS_KANBAN[::-1]},
+                title="Fluxo Cumulativo (CFD)"
+            )
+            st.plotly_chart(fig_cfd, use_container_width=True)
+        else:
+            st.info("Sem movimentações de status registradas no log.")
+
+    with c4:
+        if not throughput.empty:
+            fig_thr = px.bar(
+                throughput,
+                x="semana",
+                y="concluidas",
+                color="responsavel",
+                title="Throughput Semanal por Dev",
+                color_discrete_sequence=px.colors.qualitative.Pastel
+            )
+            st.plotly_chart(fig_thr, use_container_width=True)
+        else:
+            st.info("Nenhuma conclusão registrada no log.")
+
+    if not analytics['tempo_por_coluna'].empty:
+        fig_col = px.bar(
+            analytics['tempo_por_coluna'],
+            x="status",
+            y="dias_medios",
+            title="Tempo Médio em Cada Coluna (dias)",
+            color_discrete_sequence=px.colors.qualitative.Set3
+        )
+        st.plotly_chart(fig_col, use_container_width=True)
+
+    if not tempos.empty:
+        st.dataframe(tempos.round(1), use_container_width=True, hide_index=True)
+
     st.subheader("Progresso Detalhado")
     st.dataframe(
         df[['titulo', 'responsavel', 'status', 'prioridade', 'data_entrega',
@@ -656,12 +1387,18 @@ elif menu == "Quadro Kanban":
         """,
         unsafe_allow_html=True,
     )
+    somente_leitura = st.session_state.get('dados_somente_leitura', False)
+
+    # Busca textual
+    consulta = st.text_input(
+        "🔎 Buscar em título e descrição",
+        placeholder="Ex: landing, correcao menu, api not...")
 
     # Filtros
     c_filter1, c_filter2, c_filter3 = st.columns(3)
     filtro_dev = c_filter1.multiselect(
-        "Filtrar por Desenvolvedor", DESENVOLVEDORES)
-    filtro_tipo = c_filter2.multiselect("Filtrar por Tipo", TIPOS_TAREFA)
+        "Filtrar por Desenvolvedor", quadro_ativo()['desenvolvedores'])
+    filtro_tipo = c_filter2.multiselect("Filtrar por Tipo", quadro_ativo()['tipos'])
     filtro_prioridade = c_filter3.multiselect(
         "Filtrar por Prioridade", PRIORIDADES)
 
@@ -670,6 +1407,8 @@ elif menu == "Quadro Kanban":
         df_view['progresso'], errors='coerce').fillna(0)
     df_view['data_entrega'] = pd.to_datetime(
         df_view['data_entrega'], errors='coerce')
+    df_view['dias_restantes'] = (df_view['data_entrega'] - datetime.now()).dt.days
+    faixas_prazo = obter_indice_prazos()['faixas']
 
     if filtro_dev:
         df_view = df_view[df_view['responsavel'].isin(filtro_dev)]
@@ -677,6 +1416,79 @@ elif menu == "Quadro Kanban":
         df_view = df_view[df_view['tipo'].isin(filtro_tipo)]
     if filtro_prioridade:
         df_view = df_view[df_view['prioridade'].isin(filtro_prioridade)]
+    if consulta.strip():
+        ids_encontrados = buscar_tarefas(obter_indice_busca(), consulta)
+        df_view = df_view[df_view['id'].astype(str).isin(ids_encontrados)]
+        st.caption(f"{len(df_view)} tarefas encontradas para \"{consulta.strip()}\"")
+
+        df_arquivo = st.session_state.get('df_arquivo')
+        if df_arquivo is not None and not df_arquivo.empty:
+            arquivadas = df_arquivo[df_arquivo['id'].astype(str).isin(ids_encontrados)]
+            if not arquivadas.empty:
+                with st.expander(f"🗄️ {len(arquivadas)} tarefas arquivadas correspondem à busca"):
+                    st.dataframe(
+                        arquivadas[['id', 'titulo', 'responsavel', 'tipo', 'data_conclusao']],
+                        use_container_width=True,
+                        hide_index=True
+                    )
+
+    # Edição em massa: um único batch_update para todas as tarefas selecionadas
+    if st.toggle("Edição em massa"):
+        with st.form("form_edicao_massa"):
+            opcoes = df_view.sort_values('id')['id'].tolist()
+            titulos = dict(zip(df_view['id'], df_view['titulo']))
+            selecionar_todas = st.checkbox(
+                f"Selecionar todas as {len(opcoes)} tarefas filtradas")
+            selecionadas = st.multiselect(
+                "Tarefas", opcoes, format_func=lambda i: f"#{i} - {titulos.get(i, '')}")
+
+            manter = "(manter)"
+            col_m1, col_m2, col_m3, col_m4 = st.columns(4)
+            massa_status = col_m1.selectbox("Status", [manter] + COLUNAS_KANBAN)
+            massa_progresso = col_m2.selectbox("Progresso %", [manter] + list(range(0, 101, 10)))
+            massa_responsavel = col_m3.selectbox("Responsável", [manter] + quadro_ativo()['desenvolvedores'])
+            massa_prioridade = col_m4.selectbox("Prioridade", [manter] + PRIORIDADES)
+
+            aplicar = st.form_submit_button("Aplicar às selecionadas", type="primary")
+
+        if aplicar:
+            ids_alvo = opcoes if selecionar_todas else selecionadas
+            campos = {
+                campo: valor for campo, valor in [
+                    ('status', massa_status), ('progresso', massa_progresso),
+                    ('responsavel', massa_responsavel), ('prioridade', massa_prioridade)]
+                if valor != manter
+            }
+            # Mesma regra do card: progresso 100% conclui a tarefa
+            if campos.get('progresso') == 100 and 'status' not in campos:
+                campos['status'] = "Concluído"
+
+            if not ids_alvo or not campos:
+                st.warning("Selecione tarefas e ao menos um campo para alterar.")
+            else:
+                with st.spinner(f'Salvando {len(ids_alvo)} tarefas...'):
+                    atualizadas, nao_encontradas = atualizar_tarefas_em_lote(
+                        {task_id: campos for task_id in ids_alvo})
+
+                mascara = st.session_state.df_tarefas['id'].isin(atualizadas)
+                for campo, valor in campos.items():
+                    st.session_state.df_tarefas.loc[mascara, campo] = valor
+
+                if nao_encontradas:
+                    st.warning(
+                        f"Tarefas não encontradas na planilha: {', '.join(f'#{i}' for i in nao_encontradas)}")
+                if atualizadas:
+                    st.toast(f"✅ {len(atualizadas)} tarefas atualizadas!")
+                    st.rerun()
+
+        # Desfaz a última gravação deste usuário (desfazer de novo = refazer)
+        lote = ultimo_lote(st.session_state.df_logs, obter_usuario_atual())
+        if not lote.empty:
+            acao = acao_reversao(lote)
+            rotulo = "↪️ Refazer" if acao == "refazer" else "↩️ Desfazer"
+            if st.button(f"{rotulo} minha última alteração ({lote['task_id'].nunique()} tarefa(s), "
+                         f"{lote['timestamp'].iloc[0]:%d/%m %H:%M})"):
+                executar_reversao(lote)
 
     # Layout das Colunas do Kanban
     cols = st.columns(len(COLUNAS_KANBAN))
@@ -703,10 +1515,10 @@ elif menu == "Quadro Kanban":
                 st.progress(media_prog / 100)
 
             for i, row in tarefas_coluna.iterrows():
-                # Calcular status do prazo
-                dias_restantes = (row['data_entrega'] - datetime.now()).days
-                emoji_prazo = "⏰" if dias_restantes <= 3 else "📅"
-                cor_prazo = "red" if dias_restantes < 0 else "orange" if dias_restantes <= 3 else "green"
+                # Status do prazo vem do índice de prazos (tarefas abertas)
+                faixa = faixas_prazo.get(str(row['id']), 'no_prazo')
+                emoji_prazo = "⏰" if faixa != 'no_prazo' else "📅"
+                cor_prazo = CORES_FAIXA_PRAZO[faixa]
 
                 # Card da Tarefa
                 with st.expander(f"#{row['id']} {row['prioridade']} - {row['titulo']}", expanded=True):
@@ -716,20 +1528,26 @@ elif menu == "Quadro Kanban":
 
                     # Exibir prazo com destaque visual
                     st.markdown(
-                        f"**{emoji_prazo} Entrega:** :{cor_prazo}[{row['data_entrega'].strftime('%d/%m/%Y')}] ({dias_restantes} dias)")
+                        f"**{emoji_prazo} Entrega:** :{cor_prazo}[{row['data_entrega'].strftime('%d/%m/%Y')}] ({row['dias_restantes']:.0f} dias)")
                     st.progress(int(row['progresso']) / 100)
 
+                    # A descrição não vem na carga do quadro: é lida ao abrir
+                    if st.toggle("📝 Descrição", key=f"ver_descricao_{row['id']}"):
+                        st.caption(obter_descricao(row['id']) or "_Sem descrição._")
+
                     # Controles de Edição Rápida
                     novo_status = st.selectbox(
                         "Mover para:",
                         COLUNAS_KANBAN,
                         index=COLUNAS_KANBAN.index(row['status']),
-                        key=f"status_{row['id']}"
+                        key=f"status_{row['id']}",
+                        disabled=somente_leitura
                     )
 
                     novo_progresso = st.slider(
                         "Progresso %", 0, 100, int(row['progresso']), 10,
-                        key=f"prog_{row['id']}"
+                        key=f"prog_{row['id']}",
+                        disabled=somente_leitura
                     )
 
                     # Atualização Incremental
@@ -814,11 +1632,11 @@ elif menu == "Nova Demanda":
         )
         responsavel = col2.selectbox(
             "Desenvolvedor Responsável*",
-            DESENVOLVEDORES
+            quadro_ativo()['desenvolvedores']
         )
 
         col3, col4 = st.columns(2)
-        tipo = col3.selectbox("Tipo de Demanda*", TIPOS_TAREFA)
+        tipo = col3.selectbox("Tipo de Demanda*", quadro_ativo()['tipos'])
         prioridade = col4.selectbox("Prioridade*", PRIORIDADES)
 
         col5, col6 = st.columns(2)
@@ -895,6 +1713,8 @@ elif menu == "Nova Demanda":
                     ignore_index=True
                 )
 
+                sincronizar_indice_busca(novo_id, nova_tarefa)
+
                 # Salva no estado para exibir resumo
                 st.session_state.tarefa_cadastrada = nova_tarefa.copy()
 
@@ -929,29 +1749,22 @@ elif menu == "Nova Demanda":
         delta_color="inverse"
     )
 
+    df_ids = obter_tarefas_com_arquivo()
     col_stat3.metric(
         "Próximo ID Disponível",
-        int(pd.to_numeric(df_stats['id'], errors='coerce').max(
-        ) + 1) if not df_stats.empty else 1
+        int(pd.to_numeric(df_ids['id'], errors='coerce').max(
+        ) + 1) if not df_ids.empty else 1
     )
 
 elif menu == "Histórico":
     st.header("Histórico de Alterações")
-    try:
-        ws = obter_worksheet_logs()
-        registros = ws.get_all_records()
-    except Exception as e:
-        st.error(f"Erro ao carregar logs: {e}")
-        registros = []
-    if not registros:
+    if st.button("🔄 Atualizar"):
+        iniciar_revalidacao()
+        st.rerun()
+    df_logs = st.session_state.df_logs.copy()
+    if df_logs.empty:
         st.info("Nenhum log registrado.")
     else:
-        df_logs = pd.DataFrame(registros)
-        if 'timestamp' in df_logs.columns:
-            try:
-                df_logs['timestamp'] = pd.to_datetime(df_logs['timestamp'], errors='coerce')
-            except Exception:
-                pass
         colf1, colf2, colf3, colf4 = st.columns(4)
         filtro_id = colf1.text_input("Filtrar por ID", "")
         filtro_acao = colf2.multiselect("Ações", sorted(df_logs['acao'].dropna().unique().tolist()))
@@ -973,20 +1786,83 @@ elif menu == "Histórico":
             hide_index=True
         )
 
+        st.divider()
+
+        # Reversão das edições filtradas acima, numa única gravação em lote
+        st.subheader("↩️ Desfazer / Refazer")
+        minutos = st.number_input(
+            "Edições dos últimos (minutos)", min_value=1, value=60, step=15)
+        candidatas = logs_reversiveis(
+            df_logs, inicio=pd.Timestamp.now() - pd.Timedelta(minutes=minutos))
+        if candidatas.empty:
+            st.info("Nenhuma edição reversível no período (com os filtros acima).")
+        else:
+            colunas_log = ['timestamp', 'acao', 'task_id', 'campo', 'valor_antigo', 'valor_novo', 'usuario']
+            editada = st.data_editor(
+                candidatas[colunas_log].assign(reverter=True),
+                column_order=['reverter'] + colunas_log,
+                disabled=colunas_log,
+                hide_index=True,
+                use_container_width=True,
+                key="editor_reversao"
+            )
+            selecao = candidatas.loc[editada.index[editada['reverter']]]
+            plano = planejar_reversao(selecao)
+            acao = acao_reversao(selecao)
+            st.caption(f"{len(selecao)} entrada(s) selecionada(s) · {len(plano)} campo(s) a {acao}")
+            rotulo = "↪️ Refazer" if acao == "refazer" else "↩️ Desfazer"
+            if st.button(f"{rotulo} selecionadas", type="primary", disabled=plano.empty):
+                executar_reversao(selecao)
+
+        st.divider()
+
+        # Reconstrução do quadro a partir dos eventos de log
+        st.subheader("⏪ Quadro em uma Data")
+        col_data, col_hora = st.columns(2)
+        data_corte = col_data.date_input("Data", value=datetime.now())
+        hora_corte = col_hora.time_input("Hora", value=datetime.max.time().replace(microsecond=0))
+        checkpoints = obter_checkpoints_sessao()
+        estado_passado = reconstruir_estado(
+            st.session_state.df_logs, datetime.combine(data_corte, hora_corte), checkpoints)
+        if estado_passado.empty:
+            st.info("Nenhum evento registrado até esta data.")
+        else:
+            st.caption(f"{len(estado_passado)} tarefas reconstruídas a partir dos logs.")
+            st.dataframe(
+                estado_passado[['id', 'titulo', 'responsavel', 'status', 'prioridade',
+                                'data_entrega', 'progresso']].sort_values('status'),
+                use_container_width=True,
+                hide_index=True
+            )
+
+        st.subheader("🧮 Planilha x Logs")
+        if st.button("Verificar divergências"):
+            garantir_descricoes()
+            divergencias = comparar_estado_com_planilha(
+                reconstruir_estado(st.session_state.df_logs, checkpoints=checkpoints),
+                obter_tarefas_com_arquivo())
+            if divergencias.empty:
+                st.success("Planilha e logs estão consistentes!")
+            else:
+                st.warning(f"{len(divergencias)} divergências encontradas.")
+                st.dataframe(divergencias, use_container_width=True, hide_index=True)
+
 # --- PÁGINA: CONFIGURAÇÕES ---
 elif menu == "Configurações":
     st.header("Configurações do Sistema")
 
     st.subheader("Conexão Google Sheets")
-    st.info(f"Conectado à planilha: **{NOME_PLANILHA}**")
+    quadro = quadro_ativo()
+    st.info(
+        f"Conectado à planilha: **{quadro['planilha']}**"
+        + (f" (aba **{quadro['aba']}**)" if quadro['aba'] else "")
+        + (f" · Quadro: **{quadro['nome']}**" if len(carregar_quadros()) > 1 else ""))
 
     col1, col2 = st.columns(2)
 
     with col1:
         if st.button("Recarregar Dados", use_container_width=True):
-            with st.spinner('Carregando...'):
-                st.session_state.df_tarefas = carregar_dados()
-            st.success("Dados atualizados!")
+            iniciar_revalidacao()
             st.rerun()
 
     with col2:
@@ -997,6 +1873,135 @@ elif menu == "Configurações":
 
     st.divider()
 
+    st.subheader("Snapshots (Parquet)")
+    st.caption(
+        f"Cópias locais comprimidas de tarefas e logs em `{pasta_snapshots()}/`. "
+        "Defina `iniciar_do_snapshot = true` nos Secrets para iniciar a partir do mais recente.")
+
+    col_snap1, col_snap2, col_snap3 = st.columns(3)
+
+    with col_snap1:
+        if st.button("Exportar Snapshot", use_container_width=True):
+            garantir_descricoes()
+            carimbo = exportar_snapshot(
+                st.session_state.df_tarefas, st.session_state.df_logs, pasta_snapshots())
+            st.success(f"Snapshot {carimbo} gravado!")
+
+    # Os arquivos só são serializados quando pedidos (e valem até os dados mudarem)
+    versao_downloads = (st.session_state.get('ultima_sincronizacao'), len(st.session_state.df_logs))
+    downloads = st.session_state.get('downloads_parquet')
+    with col_snap2:
+        if st.button("Preparar Downloads", use_container_width=True):
+            garantir_descricoes()
+            downloads = {
+                'versao': versao_downloads,
+                'tarefas': tabela_em_bytes(st.session_state.df_tarefas, SCHEMA_TAREFAS),
+                'logs': tabela_em_bytes(st.session_state.df_logs, SCHEMA_LOGS),
+            }
+            st.session_state.downloads_parquet = downloads
+
+    if downloads is not None and downloads['versao'] == versao_downloads:
+        with col_snap3:
+            st.download_button(
+                "Baixar Tarefas (.parquet)",
+                data=downloads['tarefas'],
+                file_name="tarefas.parquet",
+                use_container_width=True
+            )
+            st.download_button(
+                "Baixar Logs (.parquet)",
+                data=downloads['logs'],
+                file_name="logs.parquet",
+                use_container_width=True
+            )
+
+    snapshots = listar_snapshots(pasta_snapshots())
+    if snapshots:
+        col_rest1, col_rest2 = st.columns([3, 1])
+        carimbo_escolhido = col_rest1.selectbox("Snapshots locais", snapshots)
+        confirmar_restauracao = col_rest1.checkbox(
+            "Também sobrescrever a planilha com as tarefas deste snapshot")
+        if col_rest2.button("Restaurar", use_container_width=True):
+            with st.spinner('Restaurando snapshot...'):
+                if confirmar_restauracao:
+                    gravar_snapshot_na_planilha(carimbo_escolhido)
+                else:
+                    exibir_dados_externos(*carregar_snapshot(carimbo_escolhido, pasta_snapshots()),
+                                          origem=f"snapshot {carimbo_escolhido}")
+            st.success(f"Snapshot {carimbo_escolhido} restaurado!")
+            st.rerun()
+
+    arquivo_importado = st.file_uploader(
+        "Importar tarefas de um .parquet (somente leitura; a planilha não é alterada)",
+        type=["parquet"])
+    if arquivo_importado is not None and st.button("Carregar arquivo na sessão"):
+        df_importado = ler_tabela_parquet(arquivo_importado, SCHEMA_TAREFAS)
+        exibir_dados_externos(df_importado, st.session_state.df_logs,
+                              origem=f"arquivo {arquivo_importado.name}")
+        st.success(f"{len(df_importado)} tarefas carregadas do arquivo!")
+        st.rerun()
+
+    st.divider()
+
+    st.subheader("🗄️ Arquivamento")
+    st.caption(
+        f"Move tarefas concluídas há mais de N dias para a aba **{quadro_ativo()['aba_arquivo']}**. "
+        "Elas continuam na busca e no histórico, e seus IDs não são reutilizados.")
+    dias_arquivamento = st.number_input(
+        "Concluídas há mais de (dias)", min_value=0,
+        value=int(obter_config("dias_arquivamento", DIAS_ARQUIVAMENTO)), step=1)
+    candidatas = selecionar_para_arquivar(
+        st.session_state.df_tarefas, st.session_state.df_logs, dias_arquivamento)
+    col_arq1, col_arq2 = st.columns([3, 1])
+    df_arquivo = st.session_state.get('df_arquivo')
+    col_arq1.write(
+        f"**{len(candidatas)}** tarefas prontas para arquivar · "
+        f"**{0 if df_arquivo is None else len(df_arquivo)}** já arquivadas")
+    if col_arq2.button("Arquivar agora", use_container_width=True, disabled=candidatas.empty):
+        with st.spinner('Arquivando...'):
+            arquivadas = arquivar_tarefas(candidatas)
+            mover_para_arquivo_sessao(arquivadas)
+        st.success(f"{len(arquivadas)} tarefas arquivadas!")
+        st.rerun()
+
+    st.divider()
+
+    st.subheader("🩺 Integridade")
+    st.caption(
+        "Procura IDs inválidos ou repetidos, datas inválidas, progresso fora de 0-100, "
+        "status/tipo/prioridade desconhecidos e divergências entre planilha e logs. "
+        "Linhas sem alteração desde a última verificação não são revalidadas.")
+    if st.button("Verificar integridade"):
+        with st.spinner('Verificando...'):
+            st.session_state.resultado_integridade = executar_verificacao_integridade()
+
+    resultado = st.session_state.get('resultado_integridade')
+    if resultado is not None:
+        if resultado.empty:
+            st.success("Nenhum problema encontrado!")
+        else:
+            corrigiveis = resultado[resultado['reparo'].notna() & resultado['linha'].notna()]
+            st.write(
+                f"**{len(resultado)}** problema(s) · **{len(corrigiveis)}** com correção sugerida")
+            st.dataframe(
+                resultado.value_counts('problema').rename('ocorrências'), use_container_width=True)
+            st.dataframe(resultado, hide_index=True, use_container_width=True)
+            if st.button("Aplicar correções sugeridas", disabled=corrigiveis.empty):
+                exigir_dados_da_planilha()
+                with st.spinner('Corrigindo...'):
+                    alteracoes, ignoradas = aplicar_reparos(conectar_google_sheets(), corrigiveis)
+                    registrar_logs_em_lote("reparo", alteracoes)
+                    recarregar_sessao()
+                    st.session_state.pop('resultado_integridade', None)
+                st.success(f"{sum(len(c) for c in alteracoes.values())} célula(s) corrigida(s)!")
+                if ignoradas:
+                    st.warning(
+                        f"Linhas alteradas desde a verificação foram mantidas: {', '.join(map(str, ignoradas))}")
+                else:
+                    st.rerun()
+
+    st.divider()
+
     st.subheader("Estatísticas do Sistema")
     df = st.session_state.df_tarefas
     col_stats1, col_stats2, col_stats3, col_stats4 = st.columns(4)
@@ -1025,6 +2030,10 @@ elif menu == "Configurações":
         else:
             st.error(f"Colunas faltantes: {', '.join(faltantes)}")
 
+# --- PREFETCH DA PRÓXIMA PÁGINA ---
+# Depois de a página atual ser desenhada, para não atrasá-la
+iniciar_prefetch(prever_proxima_pagina(menu))
+
 # --- RODAPÉ ---
 st.sidebar.markdown("---")
 st.sidebar.caption("Desenvolvido por Toledo")
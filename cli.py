@@ -0,0 +1,432 @@
+"""
+Linha de comando do Tracker Tasks: rotinas em lote sem abrir a interface.
+
+Usa a mesma camada de dados do app (dados.py) e pode ser agendada no cron.
+Os relatórios saem em CSV no stdout, linha a linha, à medida que são gerados.
+
+Exemplos:
+    python cli.py atrasadas --dias-alerta 3
+    python cli.py alertas --canal webhook --url https://exemplo/webhook
+    python cli.py exportar --formato csv > tarefas.csv
+    python cli.py atualizar --ids 12 15 --status "Concluído"
+    python cli.py atualizar --arquivo alteracoes.csv
+    python cli.py verificar
+    python cli.py integridade --reparar
+    python cli.py desfazer --desde 2024-05-10T14:00 --usuario ana --aplicar
+    python cli.py arquivar --dias 30 --aplicar
+    python cli.py compactar-logs --dias 180 --aplicar
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import datetime
+import pandas as pd
+from dados import (
+    ErroPlanilha, ARQUIVO_CREDENCIAIS, COLUNAS_OBRIGATORIAS, COLUNAS_LOGS, COLUNAS_ARQUIVO,
+    COLUNAS_KANBAN, PRIORIDADES, PASTA_SNAPSHOTS, DIAS_ARQUIVAMENTO, SCHEMA_LOGS,
+    montar_quadros, autorizar_cliente, abrir_aba_tarefas, abrir_aba_auxiliar,
+    carregar_quadro, montar_linhas_log, gravar_linhas_log, gravar_campos_em_lote,
+    exportar_snapshot, tabela_em_bytes, reconstruir_estado, comparar_estado_com_planilha,
+    selecionar_para_arquivar, mover_para_aba_arquivo, compactar_logs, reescrever_logs,
+    relatorio_prazos, valores_para_dataframe, ler_abas_em_lote, preparar_dataframe_logs,
+    preparar_dataframe_arquivo, criar_estado_integridade, verificar_integridade,
+    planejar_reparos, aplicar_reparos, logs_reversiveis, ultimo_lote, acao_reversao,
+    planejar_reversao, aplicar_reversao, interpretar_data,
+)
+from alertas import DIAS_ALERTA_PRAZO, criar_indice_prazos, avancar_prazos, criar_notificador
+
+CAMPOS_EDITAVEIS = ['titulo', 'descricao', 'responsavel', 'status', 'tipo',
+                    'prioridade', 'data_entrega', 'progresso']
+
+
+# --- CONEXÃO ---
+def carregar_definicoes(caminho=None):
+    """Definições de quadros de um arquivo JSON ou da variável TRACKER_QUADROS."""
+    if caminho:
+        with open(caminho, encoding='utf-8') as f:
+            return json.load(f)
+    texto = os.environ.get("TRACKER_QUADROS")
+    return json.loads(texto) if texto else None
+
+
+def abrir_quadro(args):
+    """
+    Abre o quadro escolhido nas opções globais.
+
+    Returns:
+        tuple: (quadro, sheet)
+    """
+    quadros = montar_quadros(carregar_definicoes(args.quadros))
+    if args.quadro and args.quadro not in quadros:
+        raise ErroPlanilha(
+            f"Quadro '{args.quadro}' não configurado. Disponíveis: {', '.join(quadros)}")
+    quadro = quadros[args.quadro] if args.quadro else next(iter(quadros.values()))
+    client = autorizar_cliente(arquivo_credenciais=args.credenciais)
+    return quadro, abrir_aba_tarefas(client, quadro)
+
+
+def obter_usuario():
+    return os.environ.get("TRACKER_USUARIO") or os.environ.get("USER") or "cli"
+
+
+# --- SAÍDA ---
+def emitir_csv(df, colunas=None):
+    """Escreve o DataFrame em CSV no stdout, uma linha por vez (com flush)."""
+    colunas = colunas or list(df.columns)
+    escritor = csv.writer(sys.stdout, lineterminator="\n")
+    escritor.writerow(colunas)
+    for linha in df[colunas].itertuples(index=False):
+        escritor.writerow(["" if pd.isna(v) else v for v in linha])
+        sys.stdout.flush()
+
+
+def informar(mensagem):
+    """Mensagens de progresso vão para o stderr, sem poluir o CSV do stdout."""
+    print(mensagem, file=sys.stderr, flush=True)
+
+
+# --- COMANDOS ---
+def comando_exportar(args):
+    quadro, sheet = abrir_quadro(args)
+    df_tarefas, df_logs, df_arquivo = carregar_quadro(sheet, quadro)
+    if args.formato == 'parquet':
+        carimbo = exportar_snapshot(df_tarefas, df_logs, args.pasta)
+        print(f"Snapshot {carimbo} gravado em {args.pasta}", flush=True)
+        return 0
+    df = {'tarefas': df_tarefas, 'logs': df_logs, 'arquivo': df_arquivo}[args.dados]
+    emitir_csv(df)
+    return 0
+
+
+def ler_alteracoes(args):
+    """
+    Monta {task_id: {campo: valor}} a partir das opções ou do CSV informado
+    (coluna 'id' + uma coluna por campo; células vazias são ignoradas).
+    """
+    if args.arquivo:
+        df = pd.read_csv(args.arquivo, dtype=str, keep_default_na=False)
+        if 'id' not in df.columns:
+            raise ErroPlanilha("O CSV de alterações precisa de uma coluna 'id'.")
+        colunas = [c for c in df.columns if c in CAMPOS_EDITAVEIS]
+        return {
+            linha['id'].strip(): {c: linha[c].strip() for c in colunas if str(linha[c]).strip()}
+            for _, linha in df.iterrows() if linha['id'].strip()
+        }
+
+    campos = {c: getattr(args, c) for c in ['status', 'responsavel', 'prioridade', 'progresso']
+              if getattr(args, c) is not None}
+    if not args.ids or not campos:
+        raise ErroPlanilha("Informe --ids e ao menos um campo, ou --arquivo.")
+    return {str(i): dict(campos) for i in args.ids}
+
+
+def validar_alteracoes(campos_por_tarefa, quadro):
+    """
+    Confere os valores com as opções do quadro (as mesmas dos seletores do app),
+    para que nenhum valor que o Kanban não exibe chegue à planilha.
+
+    Returns:
+        list: Mensagens de erro ("#id campo: problema"); vazia se tudo é válido
+    """
+    opcoes = {'status': COLUNAS_KANBAN, 'prioridade': PRIORIDADES,
+              'responsavel': quadro['desenvolvedores'], 'tipo': quadro['tipos']}
+    erros = []
+    for task_id, campos in campos_por_tarefa.items():
+        for campo, valor in campos.items():
+            texto = str(valor).strip()
+            if campo in opcoes and texto not in opcoes[campo]:
+                erros.append(f"#{task_id} {campo}: '{texto}' não é uma opção ({', '.join(opcoes[campo])})")
+            elif campo == 'progresso' and not (texto.isdigit() and 0 <= int(texto) <= 100):
+                erros.append(f"#{task_id} progresso: '{texto}' não é um inteiro de 0 a 100")
+            elif campo == 'data_entrega' and pd.isna(interpretar_data(texto)):
+                erros.append(f"#{task_id} data_entrega: '{texto}' não é uma data")
+    return erros
+
+
+def comando_atualizar(args):
+    campos_por_tarefa = ler_alteracoes(args)
+    for campos in campos_por_tarefa.values():
+        # Mesma regra do card: progresso 100% conclui a tarefa
+        if str(campos.get('progresso', '')).strip() == '100' and 'status' not in campos:
+            campos['status'] = "Concluído"
+    campos_por_tarefa = {t: c for t, c in campos_por_tarefa.items() if c}
+    if not campos_por_tarefa:
+        informar("Nenhuma alteração para aplicar.")
+        return 0
+
+    quadro, sheet = abrir_quadro(args)
+    erros = validar_alteracoes(campos_por_tarefa, quadro)
+    if erros:
+        for erro in erros:
+            informar(erro)
+        informar("Nada foi gravado.")
+        return 2
+    alteracoes, nao_encontrados = gravar_campos_em_lote(sheet, campos_por_tarefa)
+    ws_logs = abrir_aba_auxiliar(sheet.spreadsheet, quadro['aba_logs'], COLUNAS_LOGS)
+    gravar_linhas_log(ws_logs, montar_linhas_log("atualizacao", alteracoes, obter_usuario()))
+
+    for task_id, campos in alteracoes.items():
+        for campo, (antigo, novo) in campos.items():
+            print(f"#{task_id} {campo}: {antigo} -> {novo}", flush=True)
+    for task_id in nao_encontrados:
+        informar(f"#{task_id} não encontrada")
+    return 1 if nao_encontrados else 0
+
+
+def comando_verificar(args):
+    quadro, sheet = abrir_quadro(args)
+    df_tarefas, df_logs, df_arquivo = carregar_quadro(sheet, quadro)
+    todas = df_tarefas if df_arquivo.empty else pd.concat(
+        [df_tarefas, df_arquivo[COLUNAS_OBRIGATORIAS]], ignore_index=True)
+    divergencias = comparar_estado_com_planilha(reconstruir_estado(df_logs), todas)
+    emitir_csv(divergencias, ['task_id', 'campo', 'valor_logs', 'valor_planilha'])
+    informar(f"{len(divergencias)} divergência(s) entre planilha e logs.")
+    return 1 if len(divergencias) else 0
+
+
+def ler_estado_integridade(caminho):
+    """Estado salvo pela execução anterior (None se não houver)."""
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, encoding='utf-8') as f:
+        salvo = json.load(f)
+    estado = criar_estado_integridade()
+    estado.update(
+        linhas={int(h): problemas for h, problemas in salvo['linhas'].items()},
+        total_logs=salvo['total_logs'], ids=set(salvo['ids']),
+        assinatura_logs=tuple(salvo['assinatura_logs']) if salvo['assinatura_logs'] else None,
+        divergencias=pd.DataFrame(
+            salvo['divergencias'], columns=['task_id', 'campo', 'valor_logs', 'valor_planilha']))
+    return estado
+
+
+def salvar_estado_integridade(caminho, estado):
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump({
+            'linhas': {str(h): problemas for h, problemas in estado['linhas'].items()},
+            'total_logs': estado['total_logs'], 'ids': sorted(estado['ids']),
+            'assinatura_logs': estado['assinatura_logs'],
+            'divergencias': estado['divergencias'].astype(str).to_dict('records'),
+        }, f, ensure_ascii=False)
+
+
+def comando_integridade(args):
+    quadro, sheet = abrir_quadro(args)
+    valores_tarefas, valores_logs, valores_arquivo = ler_abas_em_lote(sheet, quadro)
+    df_bruto = valores_para_dataframe(valores_tarefas, COLUNAS_OBRIGATORIAS, manter_linhas=True)
+    df_logs = preparar_dataframe_logs(valores_logs)
+    df_arquivo = preparar_dataframe_arquivo(valores_arquivo)
+
+    problemas, estado = verificar_integridade(
+        df_bruto, df_logs, df_arquivo, quadro, ler_estado_integridade(args.estado))
+    salvar_estado_integridade(args.estado, estado)
+    reparos = planejar_reparos(problemas, df_bruto, df_logs, quadro, df_arquivo['id'].tolist())
+    emitir_csv(reparos)
+    informar(f"{len(reparos)} problema(s) encontrado(s).")
+    if not args.reparar or reparos.empty:
+        return 1 if len(reparos) else 0
+
+    alteracoes, ignoradas = aplicar_reparos(sheet, reparos)
+    ws_logs = abrir_aba_auxiliar(sheet.spreadsheet, quadro['aba_logs'], COLUNAS_LOGS)
+    gravar_linhas_log(ws_logs, montar_linhas_log("reparo", alteracoes, obter_usuario()))
+    informar(f"{sum(len(c) for c in alteracoes.values())} célula(s) corrigida(s).")
+    if ignoradas:
+        informar(f"Linhas alteradas desde a leitura (mantidas): {', '.join(map(str, ignoradas))}")
+    return 0
+
+
+def comando_desfazer(args):
+    quadro, sheet = abrir_quadro(args)
+    _, df_logs, _ = carregar_quadro(sheet, quadro)
+    if args.ultimo_lote:
+        selecao = ultimo_lote(df_logs, args.usuario)
+    else:
+        selecao = logs_reversiveis(df_logs, args.desde, args.ate, args.usuario)
+    if args.ids:
+        selecao = selecao[selecao['task_id'].astype(str).isin(args.ids)]
+    plano = planejar_reversao(selecao)
+    acao = acao_reversao(selecao)
+    emitir_csv(plano)
+    if not args.aplicar or plano.empty:
+        informar(f"{len(plano)} campo(s) a {acao}" +
+                 ("" if args.aplicar else " (use --aplicar para gravar)."))
+        return 0
+
+    alteracoes, conflitos = aplicar_reversao(sheet, plano)
+    ws_logs = abrir_aba_auxiliar(sheet.spreadsheet, quadro['aba_logs'], COLUNAS_LOGS)
+    gravar_linhas_log(ws_logs, montar_linhas_log(acao, alteracoes, obter_usuario()))
+    informar(f"{sum(len(c) for c in alteracoes.values())} campo(s) revertido(s).")
+    for task_id, campo, valor_atual, motivo in conflitos[
+            ['task_id', 'campo', 'valor_atual', 'motivo']].itertuples(index=False):
+        informar(f"#{task_id} {campo} mantido ({motivo}): {valor_atual}")
+    return 1 if len(conflitos) else 0
+
+
+def comando_atrasadas(args):
+    quadro, sheet = abrir_quadro(args)
+    df_tarefas, _, _ = carregar_quadro(sheet, quadro)
+    relatorio = relatorio_prazos(df_tarefas, args.dias_alerta)
+    relatorio = relatorio.assign(data_entrega=relatorio['data_entrega'].dt.strftime("%Y-%m-%d"))
+    emitir_csv(relatorio)
+    return 0
+
+
+def comando_alertas(args):
+    """
+    Versão agendável (cron) do agendador de alertas: as faixas da execução
+    anterior ficam em --estado, e só os cruzamentos desde então são notificados.
+    """
+    config = json.loads(os.environ.get("TRACKER_ALERTAS") or "{}")
+    config.update({k: v for k, v in [('canal', args.canal), ('url', args.url)] if v})
+    dias_alerta = args.dias_alerta or int(config.get('dias_alerta', DIAS_ALERTA_PRAZO))
+
+    anteriores = None  # Primeira execução: assume as faixas atuais sem notificar
+    if os.path.exists(args.estado):
+        with open(args.estado, encoding='utf-8') as f:
+            anteriores = json.load(f)
+
+    quadro, sheet = abrir_quadro(args)
+    df_tarefas, _, _ = carregar_quadro(sheet, quadro)
+    indice = criar_indice_prazos(df_tarefas, dias_alerta=dias_alerta, faixas_anteriores=anteriores)
+    alertas = avancar_prazos(indice)
+    if alertas:
+        criar_notificador(config)(alertas)
+        emitir_csv(pd.DataFrame(alertas))
+    informar(f"{len(alertas)} alerta(s) enviado(s) via {config.get('canal', 'local')}.")
+
+    os.makedirs(os.path.dirname(args.estado) or ".", exist_ok=True)
+    with open(args.estado, 'w', encoding='utf-8') as f:
+        json.dump(indice['faixas'], f)
+    return 0
+
+
+def comando_arquivar(args):
+    quadro, sheet = abrir_quadro(args)
+    df_tarefas, df_logs, _ = carregar_quadro(sheet, quadro)
+    candidatas = selecionar_para_arquivar(df_tarefas, df_logs, args.dias)
+    for _, tarefa in candidatas.iterrows():
+        print(f"#{tarefa['id']} {tarefa['titulo']} (concluída em "
+              f"{tarefa['data_conclusao']:%d/%m/%Y})", flush=True)
+    if not args.aplicar or candidatas.empty:
+        informar(f"{len(candidatas)} tarefa(s) a arquivar" +
+                 ("" if args.aplicar else " (use --aplicar para mover)."))
+        return 0
+
+    ws_arquivo = abrir_aba_auxiliar(sheet.spreadsheet, quadro['aba_arquivo'], COLUNAS_ARQUIVO)
+    ids = mover_para_aba_arquivo(sheet, ws_arquivo, candidatas)
+    ws_logs = abrir_aba_auxiliar(sheet.spreadsheet, quadro['aba_logs'], COLUNAS_LOGS)
+    gravar_linhas_log(ws_logs, montar_linhas_log(
+        "arquivamento", {i: {'arquivada': ("", ws_arquivo.title)} for i in ids}, obter_usuario()))
+    informar(f"{len(ids)} tarefa(s) arquivada(s).")
+    return 0
+
+
+def comando_compactar_logs(args):
+    quadro, sheet = abrir_quadro(args)
+    _, df_logs, _ = carregar_quadro(sheet, quadro)
+    ate = pd.Timestamp(datetime.now()) - pd.Timedelta(days=args.dias)
+    compactado, removidos = compactar_logs(df_logs, ate)
+    informar(f"{len(removidos)} evento(s) anteriores a {ate:%d/%m/%Y} viram "
+             f"{len(compactado) - (len(df_logs) - len(removidos))} evento(s) de compactação.")
+    if not args.aplicar or removidos.empty:
+        return 0
+
+    # Os eventos originais ficam guardados em Parquet antes de sair da planilha
+    os.makedirs(args.pasta, exist_ok=True)
+    caminho = os.path.join(args.pasta, f"{datetime.now():%Y%m%d_%H%M%S}_logs_compactados.parquet")
+    with open(caminho, 'wb') as f:
+        f.write(tabela_em_bytes(removidos, SCHEMA_LOGS))
+    informar(f"Eventos originais salvos em {caminho}")
+
+    ws_logs = abrir_aba_auxiliar(sheet.spreadsheet, quadro['aba_logs'], COLUNAS_LOGS)
+    reescrever_logs(ws_logs, compactado,
+                    df_logs.attrs['linhas_planilha'], df_logs.attrs['ultima_linha'])
+    informar(f"Aba '{ws_logs.title}' regravada com {len(compactado)} evento(s).")
+    return 0
+
+
+# --- ARGUMENTOS ---
+def criar_parser():
+    parser = argparse.ArgumentParser(
+        description="Rotinas em lote do Tracker Tasks (Google Sheets).")
+    parser.add_argument("--quadro", help="Nome do quadro (padrão: o primeiro configurado)")
+    parser.add_argument("--quadros", help="JSON com as definições de quadros (padrão: TRACKER_QUADROS)")
+    parser.add_argument("--credenciais", default=ARQUIVO_CREDENCIAIS,
+                        help="Arquivo JSON da Service Account")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("exportar", help="Exporta os dados (snapshot Parquet ou CSV no stdout)")
+    p.add_argument("--formato", choices=["parquet", "csv"], default="parquet")
+    p.add_argument("--dados", choices=["tarefas", "logs", "arquivo"], default="tarefas",
+                   help="Aba exportada em CSV")
+    p.add_argument("--pasta", default=PASTA_SNAPSHOTS)
+    p.set_defaults(funcao=comando_exportar)
+
+    p = sub.add_parser("atualizar", help="Atualiza várias tarefas com uma escrita em lote")
+    p.add_argument("--ids", nargs="+", help="IDs das tarefas")
+    p.add_argument("--status", choices=COLUNAS_KANBAN)
+    p.add_argument("--responsavel", help="Um dos desenvolvedores do quadro")
+    p.add_argument("--prioridade", choices=PRIORIDADES)
+    p.add_argument("--progresso", type=int, choices=range(0, 101), metavar="0-100")
+    p.add_argument("--arquivo", help="CSV com coluna 'id' e uma coluna por campo")
+    p.set_defaults(funcao=comando_atualizar)
+
+    p = sub.add_parser("verificar", help="Compara a planilha com o estado reconstruído dos logs")
+    p.set_defaults(funcao=comando_verificar)
+
+    p = sub.add_parser("integridade", help="Procura (e corrige) linhas inválidas na aba de tarefas")
+    p.add_argument("--estado", default=os.path.join(PASTA_SNAPSHOTS, "integridade.json"),
+                   help="Arquivo com os checksums da última execução (só linhas alteradas são revalidadas)")
+    p.add_argument("--reparar", action="store_true", help="Aplica as correções sugeridas")
+    p.set_defaults(funcao=comando_integridade)
+
+    p = sub.add_parser("desfazer", help="Reverte edições registradas nos logs (de novo = refazer)")
+    periodo = p.add_mutually_exclusive_group(required=True)
+    periodo.add_argument("--desde", type=datetime.fromisoformat, help="Início (ISO, ex.: 2024-05-10T14:00)")
+    periodo.add_argument("--ultimo-lote", action="store_true", help="Só a última gravação")
+    p.add_argument("--ate", type=datetime.fromisoformat, help="Fim do intervalo (ISO)")
+    p.add_argument("--usuario", help="Só as edições deste usuário")
+    p.add_argument("--ids", nargs="+", help="Só estas tarefas")
+    p.add_argument("--aplicar", action="store_true", help="Sem esta opção, só lista")
+    p.set_defaults(funcao=comando_desfazer)
+
+    p = sub.add_parser("atrasadas", help="Lista tarefas atrasadas ou perto do prazo")
+    p.add_argument("--dias-alerta", type=int, default=3)
+    p.set_defaults(funcao=comando_atrasadas)
+
+    p = sub.add_parser("alertas", help="Notifica tarefas que entraram em alerta ou atrasaram")
+    p.add_argument("--canal", choices=["local", "webhook", "email"],
+                   help="Padrão: TRACKER_ALERTAS ou 'local' (arquivo alertas.jsonl)")
+    p.add_argument("--url", help="URL do webhook")
+    p.add_argument("--dias-alerta", type=int)
+    p.add_argument("--estado", default=os.path.join(PASTA_SNAPSHOTS, "alertas.json"),
+                   help="Faixas da última execução (evita alertas repetidos)")
+    p.set_defaults(funcao=comando_alertas)
+
+    p = sub.add_parser("arquivar", help="Move concluídas antigas para a aba de Arquivo")
+    p.add_argument("--dias", type=int, default=DIAS_ARQUIVAMENTO)
+    p.add_argument("--aplicar", action="store_true", help="Sem esta opção, só lista")
+    p.set_defaults(funcao=comando_arquivar)
+
+    p = sub.add_parser("compactar-logs", help="Resume eventos antigos da aba de Logs")
+    p.add_argument("--dias", type=int, default=180, help="Compacta eventos mais antigos que isso")
+    p.add_argument("--pasta", default=PASTA_SNAPSHOTS, help="Onde guardar os eventos originais")
+    p.add_argument("--aplicar", action="store_true", help="Sem esta opção, só simula")
+    p.set_defaults(funcao=comando_compactar_logs)
+    return parser
+
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    try:
+        return args.funcao(args)
+    except ErroPlanilha as e:
+        informar(f"Erro: {e}")
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
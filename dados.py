@@ -0,0 +1,1868 @@
+"""
+Camada de dados do Tracker Tasks, independente do Streamlit.
+
+Reúne a leitura/escrita no Google Sheets e as transformações sobre as
+tarefas e os logs. É usada tanto pela interface (app.py) quanto pela
+linha de comando (cli.py); erros são sinalizados com ErroPlanilha.
+"""
+import re
+import time
+import random
+import bisect
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime
+import os
+import pandas as pd
+import gspread
+import pyarrow as pa
+import pyarrow.parquet as pq
+from google.oauth2.service_account import Credentials
+
+
+# --- CONSTANTES E SETUP ---
+NOME_PLANILHA = "Tasks Devs"
+ARQUIVO_CREDENCIAIS = "credentials.json"
+NOME_ABA_LOGS = "Logs"
+NOME_ABA_ARQUIVO = "Arquivo"
+
+COLUNAS_KANBAN = ["Backlog/A Fazer",
+                  "Em Desenvolvimento", "Code Review/QA", "Concluído"]
+DESENVOLVEDORES = ["Eduardo", "Israel", "Pedro", "Vinícius"]
+TIPOS_TAREFA = ["Feature (Nova Funcionalidade)",
+                "Bugfix (Correção)", "Refatoração", "Infraestrutura"]
+PRIORIDADES = ["🔴 Urgente", "🟡 Alta", "🟢 Média", "⚪ Baixa"]
+
+COLUNAS_OBRIGATORIAS = ['id', 'titulo', 'descricao', 'responsavel', 'status', 'tipo',
+                        'prioridade', 'data_entrega', 'progresso', 'data_criacao']
+COLUNAS_LOGS = ['timestamp', 'acao', 'task_id', 'campo',
+                'valor_antigo', 'valor_novo', 'usuario']
+COLUNAS_ARQUIVO = COLUNAS_OBRIGATORIAS + ['data_conclusao', 'data_arquivamento']
+COLUNAS_PROBLEMAS = ['linha', 'id', 'campo', 'problema', 'valor', 'esperado']
+
+PASTA_SNAPSHOTS = "snapshots"
+INTERVALO_CHECKPOINT = 500  # Linhas de log entre checkpoints do estado reconstruído
+DIAS_ARQUIVAMENTO = 30  # Tarefas concluídas há mais tempo que isso vão para o Arquivo
+JANELA_VELOCIDADE = 28  # Dias de histórico usados para estimar a velocidade de cada dev
+CAMPOS_BUSCA = ['titulo', 'descricao']
+COLUNAS_SOB_DEMANDA = ['descricao']  # Texto longo: fora da carga, lido só quando necessário
+
+# Schemas dos snapshots Parquet (espelham COLUNAS_OBRIGATORIAS e COLUNAS_LOGS)
+SCHEMA_TAREFAS = pa.schema([
+    ('id', pa.int64()),
+    ('titulo', pa.string()),
+    ('descricao', pa.string()),
+    ('responsavel', pa.string()),
+    ('status', pa.string()),
+    ('tipo', pa.string()),
+    ('prioridade', pa.string()),
+    ('data_entrega', pa.timestamp('us')),
+    ('progresso', pa.int64()),
+    ('data_criacao', pa.timestamp('us')),
+])
+SCHEMA_LOGS = pa.schema([
+    ('timestamp', pa.timestamp('us')),
+    ('acao', pa.string()),
+    ('task_id', pa.string()),
+    ('campo', pa.string()),
+    ('valor_antigo', pa.string()),
+    ('valor_novo', pa.string()),
+    ('usuario', pa.string()),
+])
+
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive"
+]
+
+
+class ErroPlanilha(Exception):
+    """Falha de conexão, estrutura ou escrita na planilha."""
+
+
+# --- CONEXÃO E QUADROS ---
+def montar_quadros(definicoes=None):
+    """
+    Completa as definições de quadros com os valores padrão.
+    Sem definições, retorna um único quadro com as constantes deste módulo.
+
+    Returns:
+        OrderedDict: {nome: definição completa do quadro}
+    """
+    quadros = OrderedDict()
+    for definicao in definicoes or [{}]:
+        definicao = dict(definicao)
+        quadro = {
+            'nome': definicao.get('nome', NOME_PLANILHA),
+            'planilha': definicao.get('planilha', NOME_PLANILHA),
+            'aba': definicao.get('aba'),  # None = primeira aba
+            'aba_logs': definicao.get('aba_logs', NOME_ABA_LOGS),
+            'aba_arquivo': definicao.get('aba_arquivo', NOME_ABA_ARQUIVO),
+            'desenvolvedores': list(definicao.get('desenvolvedores', DESENVOLVEDORES)),
+            'tipos': list(definicao.get('tipos', TIPOS_TAREFA)),
+        }
+        quadros[quadro['nome']] = quadro
+    return quadros
+
+
+def autorizar_cliente(info_credenciais=None, arquivo_credenciais=ARQUIVO_CREDENCIAIS):
+    """
+    Autoriza o cliente gspread com a Service Account (dicionário ou arquivo JSON).
+
+    Raises:
+        ErroPlanilha: Se nenhuma credencial for encontrada
+    """
+    if info_credenciais:
+        credentials = Credentials.from_service_account_info(
+            info_credenciais, scopes=SCOPES)
+    elif os.path.exists(arquivo_credenciais):
+        credentials = Credentials.from_service_account_file(
+            arquivo_credenciais, scopes=SCOPES)
+    else:
+        raise ErroPlanilha(
+            "Nenhuma credencial encontrada! Configure os Secrets (na nuvem) ou adicione 'credentials.json' (local).")
+    return gspread.authorize(credentials)
+
+
+def abrir_aba_tarefas(client, quadro):
+    """
+    Abre a aba de tarefas de um quadro.
+
+    Raises:
+        ErroPlanilha: Planilha/aba inexistente ou Google Drive API desativada
+    """
+    try:
+        spreadsheet = client.open(quadro['planilha'])
+        return spreadsheet.worksheet(quadro['aba']) if quadro['aba'] else spreadsheet.sheet1
+    except gspread.SpreadsheetNotFound:
+        raise ErroPlanilha(
+            f"Planilha '{quadro['planilha']}' não encontrada! Verifique se o nome está exato e se compartilhou com o email da service account.")
+    except gspread.exceptions.WorksheetNotFound:
+        raise ErroPlanilha(f"Aba '{quadro['aba']}' não encontrada na planilha '{quadro['planilha']}'!")
+    except gspread.exceptions.APIError as e:
+        if "Google Drive API has not been used" in str(e):
+            raise ErroPlanilha(
+                "ERRO DE API: A 'Google Drive API' não está ativada no seu projeto do Google Cloud.") from e
+        raise
+
+
+def abrir_aba_auxiliar(spreadsheet, nome_aba, colunas):
+    """Abre (ou cria com cabeçalhos) uma aba auxiliar da planilha."""
+    try:
+        ws = spreadsheet.worksheet(nome_aba)
+    except gspread.exceptions.WorksheetNotFound:
+        ws = spreadsheet.add_worksheet(title=nome_aba, rows=1, cols=len(colunas))
+        ws.update([list(colunas)])
+    return ws
+
+
+# --- TRATAMENTO DE DADOS VAZIOS E VALIDAÇÃO ---
+def validar_estrutura_planilha(df):
+    """
+    Valida se o DataFrame possui todas as colunas obrigatórias.
+    Retorna (bool, lista_colunas_faltantes)
+    """
+    colunas_faltantes = [
+        col for col in COLUNAS_OBRIGATORIAS if col not in df.columns]
+    return len(colunas_faltantes) == 0, colunas_faltantes
+
+
+def faixa_aba(titulo):
+    """Monta a notação A1 que cobre uma aba inteira (escapando aspas simples)."""
+    return "'" + titulo.replace("'", "''") + "'"
+
+
+def letra_coluna(numero):
+    """Letra(s) da coluna na notação A1 (1 -> "A", 27 -> "AA")."""
+    return re.sub(r"\d", "", gspread.utils.rowcol_to_a1(1, numero))
+
+
+def faixas_contiguas(headers, colunas):
+    """
+    Agrupa as posições (base 1) das colunas pedidas em blocos contíguos,
+    para ler várias colunas vizinhas com uma única faixa.
+
+    Returns:
+        list: [(primeira, ultima), ...] na ordem da planilha
+    """
+    blocos = []
+    for posicao in sorted(headers.index(c) + 1 for c in colunas if c in headers):
+        if blocos and posicao == blocos[-1][1] + 1:
+            blocos[-1] = (blocos[-1][0], posicao)
+        else:
+            blocos.append((posicao, posicao))
+    return blocos
+
+
+def juntar_faixas(matrizes, larguras):
+    """
+    Junta lado a lado as matrizes devolvidas para cada bloco de colunas
+    (a API omite células e linhas vazias no fim de cada faixa).
+    """
+    altura = max((len(m) for m in matrizes), default=0)
+    linhas = [[] for _ in range(altura)]
+    for matriz, largura in zip(matrizes, larguras):
+        for i, linha in enumerate(linhas):
+            parte = list(matriz[i][:largura]) if i < len(matriz) else []
+            linha.extend(parte + [""] * (largura - len(parte)))
+    return linhas
+
+
+def valores_para_dataframe(valores, colunas_padrao=None, manter_linhas=False):
+    """
+    Converte a matriz crua devolvida pela API (primeira linha = cabeçalhos)
+    em DataFrame, completando linhas curtas e descartando linhas vazias.
+    Com manter_linhas=True, o índice é o número da linha na planilha.
+    """
+    if not valores or not valores[0]:
+        return pd.DataFrame(columns=colunas_padrao or [])
+
+    headers = [str(h) for h in valores[0]]
+    largura = len(headers)
+    linhas = []
+    numeros = []
+    for numero, linha in enumerate(valores[1:], start=2):
+        linha = list(linha[:largura]) + [""] * (largura - len(linha))
+        if any(str(v).strip() for v in linha):
+            linhas.append(linha)
+            numeros.append(numero)
+    return pd.DataFrame(linhas, columns=headers, index=numeros if manter_linhas else None)
+
+
+def preparar_dataframe_logs(valores):
+    """Converte os valores crus da aba de Logs em DataFrame tipado."""
+    df_logs = valores_para_dataframe(valores, COLUNAS_LOGS)
+    # Linhas de dados na aba (inclui linhas em branco), base do change-feed
+    df_logs.attrs['linhas_planilha'] = max(len(valores) - 1, 0)
+    # Última linha como veio da API: marcador para o change-feed (buscar_logs_novos)
+    df_logs.attrs['ultima_linha'] = list(valores[-1]) if len(valores) > 1 else None
+    for coluna in COLUNAS_LOGS:
+        if coluna not in df_logs.columns:
+            df_logs[coluna] = ""
+    df_logs['timestamp'] = pd.to_datetime(df_logs['timestamp'], errors='coerce')
+    return df_logs
+
+
+def converter_tipos_tarefas(df):
+    """Coage os tipos das colunas críticas, descartando linhas sem ID válido."""
+    # Garante que ID seja numérico
+    df['id'] = pd.to_numeric(df['id'], errors='coerce')
+    df = df.dropna(subset=['id']).copy()  # Remove linhas com ID inválido
+    df['id'] = df['id'].astype(int)
+
+    # Garante que progresso seja numérico
+    df['progresso'] = pd.to_numeric(
+        df['progresso'], errors='coerce').fillna(0)
+
+    # Garante que datas sejam válidas
+    df['data_entrega'] = pd.to_datetime(
+        df['data_entrega'], errors='coerce')
+    df['data_criacao'] = pd.to_datetime(
+        df['data_criacao'], errors='coerce')
+    return df
+
+
+def preparar_dataframe_arquivo(valores):
+    """Converte os valores crus da aba de Arquivo em DataFrame tipado."""
+    df_arquivo = valores_para_dataframe(valores, COLUNAS_ARQUIVO)
+    for coluna in COLUNAS_ARQUIVO:
+        if coluna not in df_arquivo.columns:
+            df_arquivo[coluna] = ""
+    df_arquivo = converter_tipos_tarefas(df_arquivo)
+    for coluna in ['data_conclusao', 'data_arquivamento']:
+        df_arquivo[coluna] = pd.to_datetime(df_arquivo[coluna], errors='coerce')
+    return df_arquivo
+
+
+def faixa_inexistente(erro):
+    """A API responde 400 "Unable to parse range" quando a aba da faixa não existe."""
+    return erro.code == 400 and "Unable to parse range" in str(erro.error.get('message', ''))
+
+
+def ler_abas_em_lote(sheet, quadro, headers=None, omitir=()):
+    """
+    Busca a aba de tarefas, a aba de Logs e o Arquivo em UMA única
+    requisição (values_batch_get), em vez de uma leitura por aba.
+
+    Args:
+        headers: Cabeçalho já conhecido da aba de tarefas (permite a projeção)
+        omitir: Colunas da aba de tarefas que não devem ser transferidas
+
+    Returns:
+        tuple: (valores_tarefas, valores_logs, valores_arquivo) como listas de listas
+    """
+    ss = sheet.spreadsheet
+    faixas, blocos = faixas_projetadas(sheet, headers, omitir)
+    faixas += [faixa_aba(quadro['aba_logs']), faixa_aba(quadro['aba_arquivo'])]
+    try:
+        resposta = ss.values_batch_get(faixas)
+    except gspread.exceptions.APIError as e:
+        if not faixa_inexistente(e):
+            raise  # Cota (429), erro do servidor (5xx)...: não é aba faltando
+        # Abas auxiliares ainda não existem: cria e repete a leitura
+        abrir_aba_auxiliar(ss, quadro['aba_logs'], COLUNAS_LOGS)
+        abrir_aba_auxiliar(ss, quadro['aba_arquivo'], COLUNAS_ARQUIVO)
+        resposta = ss.values_batch_get(faixas)
+
+    value_ranges = resposta.get('valueRanges', [])
+    valores = [
+        value_ranges[i].get('values', []) if len(value_ranges) > i else []
+        for i in range(len(faixas))
+    ]
+    if not blocos:
+        return tuple(valores)
+
+    valores_tarefas = juntar_projecao(valores[:-2], headers, blocos)
+    if valores_tarefas is None:
+        # O cabeçalho mudou desde a última leitura: volta à leitura completa
+        return ler_abas_em_lote(sheet, quadro)
+    return (valores_tarefas, valores[-2], valores[-1])
+
+
+def faixas_projetadas(sheet, headers=None, omitir=()):
+    """
+    Faixas A1 da aba de tarefas sem as colunas omitidas.
+
+    Returns:
+        tuple: (faixas, blocos). blocos é None quando a aba é lida inteira.
+    """
+    blocos = faixas_contiguas(headers, [c for c in headers if c not in omitir]) \
+        if headers and set(omitir) & set(headers) else None
+    if not blocos:
+        return [faixa_aba(sheet.title)], None
+    # Projeção: só os blocos de colunas necessários da aba de tarefas
+    return [f"{faixa_aba(sheet.title)}!{letra_coluna(i)}:{letra_coluna(f)}" for i, f in blocos], blocos
+
+
+def juntar_projecao(matrizes, headers, blocos):
+    """Junta os blocos lidos; None se o cabeçalho não é mais o esperado."""
+    valores_tarefas = juntar_faixas(matrizes, [f - i + 1 for i, f in blocos])
+    esperado = [headers[p - 1] for i, f in blocos for p in range(i, f + 1)]
+    if not valores_tarefas or [str(h) for h in valores_tarefas[0]] != esperado:
+        return None
+    return valores_tarefas
+
+
+def carregar_tarefas(sheet, headers=None, omitir=()):
+    """
+    Lê só a aba de tarefas (sem Logs nem Arquivo) em UMA requisição,
+    projetada como em ler_abas_em_lote. Usada pelos alertas a cada ciclo.
+
+    Returns:
+        DataFrame: Tarefas com tipos convertidos; as colunas omitidas ficam
+        com None e o cabeçalho completo da aba fica em attrs['cabecalho']
+        (para projetar a leitura seguinte)
+
+    Raises:
+        ErroPlanilha: Se a aba de tarefas não tiver as colunas obrigatórias
+    """
+    faixas, blocos = faixas_projetadas(sheet, headers, omitir)
+    value_ranges = sheet.spreadsheet.values_batch_get(faixas).get('valueRanges', [])
+    valores = [value_ranges[i].get('values', []) if len(value_ranges) > i else []
+               for i in range(len(faixas))]
+    if not blocos:
+        valores_tarefas = valores[0]
+    else:
+        valores_tarefas = juntar_projecao(valores, headers, blocos)
+        if valores_tarefas is None:
+            return carregar_tarefas(sheet)  # Cabeçalho mudou: leitura completa
+
+    df = valores_para_dataframe(valores_tarefas, COLUNAS_OBRIGATORIAS)
+    lidas = [str(h) for h in valores_tarefas[0]] if valores_tarefas else []
+    for coluna in omitir:
+        if coluna in (headers or []) and coluna not in lidas:
+            df[coluna] = None
+    estrutura_valida, colunas_faltantes = validar_estrutura_planilha(df)
+    if not estrutura_valida:
+        raise ErroPlanilha(
+            f"Estrutura da planilha inválida! Colunas faltantes: {', '.join(colunas_faltantes)}")
+    df = converter_tipos_tarefas(df).reset_index(drop=True)
+    df.attrs['cabecalho'] = list(headers) if blocos else lidas
+    return df
+
+
+def carregar_quadro(sheet, quadro, headers=None, omitir=(), completar_cabecalho=False):
+    """
+    Carrega tarefas, logs e arquivo. A planilha só é alterada com
+    completar_cabecalho=True, e apenas no cabeçalho (os dados são preservados).
+
+    Args:
+        headers, omitir: Como em ler_abas_em_lote; as colunas omitidas ficam com None
+        completar_cabecalho: Acrescenta ao cabeçalho as colunas obrigatórias
+                             ausentes em vez de falhar
+
+    Returns:
+        tuple: (df_tarefas, df_logs, df_arquivo). Em df_tarefas.attrs:
+        'linha_por_id' (linha de cada tarefa na planilha), 'cabecalho_lido',
+        'colunas_adicionadas' e 'linhas_ignoradas' (sem ID válido).
+
+    Raises:
+        ErroPlanilha: Se a aba de tarefas não tiver as colunas obrigatórias
+                      (e completar_cabecalho=False)
+    """
+    valores_tarefas, valores_logs, valores_arquivo = ler_abas_em_lote(sheet, quadro, headers, omitir)
+    df_tarefas = valores_para_dataframe(valores_tarefas, COLUNAS_OBRIGATORIAS, manter_linhas=True)
+    lidas = [str(h) for h in valores_tarefas[0]] if valores_tarefas else []
+    for coluna in omitir:
+        if coluna in (headers or []) and coluna not in lidas:
+            df_tarefas[coluna] = None
+    estrutura_valida, colunas_faltantes = validar_estrutura_planilha(df_tarefas)
+    if not estrutura_valida:
+        if not completar_cabecalho:
+            raise ErroPlanilha(
+                f"Estrutura da planilha inválida! Colunas faltantes: {', '.join(colunas_faltantes)}")
+        adicionar_colunas_faltantes(sheet, colunas_faltantes)
+        for coluna in colunas_faltantes:
+            df_tarefas[coluna] = ""
+
+    total = len(df_tarefas)
+    df_tarefas = converter_tipos_tarefas(df_tarefas)
+    linha_por_id = dict(zip(df_tarefas['id'].astype(str), df_tarefas.index))
+    df_tarefas = df_tarefas.reset_index(drop=True)
+    df_tarefas.attrs.update(
+        linha_por_id=linha_por_id, cabecalho_lido=lidas,
+        colunas_adicionadas=[] if estrutura_valida else colunas_faltantes,
+        linhas_ignoradas=total - len(df_tarefas))
+    return (df_tarefas,
+            preparar_dataframe_logs(valores_logs),
+            preparar_dataframe_arquivo(valores_arquivo))
+
+
+# --- ESCRITA NA PLANILHA ---
+def montar_linhas_log(acao, alteracoes_por_tarefa, usuario):
+    """
+    Monta as linhas da aba de Logs.
+
+    Args:
+        acao: "criacao", "atualizacao", "arquivamento"...
+        alteracoes_por_tarefa: {task_id: {campo: (valor_antigo, valor_novo)}}
+        usuario: Autor da alteração
+    """
+    linhas = []
+    ts = datetime.now().isoformat()
+    for task_id, alteracoes in alteracoes_por_tarefa.items():
+        for campo, par in alteracoes.items():
+            antigo, novo = par
+            linhas.append([ts, acao, str(task_id), campo, str(antigo) if antigo is not None else "", str(novo) if novo is not None else "", usuario])
+    return linhas
+
+
+def gravar_linhas_log(ws, linhas):
+    """Grava as linhas de log com um único append_rows (com fallback linha a linha)."""
+    if not linhas:
+        return
+    try:
+        ws.append_rows(linhas, value_input_option="USER_ENTERED")
+    except Exception:
+        for linha in linhas:
+            ws.append_row(linha, value_input_option="USER_ENTERED")
+
+
+def ler_linhas_por_id(sheet):
+    """
+    Uma leitura para cabeçalhos + coluna de IDs.
+
+    Returns:
+        tuple: (headers, {id (texto): número da linha})
+    """
+    faixa_headers, faixa_ids = sheet.batch_get(['1:1', 'A:A'])
+    headers = faixa_headers[0] if faixa_headers else []
+    linha_por_id = {}
+    for pos, valor in enumerate(faixa_ids[1:], start=2):
+        if valor and str(valor[0]).strip():
+            linha_por_id.setdefault(str(valor[0]).strip(), pos)
+    return headers, linha_por_id
+
+
+def gravar_campos_em_lote(sheet, campos_por_tarefa):
+    """
+    Grava campos de várias tarefas com UM batch_update.
+
+    Args:
+        campos_por_tarefa: Dicionário {task_id: {campo: novo_valor}}
+
+    Returns:
+        tuple: ({task_id: {campo: (valor_antigo, novo_valor)}}, ids_nao_encontrados)
+    """
+    headers, linha_por_id = ler_linhas_por_id(sheet)
+
+    celulas = []
+    nao_encontrados = []
+    for task_id, campos_valores in campos_por_tarefa.items():
+        row_index = linha_por_id.get(str(task_id))
+        if row_index is None:
+            nao_encontrados.append(task_id)
+            continue
+        for campo, valor in campos_valores.items():
+            if campo in headers:
+                celulas.append((task_id, campo, gspread.utils.rowcol_to_a1(
+                    row_index, headers.index(campo) + 1), valor))
+
+    if not celulas:
+        return {}, nao_encontrados
+
+    # Uma leitura dos valores antigos (para o log) e uma escrita em lote
+    valores_antigos = sheet.batch_get([c[2] for c in celulas])
+    sheet.batch_update([
+        {'range': a1, 'values': [[str(valor)]]} for _, _, a1, valor in celulas
+    ])
+
+    alteracoes = {}
+    for (task_id, campo, _, valor), antigo in zip(celulas, valores_antigos):
+        valor_antigo = antigo[0][0] if antigo and antigo[0] else ""
+        alteracoes.setdefault(task_id, {})[campo] = (valor_antigo, valor)
+    return alteracoes, nao_encontrados
+
+
+def gerar_id_unico(sheet, nome_aba_arquivo, max_tentativas=5):
+    """
+    Próximo ID livre, lido DIRETAMENTE da planilha (tarefas + Arquivo), com
+    novas tentativas e backoff exponencial em caso de limite de cota.
+
+    Raises:
+        ErroPlanilha: Se falhar após todas as tentativas
+    """
+    for tentativa in range(1, max_tentativas + 1):
+        try:
+            ids_existentes = ler_ids_existentes(sheet, nome_aba_arquivo)
+            return max(ids_existentes) + 1 if ids_existentes else 1
+        except gspread.exceptions.APIError as e:
+            if "RATE_LIMIT_EXCEEDED" not in str(e) and e.code != 429:
+                raise
+            if tentativa == max_tentativas:
+                raise ErroPlanilha(f"Falha ao gerar ID após {max_tentativas} tentativas: {e}") from e
+            time.sleep((2 ** tentativa) + random.uniform(0, 1))  # Backoff exponencial com jitter
+
+
+def contar_linhas_com_id(sheet, task_id):
+    """Quantas linhas da aba de tarefas têm este ID (coluna A, uma leitura)."""
+    return sum(1 for valor in sheet.col_values(1)[1:] if str(valor).strip() == str(task_id))
+
+
+def anexar_tarefa(sheet, tarefa):
+    """
+    Acrescenta a tarefa no fim da aba, na ordem dos cabeçalhos da planilha.
+
+    Returns:
+        list: Cabeçalhos usados
+
+    Raises:
+        ErroPlanilha: Se a planilha não tiver cabeçalhos
+    """
+    headers = sheet.row_values(1)
+    if not headers:
+        raise ErroPlanilha("Planilha sem cabeçalhos! Impossível adicionar tarefa.")
+    sheet.append_row([str(tarefa.get(coluna, '')) for coluna in headers],
+                     value_input_option='USER_ENTERED')
+    return headers
+
+
+def adicionar_colunas_faltantes(sheet, faltantes):
+    """
+    Acrescenta ao cabeçalho as colunas obrigatórias ausentes, sem tocar nos dados.
+
+    O cabeçalho é relido da planilha: o da carga pode vir projetado (sem as
+    colunas sob demanda) e posicionaria as novas colunas sobre as existentes.
+    """
+    inicio = len(sheet.row_values(1)) + 1
+    necessarias = inicio + len(faltantes) - 1
+    if necessarias > sheet.col_count:
+        sheet.add_cols(necessarias - sheet.col_count)
+    sheet.update([list(faltantes)], gspread.utils.rowcol_to_a1(1, inicio))
+
+
+def ler_coluna_por_id(sheet, headers, campo):
+    """
+    Lê a coluna `campo` da aba de tarefas (com a coluna de IDs) em UMA requisição.
+
+    Returns:
+        dict: {id (texto): valor}
+    """
+    faixas = []
+    for coluna in ['id', campo]:
+        letra = letra_coluna(headers.index(coluna) + 1)
+        faixas.append(f"{faixa_aba(sheet.title)}!{letra}2:{letra}")
+    resposta = sheet.spreadsheet.values_batch_get(faixas)
+    coluna_ids, coluna_valores = [
+        [linha[0] if linha else "" for linha in faixa.get('values', [])]
+        for faixa in resposta.get('valueRanges', [{}, {}])
+    ]
+    coluna_valores += [""] * (len(coluna_ids) - len(coluna_valores))
+    return {str(i).strip(): v for i, v in zip(coluna_ids, coluna_valores) if str(i).strip()}
+
+
+def ler_campo_da_linha(sheet, headers, linha, task_id, campo):
+    """
+    Lê um campo de uma tarefa pela linha conhecida, conferindo o ID na mesma requisição.
+
+    Returns:
+        str: Valor do campo, ou None se a linha não é mais dessa tarefa
+    """
+    valor_id, valor = sheet.batch_get([
+        gspread.utils.rowcol_to_a1(linha, headers.index('id') + 1),
+        gspread.utils.rowcol_to_a1(linha, headers.index(campo) + 1),
+    ])
+    if not valor_id or not valor_id[0] or str(valor_id[0][0]).strip() != str(task_id):
+        return None
+    return valor[0][0] if valor and valor[0] else ""
+
+
+def ler_ids_existentes(sheet, nome_aba_arquivo):
+    """
+    Lê TODOS os IDs da coluna 'id' (coluna A) da aba de tarefas e do Arquivo,
+    numa só requisição: IDs arquivados seguem reservados.
+
+    Returns:
+        list: IDs inteiros (valores inválidos são ignorados)
+    """
+    resposta = sheet.spreadsheet.values_batch_get([
+        f"{faixa_aba(sheet.title)}!A:A",
+        f"{faixa_aba(nome_aba_arquivo)}!A:A",
+    ])
+
+    # Remove o cabeçalho e converte para int
+    ids_existentes = []
+    for faixa in resposta.get('valueRanges', []):
+        for valor in faixa.get('values', [])[1:]:  # Pula o cabeçalho
+            try:
+                ids_existentes.append(int(valor[0]))
+            except (ValueError, TypeError, IndexError):
+                continue  # Ignora valores inválidos
+    return ids_existentes
+
+
+def criar_dados_iniciais():
+    """Tarefas de exemplo para uma planilha vazia."""
+    return pd.DataFrame({
+        "id": [1, 2, 3, 4, 5],
+        "titulo": ["Landing Page Vestibular", "Correção Menu Mobile", "API de Notas", "Otimização de SEO", "Migração de Servidor"],
+        "descricao": ["Criar página responsiva para captação de alunos", "Ajustar menu collapse no mobile", "Desenvolver API REST para consulta de notas", "Melhorar ranqueamento no Google", "Migrar para servidor AWS"],
+        "responsavel": ["Pedro", "Israel", "Vinícius", "Eduardo", "Pedro"],
+        "status": ["Concluído", "Em Desenvolvimento", "Code Review/QA", "Backlog/A Fazer", "Backlog/A Fazer"],
+        "tipo": ["Feature (Nova Funcionalidade)", "Bugfix (Correção)", "Feature (Nova Funcionalidade)", "Refatoração", "Infraestrutura"],
+        "prioridade": ["🟢 Média", "🔴 Urgente", "🟡 Alta", "⚪ Baixa", "🟡 Alta"],
+        "data_entrega": ["2025-12-01", "2025-11-25", "2025-11-30", "2025-12-15", "2026-01-10"],
+        "progresso": [100, 60, 90, 0, 10],
+        "data_criacao": [datetime.now().strftime("%Y-%m-%d")] * 5
+    })
+
+
+def salvar_tarefas(sheet, df):
+    """
+    Salva o DataFrame COMPLETO na aba de tarefas (operação pesada).
+    """
+    sheet.clear()
+    dados_lista = [df.columns.values.tolist()] + df.astype(str).values.tolist()
+    sheet.update(dados_lista)
+
+
+# --- SNAPSHOTS COLUNARES (PARQUET) ---
+def dataframe_para_tabela(df, schema):
+    """
+    Converte um DataFrame em tabela Arrow no schema informado,
+    criando colunas ausentes e coagindo os tipos.
+    """
+    df = df.copy()
+    for campo in schema:
+        if campo.name not in df.columns:
+            df[campo.name] = None
+        if pa.types.is_timestamp(campo.type):
+            df[campo.name] = pd.to_datetime(df[campo.name], errors='coerce')
+        elif pa.types.is_integer(campo.type):
+            df[campo.name] = pd.to_numeric(
+                df[campo.name], errors='coerce').fillna(0).astype('int64')
+        else:
+            df[campo.name] = df[campo.name].fillna("").astype(str)
+    return pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+
+
+def tabela_em_bytes(df, schema):
+    """Serializa o DataFrame em Parquet comprimido (para download)."""
+    buffer = pa.BufferOutputStream()
+    pq.write_table(dataframe_para_tabela(df, schema), buffer, compression='zstd')
+    return buffer.getvalue().to_pybytes()
+
+
+def exportar_snapshot(df_tarefas, df_logs, pasta=PASTA_SNAPSHOTS):
+    """
+    Grava tarefas e logs em arquivos Parquet comprimidos na pasta local.
+
+    Returns:
+        str: Identificador (carimbo de data/hora) do snapshot gerado
+    """
+    os.makedirs(pasta, exist_ok=True)
+    carimbo = datetime.now().strftime("%Y%m%d_%H%M%S")
+    pq.write_table(dataframe_para_tabela(df_tarefas, SCHEMA_TAREFAS),
+                   os.path.join(pasta, f"{carimbo}_tarefas.parquet"), compression='zstd')
+    pq.write_table(dataframe_para_tabela(df_logs, SCHEMA_LOGS),
+                   os.path.join(pasta, f"{carimbo}_logs.parquet"), compression='zstd')
+    return carimbo
+
+
+def listar_snapshots(pasta=PASTA_SNAPSHOTS):
+    """Lista os carimbos dos snapshots completos, do mais recente ao mais antigo."""
+    if not os.path.isdir(pasta):
+        return []
+    arquivos = set(os.listdir(pasta))
+    carimbos = [
+        nome[:-len("_tarefas.parquet")] for nome in arquivos
+        if nome.endswith("_tarefas.parquet")
+    ]
+    return sorted(
+        [c for c in carimbos if f"{c}_logs.parquet" in arquivos], reverse=True)
+
+
+def ler_tabela_parquet(origem, schema):
+    """Lê um Parquet (caminho ou arquivo enviado) e o normaliza para o schema."""
+    df = pq.read_table(origem).to_pandas()
+    return dataframe_para_tabela(df, schema).to_pandas()
+
+
+def carregar_snapshot(carimbo, pasta=PASTA_SNAPSHOTS):
+    """
+    Carrega um snapshot local.
+
+    Returns:
+        tuple: (df_tarefas, df_logs)
+    """
+    df_tarefas = ler_tabela_parquet(
+        os.path.join(pasta, f"{carimbo}_tarefas.parquet"), SCHEMA_TAREFAS)
+    df_logs = ler_tabela_parquet(
+        os.path.join(pasta, f"{carimbo}_logs.parquet"), SCHEMA_LOGS)
+    return df_tarefas, df_logs
+
+
+def carregar_ultimo_snapshot(pasta=PASTA_SNAPSHOTS):
+    """
+    Retorna (carimbo, df_tarefas, df_logs) do snapshot mais recente,
+    ou None se não houver snapshot legível.
+    """
+    for carimbo in listar_snapshots(pasta):
+        try:
+            df_tarefas, df_logs = carregar_snapshot(carimbo, pasta)
+            return carimbo, df_tarefas, df_logs
+        except Exception:
+            continue  # Snapshot corrompido: tenta o anterior
+    return None
+
+
+def alteracoes_restauracao(df_atual, df_restaurado):
+    """
+    Diferenças entre as tarefas da planilha e as de um snapshot a restaurar,
+    no formato de montar_linhas_log, para que a restauração fique nos logs.
+
+    Returns:
+        tuple: (criadas, alteradas). Tarefas que saem da planilha entram em
+        alteradas com o campo 'removida'.
+    """
+    atual, restaurado = (
+        df.assign(task_id=df['id'].astype(str)).drop_duplicates('task_id').set_index('task_id')
+        for df in (df_atual, df_restaurado))
+    campos = [c for c in COLUNAS_OBRIGATORIAS if c in restaurado.columns]
+
+    criadas, alteradas = {}, {}
+    for task_id, linha in restaurado.iterrows():
+        novos = {c: normalizar_valor(c, linha[c]) for c in campos}
+        if task_id not in atual.index:
+            criadas[task_id] = {c: (None, v) for c, v in novos.items()}
+            continue
+        antigos = {c: normalizar_valor(c, atual.at[task_id, c]) if c in atual.columns else ""
+                   for c in campos}
+        diferencas = {c: (antigos[c], novos[c]) for c in campos if antigos[c] != novos[c]}
+        if diferencas:
+            alteradas[task_id] = diferencas
+    for task_id in atual.index.difference(restaurado.index):
+        alteradas[task_id] = {'removida': ("", "restauração")}
+    return criadas, alteradas
+
+
+# --- ANALYTICS DO LOG DE AUDITORIA ---
+def criar_estado_analytics():
+    """Estado vazio do motor de analytics (acumulado a partir dos logs)."""
+    return {
+        'linhas_processadas': 0,
+        'assinatura': None,
+        # Último status conhecido de cada tarefa: index task_id, colunas [status, timestamp]
+        'ultimo_estado': pd.DataFrame(columns=['status', 'timestamp']).astype(
+            {'timestamp': 'datetime64[ns]'}),
+        # Segundos acumulados em cada coluna: index (task_id, status)
+        'tempo_colunas': pd.Series(dtype='float64'),
+        # Marcos por tarefa: index task_id, colunas [criacao, inicio, conclusao]
+        'marcos': pd.DataFrame(columns=['criacao', 'inicio', 'conclusao'], dtype='datetime64[ns]'),
+        # Entradas em "Concluído": colunas [task_id, timestamp]
+        'conclusoes': pd.DataFrame(columns=['task_id', 'timestamp']),
+        # Variação diária de tarefas por coluna (base do fluxo cumulativo): index (dia, status)
+        'deltas_cfd': pd.Series(dtype='float64'),
+    }
+
+
+def somar_series(base, acrescimo):
+    """Soma duas séries indexadas, tratando a base vazia do estado inicial."""
+    if base.empty:
+        return acrescimo.astype('float64')
+    return base.add(acrescimo, fill_value=0)
+
+
+def assinatura_log(df_logs, posicao):
+    """Identifica a linha de log em `posicao` para detectar reordenações da aba."""
+    if posicao < 0 or posicao >= len(df_logs):
+        return None
+    linha = df_logs.iloc[posicao]
+    return (str(linha['timestamp']), str(linha['task_id']), str(linha['campo']), str(linha['valor_novo']))
+
+
+def atualizar_analytics(estado, df_logs):
+    """
+    Incorpora ao estado apenas as linhas de log ainda não processadas.
+    Se a aba de logs mudou de forma não-incremental, recalcula do zero.
+
+    Returns:
+        dict: Estado atualizado
+    """
+    n = estado['linhas_processadas']
+    if n > len(df_logs) or assinatura_log(df_logs, n - 1) != estado['assinatura']:
+        estado = criar_estado_analytics()
+        n = 0
+
+    novos = df_logs.iloc[n:]
+    estado['linhas_processadas'] = len(df_logs)
+    estado['assinatura'] = assinatura_log(df_logs, len(df_logs) - 1)
+    if novos.empty:
+        return estado
+
+    novos = novos.assign(
+        task_id=novos['task_id'].astype(str),
+        timestamp=pd.to_datetime(novos['timestamp'], errors='coerce')
+    ).dropna(subset=['timestamp'])
+
+    # Criação: primeiro registro de cada tarefa
+    criacoes = novos[novos['acao'] == 'criacao'].groupby('task_id')['timestamp'].min()
+
+    eventos = novos[(novos['campo'] == 'status') & (novos['valor_novo'].astype(str) != '')]
+    eventos = eventos[['task_id', 'timestamp']].assign(
+        status=eventos['valor_novo'].astype(str),
+        # Eventos de compactação só informam o status vigente, não são transições reais
+        _compactacao=eventos['acao'] == 'compactacao')
+
+    marcos = estado['marcos'].reindex(estado['marcos'].index.union(criacoes.index))
+    marcos['criacao'] = pd.concat(
+        [marcos['criacao'], criacoes.reindex(marcos.index)], axis=1).min(axis=1)
+
+    if not eventos.empty:
+        # Junta o último estado conhecido para calcular transições que cruzam o lote
+        ids = eventos['task_id'].unique()
+        anteriores = estado['ultimo_estado'].loc[
+            estado['ultimo_estado'].index.intersection(ids)].reset_index(names='task_id')
+        anteriores['_anterior'] = True
+        todos = eventos.assign(_anterior=False)
+        if not anteriores.empty:
+            todos = pd.concat([anteriores, todos], ignore_index=True)
+        todos = todos.sort_values(['task_id', 'timestamp', '_anterior'],
+                                  ascending=[True, True, False], kind='stable')
+        # Status regravado sem mudança (ex.: junto com uma edição de progresso) não é transição
+        todos = todos[todos['status'] != todos.groupby('task_id')['status'].shift()].copy()
+        grupos = todos.groupby('task_id')
+        todos['status_anterior'] = grupos['status'].shift()
+        todos['ts_anterior'] = grupos['timestamp'].shift()
+        novos_eventos = todos[~todos['_anterior'].astype(bool)]
+
+        # Tempo gasto na coluna anterior
+        transicoes = novos_eventos.dropna(subset=['status_anterior'])
+        if not transicoes.empty:
+            segundos = (transicoes['timestamp'] - transicoes['ts_anterior']).dt.total_seconds()
+            acrescimo = pd.DataFrame({
+                'task_id': transicoes['task_id'],
+                'status': transicoes['status_anterior'],
+                'segundos': segundos,
+            }).groupby(['task_id', 'status'])['segundos'].sum()
+            estado['tempo_colunas'] = somar_series(estado['tempo_colunas'], acrescimo)
+
+        # Fluxo cumulativo: +1 na coluna de destino, -1 na de origem
+        deltas = pd.concat([
+            pd.DataFrame({'dia': novos_eventos['timestamp'].dt.normalize(),
+                          'status': novos_eventos['status'], 'delta': 1}),
+            pd.DataFrame({'dia': transicoes['timestamp'].dt.normalize(),
+                          'status': transicoes['status_anterior'], 'delta': -1}),
+        ]).groupby(['dia', 'status'])['delta'].sum()
+        estado['deltas_cfd'] = somar_series(estado['deltas_cfd'], deltas)
+
+        # Marcos de início (saída do backlog) e conclusão
+        reais = novos_eventos[~novos_eventos['_compactacao'].astype(bool)]
+        inicios = reais[reais['status'] != COLUNAS_KANBAN[0]].groupby(
+            'task_id')['timestamp'].min()
+        concluidos = reais[reais['status'] == 'Concluído']
+        marcos = marcos.reindex(marcos.index.union(eventos['task_id'].unique()))
+        marcos['inicio'] = marcos['inicio'].fillna(inicios.reindex(marcos.index))
+        ultima_conclusao = concluidos.groupby('task_id')['timestamp'].max()
+        marcos['conclusao'] = ultima_conclusao.reindex(marcos.index).fillna(marcos['conclusao'])
+        estado['conclusoes'] = pd.concat(
+            [c for c in [estado['conclusoes'], concluidos[['task_id', 'timestamp']]] if not c.empty],
+            ignore_index=True) if not concluidos.empty else estado['conclusoes']
+
+        ultimos = novos_eventos.groupby('task_id').last()[['status', 'timestamp']]
+        restantes = estado['ultimo_estado'].drop(ultimos.index, errors='ignore')
+        estado['ultimo_estado'] = pd.concat([restantes, ultimos]) if not restantes.empty else ultimos
+
+    estado['marcos'] = marcos
+    return estado
+
+
+def resumo_analytics(estado, df_tarefas, agora=None):
+    """
+    Deriva as métricas de fluxo a partir do estado acumulado.
+
+    Returns:
+        dict: DataFrames 'tempos' (lead/cycle por tarefa), 'throughput' (semana x dev),
+              'tempo_por_coluna' (dias médios por coluna) e 'cfd' (dia x coluna)
+    """
+    agora = pd.Timestamp(agora or datetime.now())
+    # IDs repetidos (corrida na geração, arquivamento interrompido): vale a primeira linha
+    tarefas = df_tarefas.assign(task_id=df_tarefas['id'].astype(str)).drop_duplicates(
+        'task_id', keep='first').set_index('task_id')
+
+    # Lead time (criação -> conclusão) e cycle time (início -> conclusão)
+    marcos = estado['marcos'].reindex(tarefas.index)
+    criacao = marcos['criacao'].fillna(pd.to_datetime(tarefas['data_criacao'], errors='coerce'))
+    ultimo_status = estado['ultimo_estado']['status'].reindex(tarefas.index).fillna(tarefas['status'])
+    conclusao = marcos['conclusao'].where(ultimo_status == 'Concluído')
+    tempos = pd.DataFrame({
+        'titulo': tarefas['titulo'],
+        'responsavel': tarefas['responsavel'],
+        'lead_time_dias': (conclusao - criacao).dt.total_seconds() / 86400,
+        'cycle_time_dias': (conclusao - marcos['inicio']).dt.total_seconds() / 86400,
+    }).dropna(subset=['lead_time_dias'])
+
+    # Throughput semanal por desenvolvedor
+    conclusoes = estado['conclusoes']
+    if conclusoes.empty:
+        throughput = pd.DataFrame(columns=['semana', 'responsavel', 'concluidas'])
+    else:
+        conclusoes = conclusoes.assign(
+            semana=pd.to_datetime(conclusoes['timestamp']).dt.to_period('W').dt.start_time,
+            responsavel=conclusoes['task_id'].map(tarefas['responsavel']).fillna('Desconhecido'))
+        throughput = conclusoes.groupby(['semana', 'responsavel']).size().reset_index(name='concluidas')
+
+    # Tempo em cada coluna ativa (inclui a permanência atual das tarefas abertas)
+    tempo_colunas = estado['tempo_colunas']
+    abertos = estado['ultimo_estado']
+    if not abertos.empty:
+        em_aberto = (agora - pd.to_datetime(abertos['timestamp'])).dt.total_seconds()
+        em_aberto.index = pd.MultiIndex.from_arrays(
+            [abertos.index, abertos['status']], names=['task_id', 'status'])
+        tempo_colunas = somar_series(tempo_colunas, em_aberto)
+    if tempo_colunas.empty:
+        tempo_por_coluna = pd.DataFrame(columns=['status', 'dias_medios'])
+    else:
+        tempo_por_coluna = (tempo_colunas.groupby(level=1).mean() / 86400).reindex(
+            COLUNAS_KANBAN[:-1]).dropna().rename('dias_medios').rename_axis('status').reset_index()
+
+    # Fluxo cumulativo: acumula os deltas diários
+    deltas = estado['deltas_cfd']
+    if deltas.empty:
+        cfd = pd.DataFrame(columns=['dia', 'status', 'tarefas'])
+    else:
+        tabela = deltas.unstack('status', fill_value=0).reindex(columns=COLUNAS_KANBAN, fill_value=0)
+        tabela = tabela.reindex(pd.date_range(tabela.index.min(), agora.normalize()), fill_value=0)
+        cfd = tabela.cumsum().rename_axis('dia').reset_index().melt(
+            id_vars='dia', var_name='status', value_name='tarefas')
+
+    return {
+        'tempos': tempos,
+        'throughput': throughput,
+        'tempo_por_coluna': tempo_por_coluna,
+        'cfd': cfd,
+    }
+
+
+# --- EVENT SOURCING (ESTADO A PARTIR DOS LOGS) ---
+def aplicar_eventos(base, eventos):
+    """
+    Dobra eventos de log sobre um estado base: para cada (tarefa, campo)
+    vale o último valor_novo registrado.
+
+    Args:
+        base: DataFrame indexado por task_id (valores em texto) ou None
+        eventos: Linhas de log já ordenadas cronologicamente
+
+    Returns:
+        DataFrame: Estado resultante, indexado por task_id
+    """
+    eventos = eventos[eventos['campo'].isin(COLUNAS_OBRIGATORIAS)]
+    ultimos = eventos.assign(task_id=eventos['task_id'].astype(str)).drop_duplicates(
+        ['task_id', 'campo'], keep='last')
+    estado = ultimos.pivot(index='task_id', columns='campo', values='valor_novo')
+    if base is not None and not base.empty:
+        estado = estado.combine_first(base) if not estado.empty else base
+    return estado.reindex(columns=COLUNAS_OBRIGATORIAS)
+
+
+def ordenar_logs(df_logs):
+    """Ordena os logs por timestamp preservando a ordem de gravação em empates."""
+    return df_logs.dropna(subset=['timestamp']).sort_values('timestamp', kind='stable')
+
+
+def atualizar_checkpoints(checkpoints, df_logs, intervalo=INTERVALO_CHECKPOINT):
+    """
+    Mantém checkpoints do estado reconstruído a cada `intervalo` linhas de log,
+    partindo do último checkpoint válido em vez de reprocessar tudo.
+
+    Returns:
+        dict: {'assinatura', 'lista': [(posicao, ts_max, estado), ...]}
+    """
+    if not checkpoints or not checkpoints['lista'] or \
+            assinatura_log(df_logs, checkpoints['lista'][-1][0] - 1) != checkpoints['assinatura']:
+        checkpoints = {'assinatura': None, 'lista': []}
+
+    posicao, ts_max, estado = checkpoints['lista'][-1] if checkpoints['lista'] else (0, pd.NaT, None)
+    while posicao + intervalo <= len(df_logs):
+        bloco = df_logs.iloc[posicao:posicao + intervalo]
+        estado = aplicar_eventos(estado, ordenar_logs(bloco))
+        posicao += intervalo
+        ts_bloco = bloco['timestamp'].max()
+        ts_max = ts_bloco if pd.isna(ts_max) else max(ts_max, ts_bloco)
+        checkpoints['lista'].append((posicao, ts_max, estado))
+        checkpoints['assinatura'] = assinatura_log(df_logs, posicao - 1)
+    return checkpoints
+
+
+def reconstruir_estado(df_logs, ate=None, checkpoints=None):
+    """
+    Reconstrói o estado das tarefas em um instante, dobrando os eventos de log
+    a partir do checkpoint mais recente anterior a `ate`.
+
+    Args:
+        df_logs: DataFrame de logs (ordem de gravação)
+        ate: Instante de corte (None = estado atual)
+        checkpoints: Estrutura de atualizar_checkpoints (opcional)
+
+    Returns:
+        DataFrame: Estado por task_id com as colunas de COLUNAS_OBRIGATORIAS
+    """
+    ate = pd.Timestamp(ate) if ate is not None else None
+    posicao, estado = 0, None
+    for pos, ts_max, estado_cp in reversed((checkpoints or {}).get('lista', [])):
+        if ate is None or ts_max <= ate:
+            posicao, estado = pos, estado_cp
+            break
+
+    restantes = ordenar_logs(df_logs.iloc[posicao:])
+    if ate is not None:
+        restantes = restantes[restantes['timestamp'] <= ate]
+    estado = aplicar_eventos(estado, restantes)
+    # Tarefas anteriores aos logs só têm eventos de atualização, sem o campo 'id'
+    estado['id'] = estado['id'].fillna(pd.Series(estado.index, index=estado.index))
+    return estado
+
+
+def normalizar_valor(campo, valor):
+    """Normaliza valores de planilha e de log para comparação textual."""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return ""
+    if campo in ('data_entrega', 'data_criacao'):
+        data = pd.to_datetime(valor, errors='coerce')
+        return data.strftime("%Y-%m-%d") if pd.notna(data) else str(valor)
+    if campo in ('id', 'progresso'):
+        numero = pd.to_numeric(valor, errors='coerce')
+        return str(int(numero)) if pd.notna(numero) else str(valor)
+    return str(valor).strip()
+
+
+def comparar_estado_com_planilha(estado, df_tarefas):
+    """
+    Aponta divergências entre o estado reconstruído dos logs e a planilha.
+
+    Returns:
+        DataFrame: Colunas [task_id, campo, valor_logs, valor_planilha]
+    """
+    # IDs repetidos são apontados pela verificação de integridade; aqui vale a primeira linha
+    planilha = df_tarefas.assign(task_id=df_tarefas['id'].astype(str)).drop_duplicates(
+        'task_id', keep='first').set_index('task_id')
+    planilha = planilha.reindex(columns=COLUNAS_OBRIGATORIAS)
+
+    # Tarefas com eventos que sumiram da planilha (ex.: após um salvamento completo)
+    ausentes = estado.index.difference(planilha.index)
+    faltantes = pd.DataFrame({
+        'task_id': ausentes, 'campo': '(tarefa)',
+        'valor_logs': 'presente', 'valor_planilha': 'ausente'})
+
+    # Campos com evento registrado cujo valor difere da planilha.
+    # Tarefas sem nenhum evento (ex.: dados iniciais) não são comparadas.
+    comuns = estado.index.intersection(planilha.index)
+    a = estado.loc[comuns].stack().rename('valor_logs')
+    b = planilha.loc[comuns].stack(future_stack=True).rename('valor_planilha')
+    comparacao = pd.concat([a, b], axis=1, join='inner').rename_axis(['task_id', 'campo']).reset_index()
+    for coluna in ['valor_logs', 'valor_planilha']:
+        comparacao[coluna] = [
+            normalizar_valor(c, v) for c, v in zip(comparacao['campo'], comparacao[coluna])]
+    divergentes = comparacao[comparacao['valor_logs'] != comparacao['valor_planilha']]
+    return pd.concat(
+        [d for d in [faltantes, divergentes] if not d.empty] or [faltantes],
+        ignore_index=True)
+
+
+# --- BUSCA TEXTUAL (ÍNDICE INVERTIDO) ---
+def normalizar_texto(texto):
+    """Minúsculas e sem acentos ("Correção" -> "correcao")."""
+    decomposto = unicodedata.normalize('NFKD', str(texto))
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def tokenizar(texto):
+    """Quebra o texto normalizado em termos alfanuméricos."""
+    if texto is None or (not isinstance(texto, str) and pd.isna(texto)):
+        return set()
+    return set(re.findall(r"\w+", normalizar_texto(texto)))
+
+
+def criar_indice_busca(df_tarefas=None):
+    """
+    Cria o índice invertido sobre CAMPOS_BUSCA.
+
+    Estrutura:
+        termos: {termo: set(task_id)}
+        documentos: {task_id: set(termo)} (para reindexar/remover)
+        vocabulario: lista ordenada de termos (busca por prefixo via bisect)
+    """
+    indice = {'termos': {}, 'documentos': {}, 'vocabulario': []}
+    if df_tarefas is not None and not df_tarefas.empty:
+        colunas = [df_tarefas[c] if c in df_tarefas.columns else [""] * len(df_tarefas)
+                   for c in CAMPOS_BUSCA]
+        for task_id, *textos in zip(df_tarefas['id'], *colunas):
+            termos = set().union(*(tokenizar(t) for t in textos))
+            indice['documentos'][str(task_id)] = termos
+            for termo in termos:
+                indice['termos'].setdefault(termo, set()).add(str(task_id))
+        indice['vocabulario'] = sorted(indice['termos'])
+    return indice
+
+
+def remover_do_indice(indice, task_id):
+    """Remove uma tarefa do índice, limpando termos que ficaram sem tarefas."""
+    task_id = str(task_id)
+    for termo in indice['documentos'].pop(task_id, set()):
+        ids = indice['termos'].get(termo)
+        if ids is None:
+            continue
+        ids.discard(task_id)
+        if not ids:
+            del indice['termos'][termo]
+            pos = bisect.bisect_left(indice['vocabulario'], termo)
+            if pos < len(indice['vocabulario']) and indice['vocabulario'][pos] == termo:
+                indice['vocabulario'].pop(pos)
+
+
+def indexar_tarefa(indice, task_id, textos):
+    """
+    (Re)indexa uma tarefa de forma incremental.
+
+    Args:
+        indice: Estrutura de criar_indice_busca
+        task_id: ID da tarefa
+        textos: Dicionário {campo: texto} com os CAMPOS_BUSCA
+    """
+    remover_do_indice(indice, task_id)
+    termos = set().union(*(tokenizar(textos.get(c, "")) for c in CAMPOS_BUSCA))
+    indice['documentos'][str(task_id)] = termos
+    for termo in termos:
+        if termo not in indice['termos']:
+            indice['termos'][termo] = set()
+            bisect.insort(indice['vocabulario'], termo)
+        indice['termos'][termo].add(str(task_id))
+
+
+def buscar_tarefas(indice, consulta):
+    """
+    Busca por prefixo, sem acentos: cada termo da consulta precisa
+    casar com o início de algum termo da tarefa (E lógico entre termos).
+
+    Returns:
+        set: IDs (texto) das tarefas encontradas
+    """
+    resultado = None
+    vocabulario = indice['vocabulario']
+    for prefixo in tokenizar(consulta):
+        inicio = bisect.bisect_left(vocabulario, prefixo)
+        fim = bisect.bisect_left(vocabulario, prefixo + '\uffff', lo=inicio)
+        ids = set().union(*(indice['termos'][t] for t in vocabulario[inicio:fim]))
+        resultado = ids if resultado is None else resultado & ids
+        if not resultado:
+            return set()
+    return resultado or set()
+
+
+# --- ATUALIZAÇÃO AO VIVO (CHANGE-FEED DA ABA DE LOGS) ---
+def normalizar_linha_log(linha):
+    """Linha crua da aba de Logs com largura fixa (a API omite células vazias no fim)."""
+    valores = [str(v).strip() for v in list(linha)[:len(COLUNAS_LOGS)]]
+    return valores + [""] * (len(COLUNAS_LOGS) - len(valores))
+
+
+def buscar_logs_novos(ws, linhas_conhecidas, ultima_linha=None):
+    """
+    Lê as linhas da aba de Logs a partir da última já conhecida (inclusive).
+    Sem novidades, a resposta traz só essa linha: a própria leitura serve de marcador.
+
+    Args:
+        ultima_linha: Conteúdo cru da última linha conhecida; se a linha lida
+                      naquela posição for outra, a aba foi reescrita
+
+    Returns:
+        list: Linhas novas (listas de valores), ou None se a última linha
+              conhecida não existe mais (aba compactada ou reescrita)
+    """
+    coluna_final = letra_coluna(len(COLUNAS_LOGS))
+    if linhas_conhecidas <= 0:
+        return ws.get(f"A2:{coluna_final}") or []
+    valores = ws.get(f"A{linhas_conhecidas + 1}:{coluna_final}") or []  # Linha 1 = cabeçalho
+    if not valores:
+        return None
+    if ultima_linha is not None and normalizar_linha_log(valores[0]) != normalizar_linha_log(ultima_linha):
+        return None  # Compactada, mas ainda maior que o trecho já conhecido
+    return valores[1:]
+
+
+def remover_logs_conhecidos(novos, df_logs):
+    """Descarta linhas já presentes na sessão (ex.: gravadas por este próprio usuário)."""
+    campos = ['timestamp', 'acao', 'task_id', 'campo', 'valor_novo', 'usuario']
+    if df_logs.empty or novos.empty:
+        return novos
+    recentes = df_logs[df_logs['timestamp'] >= novos['timestamp'].min()]
+    conhecidas = set(recentes[campos].astype(str).itertuples(index=False, name=None))
+    chaves = novos[campos].astype(str).itertuples(index=False, name=None)
+    return novos[[chave not in conhecidas for chave in chaves]]
+
+
+def converter_valor_campo(campo, valor):
+    """Converte um valor textual do log para o tipo usado em df_tarefas."""
+    if campo == 'id':
+        return int(pd.to_numeric(valor, errors='coerce'))
+    if campo == 'progresso':
+        numero = pd.to_numeric(valor, errors='coerce')
+        return 0 if pd.isna(numero) else numero
+    if campo in ('data_entrega', 'data_criacao'):
+        return pd.to_datetime(valor, errors='coerce')
+    return valor
+
+
+def aplicar_logs_nas_tarefas(df_tarefas, novos_logs):
+    """
+    Aplica eventos de log ao DataFrame de tarefas em memória:
+    criações viram linhas novas e atualizações sobrescrevem campos.
+
+    Returns:
+        DataFrame: Nova versão de df_tarefas
+    """
+    df = df_tarefas.copy()
+    eventos = novos_logs[novos_logs['campo'].isin(COLUNAS_OBRIGATORIAS)]
+
+    # Criações: tarefas que ainda não existem na sessão
+    novas = aplicar_eventos(None, eventos[eventos['acao'] == 'criacao'])
+    novas = novas[~novas.index.isin(df['id'].astype(str))]
+    if not novas.empty:
+        novas = converter_tipos_tarefas(novas.reset_index(drop=True))
+        textuais = [c for c in COLUNAS_OBRIGATORIAS
+                    if c not in ('id', 'progresso', 'data_entrega', 'data_criacao')]
+        novas[textuais] = novas[textuais].astype(object).fillna("")
+        df = pd.concat([df, novas], ignore_index=True)
+
+    # Atualizações: vale o último valor de cada (tarefa, campo)
+    atualizacoes = eventos[eventos['acao'] != 'criacao'].drop_duplicates(
+        ['task_id', 'campo'], keep='last')
+    ids = df['id'].astype(str)
+    for task_id, campo, valor in zip(
+            atualizacoes['task_id'].astype(str), atualizacoes['campo'], atualizacoes['valor_novo']):
+        df.loc[ids == task_id, campo] = converter_valor_campo(campo, valor)
+    return df
+
+
+# --- ARQUIVAMENTO DE TAREFAS CONCLUÍDAS ---
+def formatar_para_planilha(df):
+    """Converte datas em texto AAAA-MM-DD para gravação na planilha."""
+    df = df.copy()
+    for coluna in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[coluna]):
+            df[coluna] = df[coluna].dt.strftime("%Y-%m-%d").fillna("")
+    return df.fillna("")
+
+
+def datas_conclusao(df_tarefas, df_logs):
+    """
+    Data em que cada tarefa entrou em "Concluído" pela última vez (início da
+    conclusão vigente), segundo os logs. Regravações do mesmo status não
+    contam. Tarefas sem esse evento usam a data de entrega como aproximação.
+    """
+    eventos = ordenar_logs(df_logs[df_logs['campo'] == 'status'])
+    eventos = eventos.assign(task_id=eventos['task_id'].astype(str))
+    transicoes = eventos[eventos['valor_novo'] != eventos.groupby('task_id')['valor_novo'].shift()]
+    entradas = transicoes[transicoes['valor_novo'] == 'Concluído']
+    ultima = entradas.groupby('task_id')['timestamp'].max()
+    conclusao = df_tarefas['id'].astype(str).map(ultima)
+    return pd.to_datetime(conclusao, errors='coerce').fillna(
+        pd.to_datetime(df_tarefas['data_entrega'], errors='coerce'))
+
+
+def selecionar_para_arquivar(df_tarefas, df_logs, dias=DIAS_ARQUIVAMENTO, agora=None):
+    """
+    Tarefas concluídas há mais de `dias` dias.
+
+    Returns:
+        DataFrame: Candidatas, com a coluna extra 'data_conclusao'
+    """
+    limite = pd.Timestamp(agora or datetime.now()) - pd.Timedelta(days=dias)
+    conclusao = datas_conclusao(df_tarefas, df_logs)
+    mascara = (df_tarefas['status'] == 'Concluído') & (conclusao < limite)
+    return df_tarefas[mascara].assign(data_conclusao=conclusao[mascara])
+
+
+def mover_para_aba_arquivo(sheet, ws_arquivo, df_candidatas):
+    """
+    Move as tarefas para a aba de Arquivo: um append no Arquivo e uma
+    exclusão em lote na aba de tarefas.
+
+    Returns:
+        list: IDs efetivamente arquivados
+    """
+    # Localiza as linhas atuais (a planilha pode ter mudado desde a carga)
+    coluna_ids = sheet.col_values(1)
+    linha_por_id = {str(v).strip(): pos for pos, v in enumerate(coluna_ids[1:], start=2)}
+    alvos = df_candidatas[df_candidatas['id'].astype(str).isin(linha_por_id)]
+    if alvos.empty:
+        return []
+
+    registros = formatar_para_planilha(alvos.assign(data_arquivamento=pd.Timestamp(datetime.now())))
+    ws_arquivo.append_rows(
+        registros.reindex(columns=COLUNAS_ARQUIVO, fill_value="").astype(str).values.tolist(),
+        value_input_option='USER_ENTERED')
+
+    # Exclui de baixo para cima para não deslocar as linhas seguintes
+    linhas = sorted((linha_por_id[str(i)] for i in alvos['id']), reverse=True)
+    sheet.spreadsheet.batch_update({'requests': [
+        {'deleteDimension': {'range': {
+            'sheetId': sheet.id, 'dimension': 'ROWS',
+            'startIndex': linha - 1, 'endIndex': linha}}}
+        for linha in linhas
+    ]})
+    return alvos['id'].tolist()
+
+
+# --- COMPACTAÇÃO DE LOGS ---
+def compactar_logs(df_logs, ate):
+    """
+    Substitui os eventos anteriores a `ate` por um evento 'compactacao' por
+    (tarefa, campo), com o valor vigente naquele instante. Dobrar o log
+    compactado produz o mesmo estado final que o log original.
+
+    Returns:
+        tuple: (df_compactado, df_removidos)
+    """
+    ate = pd.Timestamp(ate)
+    mascara_antigos = df_logs['timestamp'] < ate
+    antigos = df_logs[mascara_antigos]
+    if antigos.empty:
+        return df_logs, antigos
+
+    estado = aplicar_eventos(None, ordenar_logs(antigos))
+    resumo = estado.stack().rename('valor_novo').rename_axis(['task_id', 'campo']).reset_index()
+    resumo = resumo.assign(
+        timestamp=ate, acao='compactacao', valor_antigo='', usuario='sistema')[COLUNAS_LOGS]
+    compactado = pd.concat([resumo, df_logs[~mascara_antigos]], ignore_index=True)
+    return compactado, antigos
+
+
+def reescrever_logs(ws, df_logs, linhas_lidas, ultima_linha=None):
+    """
+    Regrava a aba de Logs com o DataFrame informado sem perder gravações
+    concorrentes: anexa o novo conteúdo no fim e só então exclui, pelo número
+    da linha, as `linhas_lidas` linhas originais. Linhas que outros usuários
+    anexarem nesse meio tempo continuam na aba, sempre abaixo do histórico
+    regravado (a ordem física dos logs é a ordem em que são dobrados).
+
+    Args:
+        linhas_lidas, ultima_linha: Tamanho e última linha da aba na leitura
+            (attrs 'linhas_planilha' e 'ultima_linha' de preparar_dataframe_logs)
+
+    Raises:
+        ErroPlanilha: Se a aba foi reescrita desde a leitura (nada é gravado)
+    """
+    if linhas_lidas > 0 and buscar_logs_novos(ws, linhas_lidas, ultima_linha) is None:
+        raise ErroPlanilha("A aba de Logs foi reescrita desde a leitura; nada foi alterado.")
+    df = df_logs.reindex(columns=COLUNAS_LOGS).copy()
+    df['timestamp'] = [t.isoformat() if pd.notna(t) else "" for t in df['timestamp']]
+    valores = df.fillna("").astype(str).values.tolist()
+    fim_removido = linhas_lidas + 1
+    if valores:
+        resposta = ws.append_rows(valores, value_input_option="USER_ENTERED", table_range="A1")
+        faixa = resposta['updates']['updatedRange'].split('!')[-1]
+        inicio_bloco = gspread.utils.a1_to_rowcol(faixa.split(':')[0])[0]
+        if inicio_bloco > linhas_lidas + 2:
+            # Gravações concorrentes ficaram entre o original e o bloco regravado:
+            # voltam para baixo dele antes de excluir as cópias de cima
+            coluna_final = letra_coluna(len(COLUNAS_LOGS))
+            concorrentes = ws.get(f"A{linhas_lidas + 2}:{coluna_final}{inicio_bloco - 1}")
+            ws.append_rows([normalizar_linha_log(l) for l in concorrentes],
+                           value_input_option="USER_ENTERED", table_range="A1")
+            fim_removido = inicio_bloco - 1
+    if fim_removido > 1:
+        ws.delete_rows(2, fim_removido)
+
+
+# --- INTEGRIDADE DOS DADOS ---
+def criar_estado_integridade():
+    """
+    Estado incremental do verificador de integridade.
+
+    'linhas' guarda os problemas de cada linha pelo checksum do seu conteúdo:
+    linhas inalteradas não são revalidadas. 'divergencias' guarda a comparação
+    com os logs, refeita apenas para as tarefas tocadas desde a última execução.
+    """
+    return {'linhas': {}, 'total_logs': 0, 'assinatura_logs': None,
+            'ids': set(), 'divergencias': None}
+
+
+def checksums_linhas(df_bruto):
+    """Checksum (hash vetorizado do pandas) do conteúdo de cada linha."""
+    conteudo = df_bruto.reindex(columns=COLUNAS_OBRIGATORIAS).fillna("").astype(str)
+    return [int(h) for h in pd.util.hash_pandas_object(conteudo, index=False)]
+
+
+def validar_linhas(df_bruto, quadro):
+    """
+    Regras que dependem só da própria linha, aplicadas coluna a coluna.
+
+    Returns:
+        DataFrame: Colunas [linha, campo, problema, valor]
+    """
+    texto = df_bruto.reindex(columns=COLUNAS_OBRIGATORIAS).fillna("").astype(str).apply(
+        lambda coluna: coluna.str.strip())
+    achados = []
+
+    def registrar(mascara, campo, problema):
+        if mascara.any():
+            achados.append(pd.DataFrame({
+                'linha': texto.index[mascara], 'campo': campo,
+                'problema': problema, 'valor': texto.loc[mascara, campo].values}))
+
+    ids = pd.to_numeric(texto['id'], errors='coerce')
+    registrar(ids.isna() | (ids % 1 != 0), 'id', 'id_invalido')
+    registrar(texto['titulo'] == "", 'titulo', 'titulo_vazio')
+    for campo in ['data_entrega', 'data_criacao']:
+        registrar(pd.to_datetime(texto[campo], errors='coerce', format='mixed').isna(),
+                  campo, 'data_invalida')
+    progresso = pd.to_numeric(texto['progresso'], errors='coerce')
+    registrar(~progresso.between(0, 100), 'progresso', 'progresso_invalido')
+    registrar(~texto['status'].isin(COLUNAS_KANBAN), 'status', 'status_desconhecido')
+    registrar(~texto['tipo'].isin(quadro['tipos']), 'tipo', 'tipo_desconhecido')
+    registrar(~texto['prioridade'].isin(PRIORIDADES), 'prioridade', 'prioridade_desconhecida')
+    if not achados:
+        return pd.DataFrame(columns=['linha', 'campo', 'problema', 'valor'])
+    return pd.concat(achados, ignore_index=True)
+
+
+def verificar_integridade(df_bruto, df_logs, df_arquivo, quadro, estado=None):
+    """
+    Verifica a aba de tarefas em um único passe: IDs inválidos ou duplicados
+    (inclusive com o Arquivo), datas inválidas, progresso fora de 0-100,
+    status/tipo/prioridade desconhecidos e divergências entre planilha e logs.
+
+    Args:
+        df_bruto: Aba de tarefas sem conversão de tipos (valores_para_dataframe
+                  com manter_linhas=True: o índice é a linha na planilha)
+        estado: Resultado de uma execução anterior (None = verificação completa)
+
+    Returns:
+        tuple: (DataFrame com COLUNAS_PROBLEMAS, estado atualizado)
+    """
+    estado = estado or criar_estado_integridade()
+    hashes = checksums_linhas(df_bruto)
+    linha_por_hash = dict(zip(df_bruto.index, hashes))
+
+    # Regras por linha: só para linhas cujo checksum ainda não foi visto
+    alteradas = [linha for linha, h in linha_por_hash.items() if h not in estado['linhas']]
+    cache = {h: estado['linhas'][h] for h in hashes if h in estado['linhas']}
+    for linha in alteradas:
+        cache[linha_por_hash[linha]] = []
+    for linha, campo, problema, valor in validar_linhas(df_bruto.loc[alteradas], quadro).itertuples(index=False):
+        cache[linha_por_hash[linha]].append((campo, problema, valor))
+    estado['linhas'] = cache
+
+    ids = pd.to_numeric(df_bruto['id'] if 'id' in df_bruto else pd.Series(dtype=str), errors='coerce')
+    registros = [
+        (linha, ids[linha], campo, problema, valor, "")
+        for linha, h in linha_por_hash.items() for campo, problema, valor in cache[h]
+    ]
+
+    # Unicidade: depende da aba inteira, então é refeita sempre (vetorizada)
+    ids_arquivo = set(df_arquivo['id'].astype(int)) if not df_arquivo.empty else set()
+    repetidos = ids.notna() & (ids.duplicated(keep='first') | ids.isin(ids_arquivo))
+    registros += [
+        (linha, id_, 'id', 'id_duplicado', str(int(id_)), "")
+        for linha, id_ in ids[repetidos].items()
+    ]
+
+    # Planilha x logs: só as tarefas tocadas desde a última execução
+    validas = df_bruto[ids.notna() & ~repetidos].assign(id=ids[ids.notna() & ~repetidos].astype(int))
+    ids_atuais = set(validas['id'].astype(str)) | {str(i) for i in ids_arquivo}
+    if estado['divergencias'] is None or \
+            assinatura_log(df_logs, estado['total_logs'] - 1) != estado['assinatura_logs']:
+        afetados = None  # Primeira execução ou aba de Logs reescrita
+    else:
+        afetados = set(df_logs['task_id'].iloc[estado['total_logs']:].astype(str))
+        afetados |= set(ids.reindex(alteradas).dropna().astype(int).astype(str))
+        afetados |= ids_atuais ^ estado['ids']
+    todas = validas if df_arquivo.empty else pd.concat(
+        [validas, df_arquivo[COLUNAS_OBRIGATORIAS]], ignore_index=True)
+    if afetados is None:
+        divergencias = comparar_estado_com_planilha(reconstruir_estado(df_logs), todas)
+    else:
+        anteriores = estado['divergencias']
+        logs = df_logs[df_logs['task_id'].astype(str).isin(afetados)]
+        recalculadas = comparar_estado_com_planilha(
+            reconstruir_estado(logs), todas[todas['id'].astype(str).isin(afetados)])
+        divergencias = pd.concat(
+            [d for d in [anteriores[~anteriores['task_id'].isin(afetados)], recalculadas]
+             if not d.empty] or [recalculadas], ignore_index=True)
+    estado.update(divergencias=divergencias, total_logs=len(df_logs), ids=ids_atuais,
+                  assinatura_logs=assinatura_log(df_logs, len(df_logs) - 1))
+
+    linha_por_id = {str(i): linha for linha, i in validas['id'].items()}
+    registros += [
+        (linha_por_id.get(task_id), task_id, campo,
+         'tarefa_ausente' if campo == '(tarefa)' else 'divergencia_logs', valor_planilha, valor_logs)
+        for task_id, campo, valor_logs, valor_planilha in divergencias[
+            ['task_id', 'campo', 'valor_logs', 'valor_planilha']].itertuples(index=False)
+    ]
+
+    problemas = pd.DataFrame(registros, columns=COLUNAS_PROBLEMAS)
+    problemas['linha'] = problemas['linha'].astype('Int64')
+    problemas['id'] = problemas['id'].map(lambda v: "" if pd.isna(v) else normalizar_valor('id', v))
+    return problemas.sort_values('linha', kind='stable', na_position='last').reset_index(drop=True), estado
+
+
+def sugerir_opcao(valor, opcoes):
+    """
+    Opção válida correspondente a um valor digitado de forma diferente
+    ("concluido" -> "Concluído", "alta" -> "🟡 Alta", "bugfix" -> "Bugfix (Correção)").
+    Retorna None se não houver exatamente uma correspondência.
+    """
+    termos = tokenizar(valor)
+    if not termos:
+        return None
+    candidatas = [opcao for opcao in opcoes if termos <= tokenizar(opcao)]
+    return candidatas[0] if len(candidatas) == 1 else None
+
+
+def planejar_reparos(problemas, df_bruto, df_logs, quadro, ids_reservados=()):
+    """
+    Propõe uma correção pontual para cada problema, em vez de recriar a planilha.
+    Problemas sem correção segura (título vazio, divergência com os logs...)
+    ficam com reparo vazio para tratamento manual.
+
+    Returns:
+        DataFrame: problemas + coluna 'reparo' (novo valor ou None)
+    """
+    ids = pd.to_numeric(df_bruto['id'], errors='coerce') if 'id' in df_bruto else pd.Series(dtype=float)
+    proximo = int(max([ids.max() if ids.notna().any() else 0, *ids_reservados, 0])) + 1
+    criacao = df_logs.groupby(df_logs['task_id'].astype(str))['timestamp'].min()
+    opcoes = {'status': COLUNAS_KANBAN, 'tipo': quadro['tipos'], 'prioridade': PRIORIDADES}
+    # Linhas com ID repetido não herdam os logs da outra tarefa
+    repetidas = set(problemas.loc[problemas['problema'] == 'id_duplicado', 'linha'])
+
+    reparos = []
+    for linha, id_, campo, problema, valor in problemas[
+            ['linha', 'id', 'campo', 'problema', 'valor']].itertuples(index=False):
+        reparo = None
+        if problema in ('id_invalido', 'id_duplicado'):
+            reparo, proximo = str(proximo), proximo + 1
+        elif problema == 'progresso_invalido':
+            numero = pd.to_numeric(valor, errors='coerce')
+            if pd.notna(numero):
+                reparo = str(int(min(max(numero, 0), 100)))
+            else:
+                reparo = "100" if df_bruto.at[linha, 'status'] == "Concluído" else "0"
+        elif problema in ('status_desconhecido', 'tipo_desconhecido', 'prioridade_desconhecida'):
+            reparo = sugerir_opcao(valor, opcoes[campo])
+            if reparo is None and campo == 'status' and not str(valor).strip():
+                reparo = COLUNAS_KANBAN[0]
+        elif problema == 'data_invalida':
+            data = pd.to_datetime(valor, errors='coerce', dayfirst=True)
+            if pd.isna(data) and campo == 'data_criacao' and linha not in repetidas:
+                data = criacao.get(id_, pd.NaT)
+            reparo = data.strftime("%Y-%m-%d") if pd.notna(data) else None
+        reparos.append(reparo)
+    return problemas.assign(reparo=reparos)
+
+
+def aplicar_reparos(sheet, reparos):
+    """
+    Grava os reparos célula a célula, com UMA leitura de conferência e UM
+    batch_update. Células que mudaram desde a verificação são ignoradas.
+
+    Returns:
+        tuple: ({task_id: {campo: (valor_antigo, novo_valor)}}, linhas_ignoradas)
+    """
+    reparos = reparos[reparos['reparo'].notna() & reparos['linha'].notna()]
+    if reparos.empty:
+        return {}, []
+    headers = sheet.row_values(1)
+    celulas = [
+        (int(linha), id_, campo, gspread.utils.rowcol_to_a1(int(linha), headers.index(campo) + 1), valor, reparo)
+        for linha, id_, campo, valor, reparo in reparos[
+            ['linha', 'id', 'campo', 'valor', 'reparo']].itertuples(index=False)
+        if campo in headers
+    ]
+    if not celulas:
+        return {}, []
+
+    atuais = sheet.batch_get([c[3] for c in celulas])
+    gravar, ignoradas = [], []
+    for celula, atual in zip(celulas, atuais):
+        valor_atual = atual[0][0] if atual and atual[0] else ""
+        (gravar if str(valor_atual).strip() == str(celula[4]).strip() else ignoradas).append(celula)
+    if gravar:
+        sheet.batch_update([{'range': a1, 'values': [[reparo]]} for _, _, _, a1, _, reparo in gravar])
+
+    # Um novo ID passa a identificar a tarefa (inclusive nos demais reparos da linha)
+    novo_id = {linha: reparo for linha, _, campo, _, _, reparo in gravar if campo == 'id'}
+    alteracoes = {}
+    for linha, id_, campo, _, valor, reparo in gravar:
+        alteracoes.setdefault(novo_id.get(linha, id_), {})[campo] = (valor, reparo)
+    return alteracoes, sorted({c[0] for c in ignoradas})
+
+
+# --- DESFAZER / REFAZER (REVERSÃO PELOS LOGS) ---
+# Ações cujas entradas de log podem ser revertidas. Reverter um "desfazer" é refazer.
+ACOES_REVERSIVEIS = ['atualizacao', 'desfazer', 'refazer']
+CAMPOS_REVERSIVEIS = ['titulo', 'descricao', 'responsavel', 'status', 'tipo',
+                      'prioridade', 'data_entrega', 'progresso']
+COLUNAS_REVERSAO = ['task_id', 'campo', 'esperado', 'reverter_para', 'entradas']
+COLUNAS_CONFLITOS_REVERSAO = ['task_id', 'campo', 'esperado', 'valor_atual', 'motivo']
+
+
+def texto_log(valor):
+    """Valor de log ou planilha como texto; vazios (None, nan, NaT) viram ""."""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return ""
+    texto = str(valor).strip()
+    return "" if texto in ("nan", "NaT", "None") else texto
+
+
+def interpretar_data(texto):
+    """Data de um texto AAAA-MM-DD (gravado pelo app) ou DD/MM/AAAA (exibido pela planilha)."""
+    return pd.to_datetime(texto, errors='coerce', dayfirst=not texto[:4].isdigit())
+
+
+def valores_equivalentes(a, b):
+    """Compara valores ignorando formatação (50 x 50.0, data com ou sem hora)."""
+    a, b = texto_log(a), texto_log(b)
+    if a == b:
+        return True
+    if not a or not b:
+        return False
+    numero_a, numero_b = pd.to_numeric(a, errors='coerce'), pd.to_numeric(b, errors='coerce')
+    if pd.notna(numero_a) or pd.notna(numero_b):
+        return bool(numero_a == numero_b)
+    data_a, data_b = interpretar_data(a), interpretar_data(b)
+    return bool(pd.notna(data_a) and pd.notna(data_b) and data_a == data_b)
+
+
+def valor_para_planilha(campo, valor):
+    """Texto a gravar na célula, no formato do app (datas AAAA-MM-DD, progresso inteiro)."""
+    texto = texto_log(valor)
+    if texto and campo.startswith('data_'):
+        data = interpretar_data(texto)
+        if pd.notna(data):
+            return data.strftime("%Y-%m-%d")
+    if texto and campo == 'progresso':
+        numero = pd.to_numeric(texto, errors='coerce')
+        if pd.notna(numero):
+            return str(int(numero))
+    return texto
+
+
+def logs_reversiveis(df_logs, inicio=None, fim=None, usuario=None):
+    """Edições de campo que podem ser desfeitas, opcionalmente num intervalo e de um usuário."""
+    mascara = df_logs['acao'].isin(ACOES_REVERSIVEIS) & df_logs['campo'].isin(CAMPOS_REVERSIVEIS)
+    if inicio is not None:
+        mascara &= df_logs['timestamp'] >= pd.Timestamp(inicio)
+    if fim is not None:
+        mascara &= df_logs['timestamp'] <= pd.Timestamp(fim)
+    if usuario:
+        mascara &= df_logs['usuario'] == usuario
+    return df_logs[mascara]
+
+
+def ultimo_lote(df_logs, usuario=None):
+    """Entradas reversíveis da última gravação (um lote compartilha o timestamp)."""
+    candidatos = logs_reversiveis(df_logs, usuario=usuario).dropna(subset=['timestamp'])
+    if candidatos.empty:
+        return candidatos
+    return candidatos[candidatos['timestamp'] == candidatos['timestamp'].max()]
+
+
+def acao_reversao(selecao):
+    """Ação registrada pela reversão: refazer quando só há entradas de "desfazer"."""
+    return "refazer" if not selecao.empty and (selecao['acao'] == 'desfazer').all() else "desfazer"
+
+
+def planejar_reversao(selecao):
+    """
+    Calcula as edições inversas das entradas de log selecionadas. Várias
+    entradas do mesmo (tarefa, campo) viram uma só: a célula deve estar com
+    o valor_novo da última e volta ao valor_antigo da primeira.
+
+    Returns:
+        DataFrame: COLUNAS_REVERSAO, sem as reversões que não mudariam nada
+    """
+    selecao = ordenar_logs(selecao)
+    if selecao.empty:
+        return pd.DataFrame(columns=COLUNAS_REVERSAO)
+    plano = selecao.assign(task_id=selecao['task_id'].astype(str)).groupby(
+        ['task_id', 'campo'], sort=False).agg(
+            esperado=('valor_novo', 'last'), reverter_para=('valor_antigo', 'first'),
+            entradas=('acao', 'size')).reset_index()
+    sem_efeito = [valores_equivalentes(e, r) for e, r in zip(plano['esperado'], plano['reverter_para'])]
+    return plano[~pd.Series(sem_efeito, index=plano.index, dtype=bool)].reset_index(drop=True)
+
+
+def aplicar_reversao(sheet, plano):
+    """
+    Grava as edições inversas com UMA leitura de conferência e UM batch_update.
+    Só é revertida a célula que ainda tem o valor registrado no log; as demais
+    (alteradas depois, já revertidas ou fora da planilha) voltam como conflito.
+
+    Returns:
+        tuple: ({task_id: {campo: (valor_antigo, novo_valor)}}, DataFrame de conflitos)
+    """
+    if plano.empty:
+        return {}, pd.DataFrame(columns=COLUNAS_CONFLITOS_REVERSAO)
+    headers, linha_por_id = ler_linhas_por_id(sheet)
+    celulas, conflitos = [], []
+    for task_id, campo, esperado, novo in plano[
+            ['task_id', 'campo', 'esperado', 'reverter_para']].itertuples(index=False):
+        linha = linha_por_id.get(str(task_id))
+        if linha is None or campo not in headers:
+            motivo = "tarefa fora da planilha" if linha is None else "coluna ausente"
+            conflitos.append((task_id, campo, esperado, None, motivo))
+            continue
+        celulas.append((task_id, campo, gspread.utils.rowcol_to_a1(linha, headers.index(campo) + 1),
+                        esperado, valor_para_planilha(campo, novo)))
+
+    atuais = sheet.batch_get([c[2] for c in celulas]) if celulas else []
+    gravar = []
+    for (task_id, campo, a1, esperado, novo), atual in zip(celulas, atuais):
+        valor_atual = atual[0][0] if atual and atual[0] else ""
+        if valores_equivalentes(valor_atual, esperado):
+            gravar.append((task_id, campo, a1, valor_atual, novo))
+        else:
+            motivo = "já revertido" if valores_equivalentes(valor_atual, novo) else "alterado depois"
+            conflitos.append((task_id, campo, esperado, valor_atual, motivo))
+    if gravar:
+        sheet.batch_update([{'range': a1, 'values': [[novo]]} for _, _, a1, _, novo in gravar])
+
+    alteracoes = {}
+    for task_id, campo, _, valor_atual, novo in gravar:
+        alteracoes.setdefault(task_id, {})[campo] = (valor_atual, novo)
+    return alteracoes, pd.DataFrame(conflitos, columns=COLUNAS_CONFLITOS_REVERSAO)
+
+
+# --- PREVISÃO DE CARGA POR DESENVOLVEDOR ---
+def versao_dados(df_tarefas, df_logs):
+    """
+    Identifica a versão dos dados (hash vetorizado das tarefas + última linha
+    de log), para reaproveitar cálculos enquanto nada mudou.
+    """
+    colunas = ['id', 'titulo', 'responsavel', 'status', 'prioridade', 'data_entrega', 'progresso']
+    hash_tarefas = int(pd.util.hash_pandas_object(
+        df_tarefas.reindex(columns=colunas).astype(str), index=False).sum())
+    return hash_tarefas, len(df_logs), assinatura_log(df_logs, len(df_logs) - 1)
+
+
+def velocidade_por_desenvolvedor(df_tarefas, df_logs, agora=None, janela_dias=JANELA_VELOCIDADE):
+    """
+    Pontos de progresso por dia de cada desenvolvedor, somando os avanços de
+    'progresso' registrados no log dentro da janela. Devs sem histórico usam
+    a mediana da equipe.
+
+    Returns:
+        DataFrame: Colunas [responsavel, pontos_por_dia, origem]
+    """
+    agora = pd.Timestamp(agora or datetime.now())
+    inicio = agora - pd.Timedelta(days=janela_dias)
+    eventos = df_logs[(df_logs['campo'] == 'progresso') & (df_logs['timestamp'] >= inicio)]
+    avanco = (pd.to_numeric(eventos['valor_novo'], errors='coerce')
+              - pd.to_numeric(eventos['valor_antigo'], errors='coerce').fillna(0)).clip(lower=0)
+    responsaveis = df_tarefas.set_index(df_tarefas['id'].astype(str))['responsavel']
+    # IDs repetidos (corrida na geração, arquivamento interrompido): vale a primeira linha
+    responsavel = eventos['task_id'].astype(str).map(responsaveis[~responsaveis.index.duplicated()])
+    pontos = avanco.groupby(responsavel).sum()
+
+    # Boards recentes: divide pelo tempo de histórico disponível, não pela janela toda
+    primeiro = df_logs['timestamp'].min()
+    dias = min(max((agora - primeiro).total_seconds() / 86400, 1), janela_dias) if pd.notna(primeiro) else janela_dias
+    velocidade = (pontos / dias).rename('pontos_por_dia')
+
+    devs = pd.Index(df_tarefas['responsavel'].dropna().unique(), name='responsavel')
+    medida = velocidade[velocidade > 0].reindex(devs)
+    mediana = medida.median()
+    return pd.DataFrame({
+        'pontos_por_dia': medida.fillna(mediana),
+        'origem': medida.notna().map({True: 'histórico', False: 'mediana da equipe'}),
+    }, index=devs).reset_index()
+
+
+def prever_entregas(df_tarefas, df_logs, agora=None, janela_dias=JANELA_VELOCIDADE):
+    """
+    Projeta a data de término das tarefas abertas. Cada dev trabalha sua fila
+    em ordem de prioridade e prazo; o trabalho restante (100 - progresso)
+    acumulado na fila, dividido pela velocidade do dev, dá a data prevista.
+
+    Returns:
+        dict: 'velocidade' (por dev) e 'previsoes' (por tarefa aberta, com as
+              colunas previsao, folga_dias e risco: 'atrasará', 'no prazo', 'sem prazo'
+              ou 'sem histórico')
+    """
+    agora = pd.Timestamp(agora or datetime.now())
+    velocidade = velocidade_por_desenvolvedor(df_tarefas, df_logs, agora, janela_dias)
+
+    abertas = df_tarefas[df_tarefas['status'] != 'Concluído'].assign(
+        data_entrega=lambda d: pd.to_datetime(d['data_entrega'], errors='coerce'),
+        restante=lambda d: 100 - pd.to_numeric(d['progresso'], errors='coerce').fillna(0).clip(0, 100),
+        ordem_prioridade=lambda d: d['prioridade'].map(
+            {p: i for i, p in enumerate(PRIORIDADES)}).fillna(len(PRIORIDADES)))
+    abertas = abertas.sort_values(['responsavel', 'ordem_prioridade', 'data_entrega'], na_position='last')
+
+    acumulado = abertas.groupby('responsavel')['restante'].cumsum()
+    ritmo = abertas['responsavel'].map(velocidade.set_index('responsavel')['pontos_por_dia'])
+    dias_previstos = (acumulado / ritmo).where(ritmo > 0)
+    previsao = (agora + pd.to_timedelta(dias_previstos, unit='D')).dt.normalize()
+    folga = (abertas['data_entrega'] - previsao).dt.days
+
+    previsoes = abertas.assign(previsao=previsao, folga_dias=folga)
+    previsoes['risco'] = 'no prazo'
+    previsoes.loc[folga < 0, 'risco'] = 'atrasará'
+    previsoes.loc[abertas['data_entrega'].isna(), 'risco'] = 'sem prazo'
+    previsoes.loc[previsao.isna(), 'risco'] = 'sem histórico'
+    colunas = ['id', 'titulo', 'responsavel', 'prioridade', 'progresso', 'data_entrega',
+               'previsao', 'folga_dias', 'risco']
+    return {
+        'velocidade': velocidade,
+        'previsoes': previsoes[colunas].sort_values(['folga_dias', 'data_entrega'], na_position='last'),
+    }
+
+
+# --- RELATÓRIOS ---
+def relatorio_prazos(df_tarefas, dias_alerta=3, agora=None):
+    """
+    Tarefas abertas atrasadas ou vencendo em até `dias_alerta` dias.
+
+    Returns:
+        DataFrame: Colunas [id, titulo, responsavel, status, prioridade,
+                   data_entrega, dias_restantes], das mais atrasadas às mais folgadas
+    """
+    agora = pd.Timestamp(agora or datetime.now())
+    abertas = df_tarefas[df_tarefas['status'] != 'Concluído'].copy()
+    abertas['data_entrega'] = pd.to_datetime(abertas['data_entrega'], errors='coerce')
+    abertas['dias_restantes'] = (abertas['data_entrega'] - agora).dt.days
+    relatorio = abertas[abertas['dias_restantes'] <= dias_alerta]
+    return relatorio[['id', 'titulo', 'responsavel', 'status', 'prioridade',
+                      'data_entrega', 'dias_restantes']].sort_values('dias_restantes')
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pandas as pd
+
+# Os módulos do app ficam na raiz do repositório (sem pacote instalável)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def montar_tarefas(*linhas):
+    """Linhas (id, status[, data_entrega]) -> df_tarefas mínimo."""
+    linhas = [(*linha, None)[:3] for linha in linhas]
+    return pd.DataFrame({
+        'id': [i for i, _, _ in linhas], 'titulo': [f"Tarefa {i}" for i, _, _ in linhas],
+        'responsavel': 'Ana', 'status': [s for _, s, _ in linhas],
+        'data_entrega': [d for _, _, d in linhas], 'data_criacao': pd.NaT, 'progresso': 0,
+    })
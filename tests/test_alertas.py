@@ -0,0 +1,68 @@
+import json
+import threading
+
+import pandas as pd
+
+from alertas import (
+    criar_indice_prazos, sincronizar_indice_prazos, avancar_prazos, contar_faixas,
+    criar_notificador, executar_ciclo_alertas,
+)
+from conftest import montar_tarefas
+
+AGORA = pd.Timestamp('2024-03-01 09:00')
+
+
+def test_quadro_vazio():
+    indice = criar_indice_prazos(montar_tarefas(), AGORA)
+    sincronizar_indice_prazos(indice, montar_tarefas(), AGORA)
+
+    assert avancar_prazos(indice, AGORA + pd.Timedelta(days=30)) == []
+    assert contar_faixas(indice) == {'no_prazo': 0, 'vencendo': 0, 'atrasada': 0}
+
+
+def test_quadro_com_todas_as_tarefas_concluidas():
+    abertas = montar_tarefas((1, 'Em Desenvolvimento', '2024-03-10'), (2, 'Backlog/A Fazer', '2024-03-20'))
+    concluidas = montar_tarefas((1, 'Concluído', '2024-03-10'), (2, 'Concluído', '2024-03-20'))
+    indice = criar_indice_prazos(abertas, AGORA)
+
+    # Sem nenhuma tarefa aberta a sincronização não pode quebrar
+    sincronizar_indice_prazos(indice, concluidas, AGORA)
+    assert indice['tarefas'] == {}
+    assert avancar_prazos(indice, AGORA + pd.Timedelta(days=30)) == []
+    assert contar_faixas(indice) == {'no_prazo': 0, 'vencendo': 0, 'atrasada': 0}
+
+
+def test_tarefa_atrasando_cruza_as_faixas():
+    indice = criar_indice_prazos(montar_tarefas((1, 'Em Desenvolvimento', '2024-03-10')), AGORA)
+    assert contar_faixas(indice)['no_prazo'] == 1
+
+    vencendo = avancar_prazos(indice, pd.Timestamp('2024-03-07 12:00'))
+    assert [(a['task_id'], a['faixa'], a['dias_restantes']) for a in vencendo] == [('1', 'vencendo', 2)]
+
+    # Pulando direto para depois do prazo, só a faixa mais grave é notificada
+    indice = criar_indice_prazos(montar_tarefas((1, 'Em Desenvolvimento', '2024-03-10')), AGORA)
+    atrasada = avancar_prazos(indice, pd.Timestamp('2024-03-12'))
+    assert [(a['task_id'], a['faixa']) for a in atrasada] == [('1', 'atrasada')]
+    assert contar_faixas(indice)['atrasada'] == 1
+    assert avancar_prazos(indice, pd.Timestamp('2024-04-01')) == []
+
+
+def test_ciclo_notifica_pelo_stub_local(tmp_path):
+    arquivo = tmp_path / "alertas.jsonl"
+    notificar = criar_notificador({'canal': 'local', 'arquivo': arquivo})
+    atrasada = (pd.Timestamp.now() - pd.Timedelta(days=2)).strftime('%Y-%m-%d')
+    agendador = {'indice': criar_indice_prazos(dias_alerta=3), 'dias_alerta': 3,
+                 'trava': threading.Lock(), 'enviados': 0}
+
+    alertas = executar_ciclo_alertas(
+        agendador, lambda: montar_tarefas((1, 'Em Desenvolvimento', atrasada), (2, 'Concluído', atrasada)),
+        notificar)
+
+    enviados = [json.loads(l) for l in arquivo.read_text(encoding='utf-8').splitlines()]
+    assert [(a['task_id'], a['faixa']) for a in alertas] == [('1', 'atrasada')]
+    assert [(e['task_id'], e['faixa']) for e in enviados] == [('1', 'atrasada')]
+    assert agendador['enviados'] == 1
+
+    # Quadro que esvazia: nada novo é enviado
+    assert executar_ciclo_alertas(agendador, lambda: montar_tarefas((1, 'Concluído', atrasada)), notificar) == []
+    assert len(arquivo.read_text(encoding='utf-8').splitlines()) == 1
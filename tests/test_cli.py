@@ -0,0 +1,87 @@
+import json
+from types import SimpleNamespace
+
+import pandas as pd
+
+import cli
+from conftest import montar_tarefas
+
+QUADRO = {'nome': 'Principal', 'aba_logs': 'Logs', 'aba_arquivo': 'Arquivo'}
+
+
+def usar_tarefas(monkeypatch, df_tarefas):
+    """Substitui a planilha pelo DataFrame informado."""
+    monkeypatch.setattr(cli, 'abrir_quadro', lambda args: (QUADRO, None))
+    monkeypatch.setattr(cli, 'carregar_quadro', lambda sheet, quadro, *a, **k: (df_tarefas, None, None))
+
+
+def dia(deslocamento):
+    return (pd.Timestamp.now().normalize() + pd.Timedelta(days=deslocamento)).strftime('%Y-%m-%d')
+
+
+# --- ALERTAS ---
+def test_primeira_execucao_dos_alertas_nao_notifica(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    estado = tmp_path / "alertas.json"
+    usar_tarefas(monkeypatch, montar_tarefas(
+        (1, 'Em Desenvolvimento', dia(-40)), (2, 'Backlog/A Fazer', dia(10))))
+
+    assert cli.main(['alertas', '--canal', 'local', '--estado', str(estado)]) == 0
+    assert not (tmp_path / "alertas.jsonl").exists()
+    assert json.loads(estado.read_text()) == {'1': 'atrasada', '2': 'no_prazo'}
+
+    # Execuções seguintes notificam só os cruzamentos desde a anterior
+    usar_tarefas(monkeypatch, montar_tarefas(
+        (1, 'Em Desenvolvimento', dia(-40)), (2, 'Backlog/A Fazer', dia(2))))
+    assert cli.main(['alertas', '--canal', 'local', '--estado', str(estado)]) == 0
+    enviados = [json.loads(l) for l in (tmp_path / "alertas.jsonl").read_text(encoding='utf-8').splitlines()]
+    assert [(e['task_id'], e['faixa']) for e in enviados] == [('2', 'vencendo')]
+
+
+# --- ATUALIZAÇÃO EM LOTE ---
+def registrar_gravacoes(monkeypatch):
+    """Captura as chamadas de escrita em lote (nenhuma chega à planilha)."""
+    gravados = []
+
+    def gravar_campos_em_lote(sheet, campos_por_tarefa):
+        gravados.append(campos_por_tarefa)
+        return {}, []
+
+    quadro = next(iter(cli.montar_quadros().values()))
+    monkeypatch.setattr(cli, 'abrir_quadro', lambda args: (quadro, SimpleNamespace(spreadsheet=None)))
+    monkeypatch.setattr(cli, 'gravar_campos_em_lote', gravar_campos_em_lote)
+    monkeypatch.setattr(cli, 'abrir_aba_auxiliar', lambda *a: None)
+    monkeypatch.setattr(cli, 'gravar_linhas_log', lambda ws, linhas: None)
+    return gravados
+
+
+def test_atualizar_recusa_opcoes_invalidas(monkeypatch):
+    gravados = registrar_gravacoes(monkeypatch)
+    for opcoes in (['--status', 'Concluido'], ['--prioridade', 'Alta']):
+        try:
+            cli.main(['atualizar', '--ids', '1', *opcoes])
+        except SystemExit as e:
+            assert e.code == 2
+        else:
+            raise AssertionError(f"{opcoes} deveria ser recusado")
+    assert cli.main(['atualizar', '--ids', '1', '--responsavel', 'Fulano']) == 2
+    assert gravados == []
+
+
+def test_atualizar_valida_todas_as_linhas_do_csv(monkeypatch, tmp_path, capsys):
+    gravados = registrar_gravacoes(monkeypatch)
+    csv_alteracoes = tmp_path / "alteracoes.csv"
+    csv_alteracoes.write_text(
+        "id,status,responsavel,progresso\n"
+        "1,Concluído,Pedro,\n"
+        "2,Em Revisão,Pedro,\n"
+        "3,,Pedro,150\n", encoding='utf-8')
+
+    assert cli.main(['atualizar', '--arquivo', str(csv_alteracoes)]) == 2
+    assert gravados == []
+    erros = capsys.readouterr().err
+    assert "#2 status" in erros and "#3 progresso" in erros and "#1" not in erros
+
+    csv_alteracoes.write_text("id,status,responsavel\n1, Concluído ,Pedro\n2,,Israel\n", encoding='utf-8')
+    assert cli.main(['atualizar', '--arquivo', str(csv_alteracoes)]) == 0
+    assert gravados == [{'1': {'status': 'Concluído', 'responsavel': 'Pedro'}, '2': {'responsavel': 'Israel'}}]
@@ -0,0 +1,667 @@
+import gspread
+import pandas as pd
+import pytest
+
+from dados import (
+    COLUNAS_LOGS, criar_estado_analytics, atualizar_analytics, resumo_analytics,
+    buscar_logs_novos, datas_conclusao, selecionar_para_arquivar,
+    ErroPlanilha, preparar_dataframe_logs, compactar_logs, reescrever_logs, reconstruir_estado,
+    atualizar_checkpoints, COLUNAS_OBRIGATORIAS, ler_abas_em_lote, valores_para_dataframe,
+    validar_estrutura_planilha, adicionar_colunas_faltantes, comparar_estado_com_planilha,
+    prever_entregas, versao_dados, carregar_quadro, gerar_id_unico, anexar_tarefa,
+    contar_linhas_com_id, alteracoes_restauracao, carregar_tarefas,
+    criar_indice_busca, indexar_tarefa, remover_do_indice, buscar_tarefas, gravar_campos_em_lote,
+    montar_quadros, preparar_dataframe_arquivo, verificar_integridade, planejar_reparos,
+    montar_linhas_log, logs_reversiveis, ultimo_lote, acao_reversao, planejar_reversao,
+    aplicar_reversao,
+)
+from conftest import montar_tarefas
+
+
+def montar_logs(*eventos):
+    """Eventos (timestamp, acao, task_id, campo, valor_antigo, valor_novo) -> df_logs."""
+    df = pd.DataFrame([(*e, 'ana') for e in eventos], columns=COLUNAS_LOGS)
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    return df
+
+
+# --- ANALYTICS ---
+def test_status_regravado_nao_conta_como_transicao():
+    logs = montar_logs(
+        ('2024-01-01', 'criacao', '1', 'status', '', 'Backlog/A Fazer'),
+        ('2024-01-02', 'atualizacao', '1', 'status', 'Backlog/A Fazer', 'Em Desenvolvimento'),
+        ('2024-01-05', 'atualizacao', '1', 'status', 'Em Desenvolvimento', 'Concluído'),
+        # Ajuste de progresso no card regrava o mesmo status
+        ('2024-01-20', 'atualizacao', '1', 'status', 'Concluído', 'Concluído'),
+        ('2024-01-20', 'atualizacao', '1', 'progresso', '90', '100'),
+    )
+    resumo = resumo_analytics(atualizar_analytics(criar_estado_analytics(), logs),
+                              montar_tarefas((1, 'Concluído')), agora='2024-02-01')
+
+    assert resumo['throughput']['concluidas'].sum() == 1
+    assert resumo['tempos'].loc['1', 'lead_time_dias'] == 4
+    cfd = resumo['cfd'].set_index(['dia', 'status'])['tarefas']
+    assert cfd[(pd.Timestamp('2024-01-20'), 'Concluído')] == 1
+
+
+def test_status_regravado_entre_lotes_incrementais():
+    logs = montar_logs(
+        ('2024-01-01', 'criacao', '1', 'status', '', 'Backlog/A Fazer'),
+        ('2024-01-03', 'atualizacao', '1', 'status', 'Backlog/A Fazer', 'Em Desenvolvimento'),
+        ('2024-01-04', 'atualizacao', '1', 'status', 'Em Desenvolvimento', 'Em Desenvolvimento'),
+        ('2024-01-07', 'atualizacao', '1', 'status', 'Em Desenvolvimento', 'Concluído'),
+    )
+    estado = atualizar_analytics(criar_estado_analytics(), logs.iloc[:3])
+    # A permanência na coluna atual conta da entrada nela, não da regravação
+    assert estado['ultimo_estado'].loc['1', 'timestamp'] == pd.Timestamp('2024-01-03')
+    incremental = atualizar_analytics(estado, logs)
+    completo = atualizar_analytics(criar_estado_analytics(), logs)
+
+    # Os 4 dias em desenvolvimento contam a partir da entrada real na coluna
+    dias = incremental['tempo_colunas'][('1', 'Em Desenvolvimento')] / 86400
+    assert dias == 4
+    pd.testing.assert_series_equal(incremental['tempo_colunas'].sort_index(),
+                                   completo['tempo_colunas'].sort_index())
+    assert len(incremental['conclusoes']) == 1
+
+
+
+def test_resumo_com_ids_repetidos_usa_a_primeira_linha():
+    logs = montar_logs(
+        ('2024-01-01', 'criacao', '1', 'status', '', 'Backlog/A Fazer'),
+        ('2024-01-05', 'atualizacao', '1', 'status', 'Backlog/A Fazer', 'Concluído'),
+    )
+    # Mesma tarefa na aba principal e no Arquivo (arquivamento interrompido)
+    tarefas = montar_tarefas((1, 'Concluído'), (1, 'Concluído'), (2, 'Backlog/A Fazer'))
+    tarefas.loc[1, 'responsavel'] = 'Bia'
+    resumo = resumo_analytics(atualizar_analytics(criar_estado_analytics(), logs), tarefas, agora='2024-02-01')
+
+    assert resumo['tempos'].index.tolist() == ['1']
+    assert resumo['throughput']['responsavel'].tolist() == ['Ana']
+    assert resumo['throughput']['concluidas'].sum() == 1
+
+
+# --- CHANGE-FEED DA ABA DE LOGS ---
+class AbaLogsFalsa:
+    """Aba de Logs em memória que responde ws.get como a API (sem células vazias no fim)."""
+
+    def __init__(self, linhas):
+        self.linhas = [COLUNAS_LOGS] + [list(l) for l in linhas]
+
+    def get(self, faixa):
+        inicio, fim = faixa.split(':')
+        fim = int(fim[1:]) if fim[1:] else len(self.linhas)
+        return [[v for v in l] for l in self.linhas[int(inicio[1:]) - 1:fim]]
+
+    def append_rows(self, linhas, **kwargs):
+        inicio = len(self.linhas) + 1
+        self.linhas += [list(l) for l in linhas]
+        return {'updates': {'updatedRange': f"Logs!A{inicio}:G{len(self.linhas)}"}}
+
+    def delete_rows(self, inicio, fim):
+        del self.linhas[inicio - 1:fim]
+
+
+def linha_log(n, valor_antigo=''):
+    return [f'2024-01-{n:02d}T10:00:00', 'atualizacao', str(n), 'status', valor_antigo, 'Concluído', 'ana']
+
+
+def test_change_feed_traz_so_as_linhas_novas():
+    aba = AbaLogsFalsa([linha_log(1), linha_log(2), linha_log(3)])
+    assert buscar_logs_novos(aba, 2, linha_log(2)) == [linha_log(3)]
+    assert buscar_logs_novos(aba, 3, linha_log(3)) == []
+
+
+def test_change_feed_detecta_aba_reescrita_maior_que_o_conhecido():
+    # Após a compactação, a aba ainda tem mais linhas que as 2 conhecidas
+    aba = AbaLogsFalsa([linha_log(5), linha_log(6), linha_log(7), linha_log(8)])
+    assert buscar_logs_novos(aba, 2, linha_log(2)) is None
+    assert buscar_logs_novos(aba, 9, linha_log(9)) is None
+
+
+def test_change_feed_ignora_celulas_vazias_omitidas_pela_api():
+    sem_usuario = linha_log(1)[:6] + ['']
+    aba = AbaLogsFalsa([linha_log(1)[:6], linha_log(2)])  # A API corta o '' do fim
+    assert buscar_logs_novos(aba, 1, sem_usuario) == [linha_log(2)]
+
+
+# --- ARQUIVAMENTO ---
+def test_conclusao_nao_avanca_com_status_regravado():
+    logs = montar_logs(
+        ('2024-01-05', 'atualizacao', '1', 'status', 'Em Desenvolvimento', 'Concluído'),
+        ('2024-03-01', 'atualizacao', '1', 'status', 'Concluído', 'Concluído'),
+        # Reaberta e concluída de novo: vale a nova conclusão
+        ('2024-01-05', 'atualizacao', '2', 'status', 'Em Desenvolvimento', 'Concluído'),
+        ('2024-01-10', 'atualizacao', '2', 'status', 'Concluído', 'Em Desenvolvimento'),
+        ('2024-02-20', 'atualizacao', '2', 'status', 'Em Desenvolvimento', 'Concluído'),
+    )
+    tarefas = montar_tarefas((1, 'Concluído'), (2, 'Concluído')).assign(data_entrega=pd.NaT)
+
+    conclusao = datas_conclusao(tarefas, logs)
+    assert list(conclusao) == [pd.Timestamp('2024-01-05'), pd.Timestamp('2024-02-20')]
+    candidatas = selecionar_para_arquivar(tarefas, logs, dias=30, agora='2024-03-10')
+    assert candidatas['id'].tolist() == [1]
+
+
+# --- RESTAURAÇÃO DE SNAPSHOT ---
+def test_restauracao_registra_criacoes_alteracoes_e_remocoes():
+    atual = montar_tarefas((1, 'Backlog', '2024-03-01'), (2, 'Concluído'), (4, 'Backlog'))
+    snapshot = montar_tarefas((1, 'Concluído', pd.Timestamp('2024-03-01')), (3, 'Backlog'),
+                              (4, 'Backlog'))
+
+    criadas, alteradas = alteracoes_restauracao(atual, snapshot)
+    assert list(criadas) == ['3']
+    assert criadas['3']['status'] == (None, 'Backlog')
+    # Só o campo que mudou (a data igual em outro formato não conta); a tarefa 4 não muda
+    assert alteradas == {'1': {'status': ('Backlog', 'Concluído')},
+                         '2': {'removida': ("", "restauração")}}
+
+
+# --- CHECKPOINTS ---
+def test_checkpoints_incrementais_reproduzem_o_estado_completo():
+    logs = logs_de_exemplo()
+    incremental = atualizar_checkpoints(atualizar_checkpoints(None, logs.iloc[:3], intervalo=2), logs, intervalo=2)
+    completo = atualizar_checkpoints(None, logs, intervalo=2)
+
+    assert [p for p, _, _ in incremental['lista']] == [2, 4, 6]
+    assert incremental['assinatura'] == completo['assinatura']
+    for (_, ts_i, estado_i), (_, ts_c, estado_c) in zip(incremental['lista'], completo['lista']):
+        assert ts_i == ts_c
+        pd.testing.assert_frame_equal(estado_i, estado_c)
+    for corte in [None, '2024-01-02', '2024-01-05', '2024-02-01 12:00']:
+        pd.testing.assert_frame_equal(reconstruir_estado(logs, corte, incremental),
+                                      reconstruir_estado(logs, corte))
+
+
+def test_checkpoints_descartados_quando_os_logs_mudam():
+    logs = logs_de_exemplo()
+    checkpoints = atualizar_checkpoints(None, logs, intervalo=2)
+    compactado, _ = compactar_logs(logs, '2024-01-15')
+    revalidados = atualizar_checkpoints(checkpoints, compactado, intervalo=2)
+
+    assert all(pos <= len(compactado) for pos, _, _ in revalidados['lista'])
+    pd.testing.assert_frame_equal(reconstruir_estado(compactado, checkpoints=revalidados),
+                                  reconstruir_estado(logs))
+
+
+
+def test_comparacao_com_a_planilha_tolera_ids_repetidos():
+    logs = logs_de_exemplo()
+    tarefas = pd.DataFrame({
+        'id': [1, 1, 2], 'titulo': ['Login SSO', 'Login SSO', ''], 'descricao': '',
+        'responsavel': '', 'status': ['Concluído', 'Concluído', 'Backlog/A Fazer'],
+        'tipo': '', 'prioridade': '', 'data_entrega': pd.NaT, 'progresso': 0, 'data_criacao': pd.NaT,
+    })
+    divergencias = comparar_estado_com_planilha(reconstruir_estado(logs), tarefas)
+
+    # Só a tarefa 2 diverge (ainda em Backlog na planilha)
+    assert divergencias[['task_id', 'campo', 'valor_logs', 'valor_planilha']].values.tolist() == [
+        ['2', 'status', 'Em Desenvolvimento', 'Backlog/A Fazer']]
+
+
+# --- BUSCA TEXTUAL ---
+def test_busca_por_prefixo_sem_acentos_exige_todos_os_termos():
+    tarefas = montar_tarefas((1, 'Backlog'), (2, 'Backlog'), (3, 'Backlog')).assign(
+        titulo=['Correção do menu', 'Landing page', 'Menu lateral'],
+        descricao=['Ajustar o CSS', None, 'Corrigir a API'])
+    indice = criar_indice_busca(tarefas)
+
+    assert buscar_tarefas(indice, 'correcao') == {'1'}
+    assert buscar_tarefas(indice, 'MEN') == {'1', '3'}
+    assert buscar_tarefas(indice, 'corr menu') == {'1', '3'}  # "corrigir" também casa
+    assert buscar_tarefas(indice, 'menu css') == {'1'}
+    assert buscar_tarefas(indice, 'menu inexistente') == set()
+    assert buscar_tarefas(indice, '') == set()
+
+
+def test_indice_de_busca_incremental_equivale_ao_reconstruido():
+    tarefas = montar_tarefas((1, 'Backlog'), (2, 'Backlog')).assign(
+        titulo=['Login social', 'Relatório mensal'], descricao=['OAuth', 'PDF'])
+    indice = criar_indice_busca(tarefas)
+
+    indexar_tarefa(indice, 1, {'titulo': 'Login por e-mail', 'descricao': 'SMTP'})
+    indexar_tarefa(indice, 3, {'titulo': 'Exportar relatório'})
+    remover_do_indice(indice, 2)
+
+    assert buscar_tarefas(indice, 'oauth') == set()
+    assert buscar_tarefas(indice, 'relat') == {'3'}
+    assert 'mensal' not in indice['termos']  # Termos sem tarefas saem do vocabulário
+    esperado = criar_indice_busca(pd.DataFrame({
+        'id': [1, 3], 'titulo': ['Login por e-mail', 'Exportar relatório'],
+        'descricao': ['SMTP', None]}))
+    assert indice == esperado
+
+
+# --- COMPACTAÇÃO DOS LOGS ---
+def logs_de_exemplo():
+    return montar_logs(
+        ('2024-01-01', 'criacao', '1', 'status', '', 'Backlog/A Fazer'),
+        ('2024-01-01', 'criacao', '1', 'titulo', '', 'Login'),
+        ('2024-01-02', 'criacao', '2', 'status', '', 'Backlog/A Fazer'),
+        ('2024-01-03', 'atualizacao', '1', 'status', 'Backlog/A Fazer', 'Em Desenvolvimento'),
+        ('2024-01-10', 'atualizacao', '1', 'status', 'Em Desenvolvimento', 'Concluído'),
+        ('2024-02-01', 'atualizacao', '2', 'status', 'Backlog/A Fazer', 'Em Desenvolvimento'),
+        ('2024-02-02', 'atualizacao', '1', 'titulo', 'Login', 'Login SSO'),
+    )
+
+
+def test_compactacao_preserva_o_estado_reconstruido():
+    logs = logs_de_exemplo()
+    compactado, removidos = compactar_logs(logs, '2024-01-15')
+
+    assert len(removidos) == 5
+    assert (compactado['acao'] == 'compactacao').sum() == 3  # (1, status), (1, titulo), (2, status)
+    pd.testing.assert_frame_equal(reconstruir_estado(compactado), reconstruir_estado(logs))
+    # Também em datas intermediárias posteriores ao corte
+    corte = pd.Timestamp('2024-02-01 12:00')
+    pd.testing.assert_frame_equal(reconstruir_estado(compactado, corte), reconstruir_estado(logs, corte))
+
+
+def test_reescrita_dos_logs_preserva_linhas_anexadas_durante_a_compactacao():
+    brutos = [[t.isoformat(), a, i, c, va, vn, u] for t, a, i, c, va, vn, u in
+              logs_de_exemplo().itertuples(index=False)]
+    aba = AbaLogsFalsa(brutos)
+    logs = preparar_dataframe_logs([COLUNAS_LOGS] + brutos)
+    compactado, _ = compactar_logs(logs, '2024-01-15')
+
+    concorrente = linha_log(20)
+    aba.linhas.append(concorrente)  # Outro usuário grava entre a leitura e a escrita
+    reescrever_logs(aba, compactado, logs.attrs['linhas_planilha'], logs.attrs['ultima_linha'])
+
+    assert aba.linhas[0] == COLUNAS_LOGS
+    assert concorrente in aba.linhas
+    assert len(aba.linhas) == 1 + len(compactado) + 1
+    regravados = preparar_dataframe_logs([COLUNAS_LOGS] + [l for l in aba.linhas[1:] if l != concorrente])
+    pd.testing.assert_frame_equal(reconstruir_estado(regravados), reconstruir_estado(logs))
+
+
+def test_gravacao_concorrente_fica_abaixo_do_historico_regravado():
+    brutos = [[t.isoformat(), a, i, c, va, vn, u] for t, a, i, c, va, vn, u in
+              logs_de_exemplo().itertuples(index=False)]
+    aba = AbaLogsFalsa(brutos)
+    logs = preparar_dataframe_logs([COLUNAS_LOGS] + brutos)
+    compactado, _ = compactar_logs(logs, '2024-01-15')
+
+    concorrente = ['2024-02-03T10:00:00', 'atualizacao', '1', 'titulo', 'Login SSO', 'Login Novo', 'bia']
+    aba.linhas.append(concorrente)
+    reescrever_logs(aba, compactado, logs.attrs['linhas_planilha'], logs.attrs['ultima_linha'])
+
+    assert aba.linhas[-1] == concorrente
+    assert aba.linhas.count(concorrente) == 1
+    regravados = preparar_dataframe_logs(aba.linhas)
+    checkpoints = atualizar_checkpoints(None, regravados, intervalo=2)
+    assert reconstruir_estado(regravados, checkpoints=checkpoints).loc['1', 'titulo'] == 'Login Novo'
+    pd.testing.assert_frame_equal(reconstruir_estado(regravados, checkpoints=checkpoints),
+                                  reconstruir_estado(regravados))
+
+
+def test_reescrita_dos_logs_aborta_se_a_aba_foi_reescrita():
+    aba = AbaLogsFalsa([linha_log(5), linha_log(6), linha_log(7)])
+    antes = [list(l) for l in aba.linhas]
+    with pytest.raises(ErroPlanilha):
+        reescrever_logs(aba, montar_logs(), 2, linha_log(2))
+    assert aba.linhas == antes
+
+
+# --- CARGA PROJETADA E REPARO DO CABEÇALHO ---
+class PlanilhaFalsa:
+    """Planilha em memória com values_batch_get por faixas de colunas ('Aba'!A:B)."""
+
+    def __init__(self, abas):
+        self.abas = abas
+        self.leituras = []
+
+    def values_batch_get(self, faixas):
+        self.leituras.append(list(faixas))
+        respostas = []
+        for faixa in faixas:
+            aba, _, colunas = faixa.partition('!')
+            linhas = self.abas[aba.strip("'")]
+            if colunas:
+                inicio, fim = (gspread.utils.a1_to_rowcol(f"{c}1")[1] for c in colunas.split(':'))
+                linhas = [l[inicio - 1:fim] for l in linhas]
+            respostas.append({'values': [list(l) for l in linhas]})
+        return {'valueRanges': respostas}
+
+
+class AbaTarefasFalsa:
+    def __init__(self, planilha, titulo):
+        self.spreadsheet, self.title = planilha, titulo
+
+    @property
+    def linhas(self):
+        return self.spreadsheet.abas[self.title]
+
+    @property
+    def col_count(self):
+        return max(len(l) for l in self.linhas)
+
+    def row_values(self, linha):
+        return list(self.linhas[linha - 1])
+
+    def col_values(self, coluna):
+        return [l[coluna - 1] for l in self.linhas if len(l) >= coluna]
+
+    def append_row(self, linha, **kwargs):
+        self.linhas.append(list(linha))
+
+    def add_cols(self, quantidade):
+        for l in self.linhas:
+            l.extend([""] * quantidade)
+
+    def update(self, valores, celula):
+        linha, coluna = gspread.utils.a1_to_rowcol(celula)
+        destino = self.linhas[linha - 1]
+        destino.extend([""] * (coluna - 1 + len(valores[0]) - len(destino)))
+        destino[coluna - 1:coluna - 1 + len(valores[0])] = valores[0]
+
+
+def test_coluna_faltante_na_carga_projetada_vai_para_o_fim_do_cabecalho():
+    cabecalho = [c for c in COLUNAS_OBRIGATORIAS if c != 'tipo']
+    linha = {'id': '1', 'titulo': 'Login', 'descricao': 'Texto longo', 'responsavel': 'Ana',
+             'status': 'Backlog/A Fazer', 'prioridade': 'Alta', 'data_entrega': '2024-03-10',
+             'progresso': '0', 'data_criacao': '2024-03-01'}
+    planilha = PlanilhaFalsa({'Tarefas': [list(cabecalho), [linha[c] for c in cabecalho]],
+                              'Logs': [COLUNAS_LOGS], 'Arquivo': [['id']]})
+    sheet = AbaTarefasFalsa(planilha, 'Tarefas')
+    quadro = {'aba_logs': 'Logs', 'aba_arquivo': 'Arquivo'}
+
+    valores, _, _ = ler_abas_em_lote(sheet, quadro, cabecalho, ['descricao'])
+    assert 'descricao' not in valores[0]
+    df = valores_para_dataframe(valores)
+    df['descricao'] = None  # Como a interface faz com as colunas omitidas
+    _, faltantes = validar_estrutura_planilha(df)
+    assert faltantes == ['tipo']
+    adicionar_colunas_faltantes(sheet, faltantes)
+
+    assert sheet.linhas[0] == cabecalho + faltantes
+    assert sheet.linhas[1][:len(cabecalho)] == [linha[c] for c in cabecalho]
+
+
+
+def test_carga_da_interface_completa_o_cabecalho_sem_tocar_nos_dados():
+    cabecalho = [c for c in COLUNAS_OBRIGATORIAS if c != 'tipo']
+    linhas = [[str(i), f'Tarefa {i}', 'Texto', 'Ana', 'Backlog/A Fazer', '🟡 Alta',
+               '2024-03-10', '0', '2024-03-01'] for i in (1, 2)]
+    linhas.append(['x', 'Sem ID', '', 'Ana', 'Backlog/A Fazer', '🟡 Alta', '', '0', ''])
+    planilha = PlanilhaFalsa({'Tarefas': [list(cabecalho)] + [list(l) for l in linhas],
+                              'Logs': [COLUNAS_LOGS], 'Arquivo': [['id']]})
+    sheet = AbaTarefasFalsa(planilha, 'Tarefas')
+    quadro = {'aba_logs': 'Logs', 'aba_arquivo': 'Arquivo'}
+
+    with pytest.raises(ErroPlanilha):
+        carregar_quadro(sheet, quadro, cabecalho, ['descricao'])
+    df_tarefas, _, _ = carregar_quadro(sheet, quadro, cabecalho, ['descricao'], completar_cabecalho=True)
+
+    assert sheet.linhas[0] == cabecalho + ['tipo']
+    assert [l[:len(cabecalho)] for l in sheet.linhas[1:]] == linhas
+    assert df_tarefas['id'].tolist() == [1, 2]
+    assert df_tarefas['descricao'].isna().all()  # Lida sob demanda
+    assert df_tarefas.attrs['colunas_adicionadas'] == ['tipo']
+    assert df_tarefas.attrs['linhas_ignoradas'] == 1
+    assert df_tarefas.attrs['linha_por_id'] == {'1': 2, '2': 3}
+
+
+def test_nova_tarefa_recebe_id_livre_e_entra_na_ordem_do_cabecalho():
+    cabecalho = ['id', 'titulo', 'status']
+    planilha = PlanilhaFalsa({'Tarefas': [cabecalho, ['3', 'A', 'Concluído'], ['x', 'B', '']],
+                              'Arquivo': [['id'], ['7']]})
+    sheet = AbaTarefasFalsa(planilha, 'Tarefas')
+
+    novo_id = gerar_id_unico(sheet, 'Arquivo')
+    assert novo_id == 8  # IDs arquivados seguem reservados
+    assert anexar_tarefa(sheet, {'status': 'Backlog/A Fazer', 'id': novo_id, 'titulo': 'C'}) == cabecalho
+    assert sheet.linhas[-1] == ['8', 'C', 'Backlog/A Fazer']
+    assert contar_linhas_com_id(sheet, 8) == 1
+    anexar_tarefa(sheet, {'id': 8, 'titulo': 'Corrida'})
+    assert contar_linhas_com_id(sheet, 8) == 2
+
+
+def test_alertas_leem_so_a_aba_de_tarefas_sem_a_descricao():
+    cabecalho = list(COLUNAS_OBRIGATORIAS)
+    linha = ['1', 'Login', 'Texto longo', 'Ana', 'Backlog/A Fazer', 'Bugfix', '🟡 Alta',
+             '2024-03-10', '0', '2024-03-01']
+    planilha = PlanilhaFalsa({'Tarefas': [list(cabecalho), list(linha)]})
+    sheet = AbaTarefasFalsa(planilha, 'Tarefas')
+
+    df = carregar_tarefas(sheet, cabecalho, ['descricao'])
+    assert planilha.leituras == [["'Tarefas'!A:B", "'Tarefas'!D:J"]]
+    assert df['descricao'].isna().all()
+    assert df.loc[0, 'data_entrega'] == pd.Timestamp('2024-03-10')
+    assert df.attrs['cabecalho'] == cabecalho
+
+    # Coluna nova no meio do cabeçalho: a projeção não confere e a leitura é completa
+    for l in sheet.linhas:
+        l.insert(1, 'extra' if l is sheet.linhas[0] else '')
+    df = carregar_tarefas(sheet, cabecalho, ['descricao'])
+    assert planilha.leituras[-1] == ["'Tarefas'"]
+    assert df.attrs['cabecalho'] == sheet.linhas[0]
+    assert df.loc[0, 'descricao'] == 'Texto longo'
+
+
+# --- GRAVAÇÃO EM LOTE ---
+class AbaLoteFalsa:
+    """Aba com batch_get/batch_update (linhas '1:1', colunas 'A:A' ou células) que conta as chamadas."""
+
+    def __init__(self, linhas):
+        self.linhas = linhas
+        self.chamadas = []
+
+    def celula(self, a1):
+        linha, coluna = gspread.utils.a1_to_rowcol(a1)
+        valores = self.linhas[linha - 1] if linha <= len(self.linhas) else []
+        return valores[coluna - 1] if coluna <= len(valores) else ""
+
+    def batch_get(self, faixas):
+        self.chamadas.append('batch_get')
+        respostas = []
+        for faixa in faixas:
+            if faixa == '1:1':
+                respostas.append([list(self.linhas[0])])
+            elif faixa == 'A:A':
+                respostas.append([[l[0]] if l else [] for l in self.linhas])
+            else:
+                valor = self.celula(faixa)
+                respostas.append([[valor]] if valor != "" else [])
+        return respostas
+
+    def batch_update(self, dados):
+        self.chamadas.append('batch_update')
+        for item in dados:
+            linha, coluna = gspread.utils.a1_to_rowcol(item['range'])
+            self.linhas[linha - 1][coluna - 1] = item['values'][0][0]
+
+
+def test_gravacao_em_lote_usa_uma_escrita_para_todas_as_tarefas():
+    aba = AbaLoteFalsa([['id', 'titulo', 'status', 'progresso'],
+                        ['1', 'A', 'Backlog/A Fazer', '0'],
+                        ['2', 'B', 'Em Desenvolvimento', ''],
+                        ['3', 'C', 'Concluído', '100']])
+
+    alteracoes, nao_encontrados = gravar_campos_em_lote(aba, {
+        1: {'status': 'Concluído', 'progresso': 100},
+        2: {'progresso': 50, 'inexistente': 'x'},
+        9: {'status': 'Concluído'},
+    })
+
+    # Uma leitura de IDs, uma dos valores antigos e UMA escrita, qualquer que seja o lote
+    assert aba.chamadas == ['batch_get', 'batch_get', 'batch_update']
+    assert nao_encontrados == [9]
+    assert alteracoes == {1: {'status': ('Backlog/A Fazer', 'Concluído'), 'progresso': ('0', 100)},
+                          2: {'progresso': ("", 50)}}
+    assert aba.linhas[1:] == [['1', 'A', 'Concluído', '100'], ['2', 'B', 'Em Desenvolvimento', '50'],
+                              ['3', 'C', 'Concluído', '100']]
+
+
+def test_gravacao_em_lote_sem_tarefas_encontradas_nao_escreve():
+    aba = AbaLoteFalsa([['id', 'status'], ['1', 'Backlog/A Fazer']])
+
+    assert gravar_campos_em_lote(aba, {5: {'status': 'Concluído'}}) == ({}, [5])
+    assert aba.chamadas == ['batch_get']
+
+
+# --- INTEGRIDADE DOS DADOS ---
+def montar_aba(*linhas):
+    """Linhas (id, titulo, status, progresso, data_criacao) -> aba bruta indexada pela linha."""
+    padrao = {'descricao': '', 'responsavel': 'Ana', 'tipo': 'Refatoração', 'prioridade': '🟢 Média',
+              'data_entrega': '2024-03-10'}
+    registros = [dict(padrao, id=i, titulo=t, status=s, progresso=p, data_criacao=d)
+                 for i, t, s, p, d in linhas]
+    return valores_para_dataframe(
+        [COLUNAS_OBRIGATORIAS] + [[r[c] for c in COLUNAS_OBRIGATORIAS] for r in registros],
+        manter_linhas=True)
+
+
+def test_verificacao_incremental_equivale_a_completa():
+    quadro = next(iter(montar_quadros().values()))
+    arquivo = preparar_dataframe_arquivo([['id'], ['9']])
+    aba = montar_aba(('1', 'Login', 'Backlog/A Fazer', '0', '2024-03-01'),
+                     ('2', 'Menu', 'concluido', '100', '2024-03-01'),
+                     ('9', 'Arquivada de novo', 'Concluído', '100', '2024-03-01'))
+    logs = montar_logs(('2024-03-02', 'atualizacao', '1', 'status', 'Backlog/A Fazer', 'Backlog/A Fazer'))
+
+    problemas, estado = verificar_integridade(aba, logs, arquivo, quadro)
+    assert set(zip(problemas['id'], problemas['problema'])) == {
+        ('2', 'status_desconhecido'), ('9', 'id_duplicado')}
+
+    # Linha 2 corrigida, linha nova inválida e um log que diverge da planilha
+    aba.loc[3, 'status'] = 'Concluído'
+    aba = pd.concat([aba, montar_aba(('x', 'Nova', 'Concluído', '150', '2024-03-05')).set_axis([5])])
+    logs = pd.concat([logs, montar_logs(
+        ('2024-03-06', 'atualizacao', '1', 'status', 'Backlog/A Fazer', 'Em Desenvolvimento'))],
+        ignore_index=True)
+
+    incremental, _ = verificar_integridade(aba, logs, arquivo, quadro, estado)
+    completa, _ = verificar_integridade(aba, logs, arquivo, quadro)
+    pd.testing.assert_frame_equal(incremental, completa)
+    assert set(zip(incremental['linha'], incremental['problema'])) == {
+        (2, 'divergencia_logs'), (4, 'id_duplicado'), (5, 'id_invalido'), (5, 'progresso_invalido')}
+
+
+def test_reparos_sugeridos_por_problema():
+    quadro = next(iter(montar_quadros().values()))
+    arquivo = preparar_dataframe_arquivo([['id'], ['9']])
+    aba = montar_aba(('1', 'Login', 'concluido', '150', ''),
+                     ('1', '', 'Backlog/A Fazer', 'abc', '31/12/2023'),
+                     ('9', 'Arquivada', 'Nada parecido', '0', '2024-01-01'))
+    logs = montar_logs(('2024-02-01', 'criacao', '1', 'id', '', '1'))
+
+    problemas, _ = verificar_integridade(aba, logs, arquivo, quadro)
+    reparos = planejar_reparos(problemas, aba, logs, quadro, ids_reservados={9})
+    sugestoes = dict(zip(zip(reparos['linha'], reparos['problema']), reparos['reparo']))
+
+    assert sugestoes == {
+        (2, 'status_desconhecido'): 'Concluído',
+        (2, 'progresso_invalido'): '100',
+        (2, 'data_invalida'): '2024-02-01',  # Data de criação vinda dos logs
+        (3, 'titulo_vazio'): None,  # Sem correção segura
+        (3, 'progresso_invalido'): '0',
+        (3, 'id_duplicado'): '10',  # Depois dos IDs da aba e do Arquivo
+        (4, 'status_desconhecido'): None,
+        (4, 'id_duplicado'): '11',
+    }
+
+
+# --- DESFAZER / REFAZER ---
+def test_desfazer_ultimo_lote_com_conflitos():
+    logs = montar_logs(
+        ('2024-03-01 09:00', 'criacao', '1', 'status', '', 'Backlog/A Fazer'),
+        ('2024-03-01 10:00', 'atualizacao', '1', 'status', 'Backlog/A Fazer', 'Em Desenvolvimento'),
+        ('2024-03-01 11:00', 'atualizacao', '1', 'status', 'Em Desenvolvimento', 'Code Review/QA'),
+        ('2024-03-01 11:00', 'atualizacao', '1', 'progresso', '0', '50'),
+        ('2024-03-01 11:00', 'atualizacao', '2', 'status', 'Backlog/A Fazer', 'Concluído'),
+        ('2024-03-01 11:00', 'atualizacao', '3', 'titulo', 'A', 'B'),
+        ('2024-03-01 12:00', 'atualizacao', '2', 'titulo', 'X', 'Y'),
+    )
+    logs.loc[[1, 6], 'usuario'] = 'bia'
+    aba = AbaLoteFalsa([['id', 'titulo', 'status', 'progresso'],
+                        ['1', 'Login', 'Code Review/QA', '50.0'],
+                        ['2', 'Y', 'Em Desenvolvimento', '0']])
+
+    assert len(logs_reversiveis(logs)) == 6  # Criações não se desfazem
+    lote = ultimo_lote(logs, 'ana')
+    assert lote.index.tolist() == [2, 3, 4, 5]
+    assert acao_reversao(lote) == 'desfazer'
+
+    alteracoes, conflitos = aplicar_reversao(aba, planejar_reversao(lote))
+    assert alteracoes == {'1': {'status': ('Code Review/QA', 'Em Desenvolvimento'),
+                                'progresso': ('50.0', '0')}}
+    assert aba.linhas[1] == ['1', 'Login', 'Em Desenvolvimento', '0']
+    assert set(zip(conflitos['task_id'], conflitos['motivo'])) == {
+        ('2', 'alterado depois'), ('3', 'tarefa fora da planilha')}
+
+    # A reversão vira o último lote do usuário: desfazer de novo é refazer
+    desfeitas = preparar_dataframe_logs(
+        [COLUNAS_LOGS] + montar_linhas_log('desfazer', alteracoes, 'ana'))
+    assert acao_reversao(ultimo_lote(pd.concat([logs, desfeitas], ignore_index=True), 'ana')) == 'refazer'
+    _, conflitos = aplicar_reversao(aba, planejar_reversao(lote))
+    assert set(conflitos.loc[conflitos['task_id'] == '1', 'motivo']) == {'já revertido'}
+
+
+def test_reversao_agrupa_edicoes_do_mesmo_campo():
+    logs = montar_logs(
+        ('2024-03-01 10:00', 'atualizacao', '1', 'status', 'Backlog/A Fazer', 'Em Desenvolvimento'),
+        ('2024-03-01 11:00', 'atualizacao', '1', 'status', 'Em Desenvolvimento', 'Concluído'),
+        # Ida e volta: reverter não mudaria nada
+        ('2024-03-01 10:00', 'atualizacao', '2', 'progresso', '10', '40'),
+        ('2024-03-01 11:00', 'atualizacao', '2', 'progresso', '40', '10.0'),
+    )
+
+    plano = planejar_reversao(logs_reversiveis(logs, inicio='2024-03-01', fim='2024-03-02'))
+    assert plano.to_dict('records') == [{'task_id': '1', 'campo': 'status', 'esperado': 'Concluído',
+                                         'reverter_para': 'Backlog/A Fazer', 'entradas': 2}]
+
+
+# --- PREVISÃO DE ENTREGAS ---
+def montar_fila(*linhas):
+    """Linhas (id, responsavel, status, prioridade, data_entrega, progresso) -> df_tarefas."""
+    return pd.DataFrame(linhas, columns=['id', 'responsavel', 'status', 'prioridade',
+                                         'data_entrega', 'progresso']).assign(
+        titulo=lambda d: [f"Tarefa {i}" for i in d['id']])
+
+
+def test_previsao_com_ids_repetidos():
+    logs = montar_logs(('2024-03-01', 'atualizacao', '1', 'progresso', '0', '40'))
+    tarefas = montar_fila(
+        (1, 'Ana', 'Em Desenvolvimento', '🟡 Alta', '2024-03-20', 40),
+        (1, 'Ana', 'Concluído', '🟡 Alta', '2024-03-20', 100),  # Cópia esquecida no Arquivo
+    )
+    previsoes = prever_entregas(tarefas, logs, agora='2024-03-05')['previsoes']
+
+    assert previsoes['id'].tolist() == [1]
+    assert previsoes['risco'].tolist() == ['no prazo']
+
+
+def test_previsao_segue_a_fila_de_cada_dev():
+    logs = montar_logs(
+        ('2024-03-01', 'atualizacao', '1', 'progresso', '0', '50'),
+        ('2024-03-03', 'atualizacao', '1', 'progresso', '50', '80'),  # Ana: 80 pontos em 4 dias
+    )
+    tarefas = montar_fila(
+        (1, 'Ana', 'Em Desenvolvimento', '🟡 Alta', '2024-03-06', 80),
+        (2, 'Ana', 'Backlog/A Fazer', '🔴 Urgente', '2024-03-08', 0),
+        (3, 'Ana', 'Backlog/A Fazer', '⚪ Baixa', None, 0),
+        (4, 'Bia', 'Backlog/A Fazer', '🟢 Média', '2024-03-30', 0),
+        (5, 'Ana', 'Concluído', '🟢 Média', '2024-03-01', 100),
+    )
+    resultado = prever_entregas(tarefas, logs, agora='2024-03-05')
+    velocidade = resultado['velocidade'].set_index('responsavel')
+    previsoes = resultado['previsoes'].set_index('id')
+
+    assert velocidade.loc['Ana', 'pontos_por_dia'] == 20
+    assert velocidade.loc['Bia', 'origem'] == 'mediana da equipe'
+    assert 5 not in previsoes.index
+    # Fila da Ana: urgente (100 pts) -> alta (20 pts) -> baixa (100 pts)
+    assert previsoes.loc[2, 'previsao'] == pd.Timestamp('2024-03-10')
+    assert previsoes.loc[1, 'previsao'] == pd.Timestamp('2024-03-11')
+    assert previsoes['risco'].to_dict() == {
+        1: 'atrasará', 2: 'atrasará', 3: 'sem prazo', 4: 'no prazo'}
+
+
+def test_versao_dos_dados_muda_com_o_titulo():
+    tarefas = montar_fila((1, 'Ana', 'Backlog/A Fazer', '🟡 Alta', '2024-03-20', 0))
+    logs = montar_logs(('2024-03-01', 'criacao', '1', 'status', '', 'Backlog/A Fazer'))
+    renomeada = tarefas.assign(titulo='Login SSO')
+
+    assert versao_dados(tarefas, logs) == versao_dados(tarefas.copy(), logs)
+    assert versao_dados(renomeada, logs) != versao_dados(tarefas, logs)